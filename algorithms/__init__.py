@@ -4,4 +4,109 @@ from .dfs import dfs
 from .ucs import ucs
 from .dls import dls
 from .iddfs import iddfs
-from .bidirectional import bidirectional_search
\ No newline at end of file
+from .bidirectional import bidirectional_search, bidirectional_ucs
+from .hierarchical import hierarchical_search
+from .bfs import bfs_steps
+from .dfs import dfs_steps
+from .ucs import ucs_steps
+from .dls import dls_steps
+from .iddfs import iddfs_steps
+from .bidirectional import bidirectional_steps, bidirectional_ucs_steps
+from .hierarchical import hierarchical_steps
+from .bfs import bfs_multi, bfs_multi_steps
+from .ucs import ucs_multi, ucs_multi_steps
+from .stepper import SearchStepper, run_round_robin
+from utils.connectivity import get_connectivity
+from utils.grid_utils import Grid
+
+# Algorithm name -> search function
+ALGORITHMS = {
+    "BFS": bfs,
+    "DFS": dfs,
+    "UCS": ucs,
+    "DLS": dls,
+    "IDDFS": iddfs,
+    "Bidirectional": bidirectional_search,
+    "Bidirectional UCS": bidirectional_ucs,
+    "Hierarchical": hierarchical_search,
+}
+
+# Algorithm name -> resumable step generator (same arguments as the search function)
+STEPPERS = {
+    "BFS": bfs_steps,
+    "DFS": dfs_steps,
+    "UCS": ucs_steps,
+    "DLS": dls_steps,
+    "IDDFS": iddfs_steps,
+    "Bidirectional": bidirectional_steps,
+    "Bidirectional UCS": bidirectional_ucs_steps,
+    "Hierarchical": hierarchical_steps,
+}
+
+# Algorithms that can search tiled grids paged from disk (utils.tiled_grid)
+PAGED_ALGORITHMS = ("BFS", "UCS")
+
+# Default keyword arguments used when running an algorithm by name
+DEFAULT_PARAMS = {
+    "DLS": {"depth_limit": 25},
+    "IDDFS": {"max_depth": 35},
+}
+
+
+def _normalize(name):
+    return name.lower().replace(' ', '').replace('-', '').replace('_', '')
+
+
+def resolve_algorithm(algorithm_name):
+    """
+    Canonical registry name for algorithm_name
+    Case-insensitive; spaces, hyphens and underscores are ignored
+    """
+    key = _normalize(algorithm_name)
+    for name in ALGORITHMS:
+        if _normalize(name) == key:
+            return name
+    raise ValueError(f"Unknown algorithm: {algorithm_name}")
+
+
+def unreachable(grid, start, goal):
+    """
+    True if the grid's connectivity index shows goal cannot be reached from start
+    Only Grid objects are indexed; endpoints that are walls or off the grid
+    are left for the algorithms to handle
+    """
+    if not isinstance(grid, Grid) or not (grid.is_open(*start) and grid.is_open(*goal)):
+        return False
+    return not get_connectivity(grid).may_reach(start, goal)
+
+
+def _rejected():
+    """Step generator for a query rejected before searching"""
+    return (None, frozenset())
+    yield
+
+
+def run_search(algorithm_name, grid, start, goal, visualizer=None, **params):
+    """
+    Run an algorithm by name, filling in its default parameters
+    Queries whose goal is in another connected component return (None, empty)
+    without searching
+    """
+    algorithm_name = resolve_algorithm(algorithm_name)
+    params = {**DEFAULT_PARAMS.get(algorithm_name, {}), **params}
+    if unreachable(grid, start, goal):
+        return None, frozenset()
+    return ALGORITHMS[algorithm_name](grid, start, goal, visualizer=visualizer, **params)
+
+
+def make_stepper(algorithm_name, grid, start, goal, visualizer=None, deadline=None, **params):
+    """
+    Start an algorithm by name as a SearchStepper that can be advanced a few
+    expansions at a time, paused, resumed or abandoned
+    """
+    algorithm_name = resolve_algorithm(algorithm_name)
+    params = {**DEFAULT_PARAMS.get(algorithm_name, {}), **params}
+    if unreachable(grid, start, goal):
+        return SearchStepper(_rejected(), deadline)
+    steps = STEPPERS[algorithm_name](grid, start, goal, visualizer=visualizer, **params)
+    return SearchStepper(steps, deadline)
@@ -1,35 +1,144 @@
 """Breadth-First Search (BFS) Algorithm"""
 from collections import deque
-from utils.grid_utils import Node, get_neighbors, reconstruct_path
+from time import perf_counter
+from algorithms.stepper import run_steps
+from algorithms.tiled import tiled_bfs_steps
+from algorithms.wavefront import wavefront_bfs, wavefront_steps
+from utils.adjacency import get_adjacency
+from utils.grid_utils import as_grid
+from utils.search_state import SearchState, NO_PARENT, goal_steps, multi_query, out_of_bounds
+from utils.trace import EXPANDED, PUSHED, FOUND, make_emitter
 
 
-def bfs(grid, start, goal, visualizer=None):
+def bfs(grid, start, goal, visualizer=None, backend="queue", trace=None, stats=None):
     """
     Breadth-First Search algorithm
     Uses a queue (FIFO) to explore nodes level by level
+    backend="wavefront" expands whole layers at once with NumPy instead
+    Tiled grids (utils.tiled_grid) are searched with their tiles paged in on demand
+    Step events go to the visualizer and/or trace; counters and timers go to stats
     """
-    start_node = Node(start[0], start[1])
-    goal_node = Node(goal[0], goal[1])
-    
-    queue = deque([start_node])
-    visited = {start_node}
-    
+    if backend == "wavefront":
+        # Run layer by layer: the per-cell steps are only needed when stepping
+        return wavefront_bfs(grid, start, goal, visualizer, trace, stats)
+    return run_steps(bfs_steps(grid, start, goal, visualizer, backend, trace, stats))
+
+
+def bfs_steps(grid, start, goal, visualizer=None, backend="queue", trace=None, stats=None):
+    """
+    Resumable BFS: a generator that yields after every expansion and returns
+    the same (path, visited) pair as bfs
+    """
+    if backend == "wavefront":
+        return (yield from wavefront_steps(grid, start, goal, visualizer, trace, stats))
+    if backend != "queue":
+        raise ValueError(f"Unknown BFS backend: {backend}")
+    if getattr(grid, 'paged', False):
+        return (yield from tiled_bfs_steps(grid, start, goal, visualizer, trace, stats))
+
+    grid = as_grid(grid)
+    if out_of_bounds(grid, start, goal):
+        return None, frozenset()
+    goal_id = grid.cell_id(*goal)
+    state = SearchState(grid, with_cost=False)
+
+    emit = make_emitter(visualizer, trace)
+    if stats is not None:
+        emit = stats.wrap_emit(emit)
+    if (yield from _bfs_search(grid, [grid.cell_id(*start)], goal_id, state, emit, stats)):
+        return state.reconstruct_path(goal_id), state.visited_cells()
+    return None, state.visited_cells()  # No path found
+
+
+def bfs_tree(grid, source):
+    """
+    Full BFS from source with no goal
+    Returns a SearchState whose parent array is the BFS tree and whose cost array
+    holds the number of moves to every reachable cell
+    """
+    grid = as_grid(grid)
+    state = SearchState(grid)
+    run_steps(_bfs_search(grid, [grid.cell_id(*source)], NO_PARENT, state))
+    return state
+
+
+def bfs_multi(grid, sources, goals, k=None, visualizer=None, trace=None, stats=None):
+    """
+    One BFS from all sources at once that stops when k goals (all by default)
+    are reached
+    Returns ({goal: path}, visited), goals in the order they were reached; each
+    path starts at the source closest to its goal. Unreachable goals are left out
+    """
+    return run_steps(bfs_multi_steps(grid, sources, goals, k, visualizer, trace, stats))
+
+
+def bfs_multi_steps(grid, sources, goals, k=None, visualizer=None, trace=None, stats=None):
+    """Resumable bfs_multi: yields after every expansion, returns (paths, visited)"""
+    grid = as_grid(grid)
+    start_ids, goal_ids, k = multi_query(grid, sources, goals, k)
+    state = SearchState(grid, with_cost=False)
+
+    emit = make_emitter(visualizer, trace)
+    if stats is not None:
+        emit = stats.wrap_emit(emit)
+    search = _bfs_search(grid, start_ids, NO_PARENT, state, emit, stats)
+    return (yield from goal_steps(search, state, goal_ids, k, emit))
+
+
+def _bfs_search(grid, start_ids, goal_id, state, emit=None, stats=None):
+    """
+    BFS loop over cell ids from every cell of start_ids; yields each expanded
+    cell, fills state and returns True once goal_id is reached
+    (goal_id == NO_PARENT explores everything reachable)
+    """
+    adjacency = get_adjacency(grid)
+    offsets, targets = adjacency.offsets, adjacency.targets
+    visited, parent, cost = state.visited, state.parent, state.cost
+
+    queue = deque(start_ids)
+    for start_id in start_ids:
+        state.mark(start_id)
+        if cost is not None:
+            cost[start_id] = 0
+        if stats is not None:
+            stats.record_push(perf_counter(), len(queue))
+        if emit is not None:
+            emit(PUSHED, start_id)
+
     while queue:
+        if stats is not None:
+            began = perf_counter()
         current = queue.popleft()
-        
-        # Visualize current state
-        if visualizer:
-            frontier = list(queue)
-            visualizer.update(current, frontier, visited)
-        
+        if stats is not None:
+            stats.record_pop(began)
+        if emit is not None:
+            emit(EXPANDED, current)
+
         # Check if goal reached
-        if current == goal_node:
-            return reconstruct_path(current), visited
-        
+        if current == goal_id:
+            if emit is not None:
+                emit(FOUND, current)
+            return True
+
         # Explore neighbors
-        for neighbor in get_neighbors(current, grid):
-            if neighbor not in visited:
-                visited.add(neighbor)
+        if stats is not None:
+            stats.begin_neighbors()
+        for k in range(offsets[current], offsets[current + 1]):
+            neighbor = targets[k]
+            if not visited[neighbor >> 3] >> (neighbor & 7) & 1:
+                visited[neighbor >> 3] |= 1 << (neighbor & 7)
+                parent[neighbor] = current
+                if cost is not None:
+                    cost[neighbor] = cost[current] + 1
+                if stats is not None:
+                    began = perf_counter()
                 queue.append(neighbor)
-    
-    return None, visited  # No path found
+                if stats is not None:
+                    stats.record_push(began, len(queue))
+                if emit is not None:
+                    emit(PUSHED, neighbor)
+        if stats is not None:
+            stats.end_neighbors()
+        yield current
+
+    return False
@@ -1,94 +1,341 @@
-"""Bidirectional Search Algorithm"""
+"""Bidirectional Search Algorithms (breadth-first and uniform-cost)"""
+import heapq
 from collections import deque
-from utils.grid_utils import Node, get_neighbors, reconstruct_path
+from time import perf_counter
+from algorithms.bfs import bfs_steps
+from algorithms.parallel_bidirectional import parallel_bidirectional_steps
+from algorithms.stepper import run_steps
+from algorithms.ucs import ucs_steps
+from utils.adjacency import get_adjacency
+from utils.grid_utils import MOVES_REVERSIBLE, as_grid
+from utils.search_state import SearchState, NO_PARENT, INF, out_of_bounds
+from utils.trace import EXPANDED, PUSHED, FOUND, make_emitter
 
+# The backward searches walk edges in reverse using the forward adjacency,
+# which is only valid while every move's opposite move exists at the same cost.
+# Otherwise both searches fall back to their one-directional versions
 
-def bidirectional_search(grid, start, goal, visualizer=None):
+
+def bidirectional_search(grid, start, goal, visualizer=None, trace=None, stats=None,
+                         balanced=True, backend="serial"):
     """
     Bidirectional Search algorithm
     Searches from both start and goal simultaneously
+    balanced=True expands a whole layer of the smaller frontier at a time and
+    stops as soon as a generated cell is known to the other side;
+    balanced=False alternates single expansions and checks for a meeting on pop.
+    backend="parallel" runs the two sides on separate processes instead (see
+    algorithms/parallel_bidirectional.py; balanced does not apply)
     """
-    start_node = Node(start[0], start[1])
-    goal_node = Node(goal[0], goal[1])
-    
+    return run_steps(bidirectional_steps(grid, start, goal, visualizer, trace, stats, balanced,
+                                         backend))
+
+
+def bidirectional_steps(grid, start, goal, visualizer=None, trace=None, stats=None,
+                        balanced=True, backend="serial"):
+    """Resumable bidirectional search: yields after every expansion"""
+    if backend == "parallel":
+        return (yield from parallel_bidirectional_steps(grid, start, goal, visualizer, trace, stats))
+    if backend != "serial":
+        raise ValueError(f"Unknown bidirectional backend: {backend}")
+    if not MOVES_REVERSIBLE:
+        return (yield from bfs_steps(grid, start, goal, visualizer, trace=trace, stats=stats))
+    grid = as_grid(grid)
+    if out_of_bounds(grid, start, goal):
+        return None, frozenset()
+    start_id = grid.cell_id(*start)
+    goal_id = grid.cell_id(*goal)
+
+    adjacency = get_adjacency(grid)
+    emit = make_emitter(visualizer, trace)
+    if stats is not None:
+        emit = stats.wrap_emit(emit)
+
     # Forward search (from start)
-    queue_forward = deque([start_node])
-    visited_forward = {start_node: start_node}
-    
+    queue_forward = deque([start_id])
+    state_forward = SearchState(grid, with_cost=False)
+    state_forward.mark(start_id)
+
     # Backward search (from goal)
-    queue_backward = deque([goal_node])
-    visited_backward = {goal_node: goal_node}
-    
+    queue_backward = deque([goal_id])
+    state_backward = SearchState(grid, with_cost=False)
+    state_backward.mark(goal_id)
+    if stats is not None:
+        stats.record_push(perf_counter(), 1)
+        stats.record_push(perf_counter(), 1)
+    if emit is not None:
+        emit(PUSHED, start_id)
+        emit(PUSHED, goal_id)
+
+    def all_visited():
+        return state_forward.visited_cells().union(state_backward.visited_cells())
+
+    if start_id == goal_id:
+        if emit is not None:
+            emit(FOUND, start_id)
+        return state_forward.reconstruct_path(start_id), all_visited()
+
+    if balanced:
+        meeting = yield from _balanced_layers(adjacency, queue_forward, state_forward,
+                                              queue_backward, state_backward, emit, stats)
+        if meeting is None:
+            return None, all_visited()
+        if emit is not None:
+            emit(FOUND, meeting)
+        return merge_paths(meeting, state_forward, state_backward), all_visited()
+
     while queue_forward and queue_backward:
         # Forward step
         if queue_forward:
+            if stats is not None:
+                began = perf_counter()
             current_forward = queue_forward.popleft()
-            
+            if stats is not None:
+                stats.record_pop(began)
+
             # Check if forward search met backward search
-            if current_forward in visited_backward:
-                return merge_paths(current_forward, visited_forward, visited_backward), \
-                       set(visited_forward.keys()) | set(visited_backward.keys())
-            
-            # Visualize
-            if visualizer:
-                all_frontier = list(queue_forward) + list(queue_backward)
-                all_visited = set(visited_forward.keys()) | set(visited_backward.keys())
-                visualizer.update(current_forward, all_frontier, all_visited)
-            
+            if state_backward.is_visited(current_forward):
+                if emit is not None:
+                    emit(FOUND, current_forward)
+                return merge_paths(current_forward, state_forward, state_backward), all_visited()
+
             # Explore neighbors
-            for neighbor in get_neighbors(current_forward, grid):
-                if neighbor not in visited_forward:
-                    visited_forward[neighbor] = current_forward
-                    queue_forward.append(neighbor)
-        
+            _expand(adjacency, current_forward, state_forward, queue_forward, emit, stats)
+            yield current_forward
+
         # Backward step
         if queue_backward:
+            if stats is not None:
+                began = perf_counter()
             current_backward = queue_backward.popleft()
-            
+            if stats is not None:
+                stats.record_pop(began)
+
             # Check if backward search met forward search
-            if current_backward in visited_forward:
-                return merge_paths(current_backward, visited_forward, visited_backward), \
-                       set(visited_forward.keys()) | set(visited_backward.keys())
-            
-            # Visualize
-            if visualizer:
-                all_frontier = list(queue_forward) + list(queue_backward)
-                all_visited = set(visited_forward.keys()) | set(visited_backward.keys())
-                visualizer.update(current_backward, all_frontier, all_visited)
-            
+            if state_forward.is_visited(current_backward):
+                if emit is not None:
+                    emit(FOUND, current_backward)
+                return merge_paths(current_backward, state_forward, state_backward), all_visited()
+
             # Explore neighbors
-            for neighbor in get_neighbors(current_backward, grid):
-                if neighbor not in visited_backward:
-                    visited_backward[neighbor] = current_backward
-                    queue_backward.append(neighbor)
-    
-    return None, set(visited_forward.keys()) | set(visited_backward.keys())
+            _expand(adjacency, current_backward, state_backward, queue_backward, emit, stats)
+            yield current_backward
 
+    return None, all_visited()
 
-def merge_paths(meeting_point, visited_forward, visited_backward):
+
+def _balanced_layers(adjacency, queue_forward, state_forward, queue_backward, state_backward,
+                     emit=None, stats=None):
     """
-    Merge paths from forward and backward searches
+    Expand whole layers, always on the side with the smaller frontier
+    Returns the meeting cell, or None if either side runs out of cells. The
+    first cell generated by one side that the other side already knows lies
+    on a shortest path: the other side's cells closer to its root than its
+    current layer have all been expanded, so a meeting through them would
+    have been found when they generated this side's cells
+    """
+    offsets, targets = adjacency.offsets, adjacency.targets
+    while queue_forward and queue_backward:
+        if len(queue_forward) <= len(queue_backward):
+            queue, state, other = queue_forward, state_forward, state_backward
+        else:
+            queue, state, other = queue_backward, state_backward, state_forward
+        visited, parent, other_visited = state.visited, state.parent, other.visited
+
+        for _ in range(len(queue)):
+            if stats is not None:
+                began = perf_counter()
+            current = queue.popleft()
+            if stats is not None:
+                stats.record_pop(began)
+            if emit is not None:
+                emit(EXPANDED, current)
+
+            # Explore neighbors
+            if stats is not None:
+                stats.begin_neighbors()
+            for k in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[k]
+                if visited[neighbor >> 3] >> (neighbor & 7) & 1:
+                    continue
+                visited[neighbor >> 3] |= 1 << (neighbor & 7)
+                parent[neighbor] = current
+
+                # Check if this side met the other one
+                if other_visited[neighbor >> 3] >> (neighbor & 7) & 1:
+                    if stats is not None:
+                        stats.end_neighbors()
+                    return neighbor
+
+                if stats is not None:
+                    began = perf_counter()
+                queue.append(neighbor)
+                if stats is not None:
+                    stats.record_push(began, len(queue))
+                if emit is not None:
+                    emit(PUSHED, neighbor)
+            if stats is not None:
+                stats.end_neighbors()
+            yield current
+    return None
+
+
+def _expand(adjacency, current, state, queue, emit=None, stats=None):
+    """Push the unvisited neighbors of current for one search direction"""
+    if emit is not None:
+        emit(EXPANDED, current)
+    if stats is not None:
+        stats.begin_neighbors()
+    visited, parent = state.visited, state.parent
+    targets = adjacency.targets
+    for k in range(adjacency.offsets[current], adjacency.offsets[current + 1]):
+        neighbor = targets[k]
+        if not visited[neighbor >> 3] >> (neighbor & 7) & 1:
+            visited[neighbor >> 3] |= 1 << (neighbor & 7)
+            parent[neighbor] = current
+            if stats is not None:
+                began = perf_counter()
+            queue.append(neighbor)
+            if stats is not None:
+                stats.record_push(began, len(queue))
+            if emit is not None:
+                emit(PUSHED, neighbor)
+    if stats is not None:
+        stats.end_neighbors()
+
+
+def bidirectional_ucs(grid, start, goal, visualizer=None, trace=None, stats=None):
     """
-    # Build forward path
-    path_forward = []
-    current = meeting_point
-    while current is not None:
-        path_forward.append((current.row, current.col))
-        parent = visited_forward.get(current)
-        if parent == current:  
+    Bidirectional Uniform Cost Search
+    Runs UCS from start and, over reversed moves, from goal, always advancing
+    the side with the smaller priority queue. mu is the cost of the best
+    start-goal path seen so far through a cell reached by both sides; the
+    search stops once the two smallest queued costs add up to at least mu,
+    since any cheaper path would have to leave both queues below them
+    """
+    return run_steps(bidirectional_ucs_steps(grid, start, goal, visualizer, trace, stats))
+
+
+def bidirectional_ucs_steps(grid, start, goal, visualizer=None, trace=None, stats=None):
+    """Resumable bidirectional UCS: yields after every expansion"""
+    if not MOVES_REVERSIBLE:
+        return (yield from ucs_steps(grid, start, goal, visualizer, trace, stats))
+    grid = as_grid(grid)
+    if out_of_bounds(grid, start, goal):
+        return None, frozenset()
+    start_id = grid.cell_id(*start)
+    goal_id = grid.cell_id(*goal)
+
+    adjacency = get_adjacency(grid)
+    offsets, targets = adjacency.offsets, adjacency.targets
+    moves, move_costs = adjacency.moves, adjacency.move_costs
+    emit = make_emitter(visualizer, trace)
+    if stats is not None:
+        emit = stats.wrap_emit(emit)
+
+    # The visited bitsets are the closed sets; cost holds each side's best known cost
+    state_forward = SearchState(grid)
+    state_backward = SearchState(grid)
+    state_forward.cost[start_id] = 0
+    state_backward.cost[goal_id] = 0
+
+    # Priority queues: (cost, counter, cell)
+    counter = 0
+    queue_forward = [(0, counter, start_id)]
+    queue_backward = [(0, counter, goal_id)]
+    if stats is not None:
+        stats.record_push(perf_counter(), 1)
+        stats.record_push(perf_counter(), 1)
+    if emit is not None:
+        emit(PUSHED, start_id)
+        emit(PUSHED, goal_id)
+
+    best_cost, meeting = INF, None  # mu and the cell it goes through
+    if start_id == goal_id:
+        best_cost, meeting = 0, start_id
+
+    while queue_forward and queue_backward:
+        # Drop entries of already settled cells so that the tops are real costs
+        for queue, state in ((queue_forward, state_forward), (queue_backward, state_backward)):
+            visited = state.visited
+            while queue and visited[queue[0][2] >> 3] >> (queue[0][2] & 7) & 1:
+                if stats is not None:
+                    began = perf_counter()
+                heapq.heappop(queue)
+                if stats is not None:
+                    stats.frontier_time += perf_counter() - began
+                    stats.stale_pops += 1
+        if not queue_forward or not queue_backward:
+            break
+
+        # Stopping rule
+        if queue_forward[0][0] + queue_backward[0][0] >= best_cost:
             break
-        current = parent
-    path_forward.reverse()
-    
-    # Build backward path
+
+        if len(queue_forward) <= len(queue_backward):
+            queue, state, other = queue_forward, state_forward, state_backward
+        else:
+            queue, state, other = queue_backward, state_backward, state_forward
+        visited, parent, cost_so_far = state.visited, state.parent, state.cost
+        other_cost = other.cost
+
+        if stats is not None:
+            began = perf_counter()
+        current_cost, _, current = heapq.heappop(queue)
+        visited[current >> 3] |= 1 << (current & 7)
+        if stats is not None:
+            stats.record_pop(began)
+        if emit is not None:
+            emit(EXPANDED, current)
+
+        # Explore neighbors
+        if stats is not None:
+            stats.begin_neighbors()
+        for k in range(offsets[current], offsets[current + 1]):
+            neighbor = targets[k]
+            new_cost = current_cost + move_costs[moves[k]]
+
+            if new_cost < cost_so_far[neighbor]:
+                if stats is not None:
+                    duplicate = cost_so_far[neighbor] != INF
+                    began = perf_counter()
+                cost_so_far[neighbor] = new_cost
+                parent[neighbor] = current
+                counter += 1
+                heapq.heappush(queue, (new_cost, counter, neighbor))
+                if stats is not None:
+                    stats.record_push(began, len(queue), duplicate)
+                if emit is not None:
+                    emit(PUSHED, neighbor)
+
+                # A cheaper start-goal path through neighbor?
+                if new_cost + other_cost[neighbor] < best_cost:
+                    best_cost, meeting = new_cost + other_cost[neighbor], neighbor
+        if stats is not None:
+            stats.end_neighbors()
+        yield current
+
+    all_visited = state_forward.visited_cells().union(state_backward.visited_cells())
+    if meeting is None:
+        return None, all_visited
+    if emit is not None:
+        emit(FOUND, meeting)
+    return merge_paths(meeting, state_forward, state_backward), all_visited
+
+
+def merge_paths(meeting_point, state_forward, state_backward):
+    """
+    Merge paths from forward and backward searches
+    """
+    # Build forward path (start -> meeting point)
+    path_forward = state_forward.reconstruct_path(meeting_point)
+
+    # Build backward path (after the meeting point -> goal)
+    width = state_backward.grid.width
     path_backward = []
-    current = visited_backward.get(meeting_point)
-    if current != meeting_point: 
-        while current is not None:
-            path_backward.append((current.row, current.col))
-            parent = visited_backward.get(current)
-            if parent == current: 
-                break
-            current = parent
-    
+    current = state_backward.parent[meeting_point]
+    while current != NO_PARENT:
+        path_backward.append(divmod(current, width))
+        current = state_backward.parent[current]
+
     return path_forward + path_backward
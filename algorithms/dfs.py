@@ -1,35 +1,76 @@
 """Depth-First Search (DFS) Algorithm"""
-from utils.grid_utils import Node, get_neighbors, reconstruct_path
+from time import perf_counter
+from algorithms.stepper import run_steps
+from utils.adjacency import get_adjacency
+from utils.grid_utils import as_grid
+from utils.search_state import SearchState, out_of_bounds
+from utils.trace import EXPANDED, PUSHED, FOUND, make_emitter
 
 
-def dfs(grid, start, goal, visualizer=None):
+def dfs(grid, start, goal, visualizer=None, trace=None, stats=None):
     """
     Depth-First Search algorithm
     Uses a stack (LIFO) to explore nodes depth-first
     """
-    start_node = Node(start[0], start[1])
-    goal_node = Node(goal[0], goal[1])
-    
-    stack = [start_node]
-    visited = {start_node}
-    
+    return run_steps(dfs_steps(grid, start, goal, visualizer, trace, stats))
+
+
+def dfs_steps(grid, start, goal, visualizer=None, trace=None, stats=None):
+    """Resumable DFS: yields after every expansion, returns (path, visited)"""
+    grid = as_grid(grid)
+    if out_of_bounds(grid, start, goal):
+        return None, frozenset()
+    start_id = grid.cell_id(*start)
+    goal_id = grid.cell_id(*goal)
+
+    adjacency = get_adjacency(grid)
+    offsets, targets = adjacency.offsets, adjacency.targets
+
+    state = SearchState(grid, with_cost=False)
+    visited, parent = state.visited, state.parent
+    emit = make_emitter(visualizer, trace)
+    if stats is not None:
+        emit = stats.wrap_emit(emit)
+
+    stack = [start_id]
+    state.mark(start_id)
+    if stats is not None:
+        stats.record_push(perf_counter(), 1)
+    if emit is not None:
+        emit(PUSHED, start_id)
+
     while stack:
+        if stats is not None:
+            began = perf_counter()
         current = stack.pop()
-        
-        # Visualize current state
-        if visualizer:
-            frontier = list(stack)
-            visualizer.update(current, frontier, visited)
-        
+        if stats is not None:
+            stats.record_pop(began)
+        if emit is not None:
+            emit(EXPANDED, current)
+
         # Check if goal reached
-        if current == goal_node:
-            return reconstruct_path(current), visited
-        
+        if current == goal_id:
+            if emit is not None:
+                emit(FOUND, current)
+            return state.reconstruct_path(current), state.visited_cells()
+
         # Explore neighbors
-        neighbors = get_neighbors(current, grid)
-        for neighbor in reversed(neighbors):
-            if neighbor not in visited:
-                visited.add(neighbor)
+        if stats is not None:
+            stats.begin_neighbors()
+        for k in range(offsets[current + 1] - 1, offsets[current] - 1, -1):
+            neighbor = targets[k]
+            if not visited[neighbor >> 3] >> (neighbor & 7) & 1:
+                visited[neighbor >> 3] |= 1 << (neighbor & 7)
+                parent[neighbor] = current
+                if stats is not None:
+                    began = perf_counter()
                 stack.append(neighbor)
-    
-    return None, visited  # No path found
+                if stats is not None:
+                    stats.record_push(began, len(stack))
+                if emit is not None:
+                    emit(PUSHED, neighbor)
+        if stats is not None:
+            stats.end_neighbors()
+        yield current
+
+    return None, state.visited_cells()  # No path found
@@ -0,0 +1,131 @@
+"""Single-source distance-field cache with memory-bounded LRU eviction"""
+from collections import OrderedDict
+from algorithms.bfs import bfs_tree
+from algorithms.ucs import ucs_tree
+from utils.grid_utils import MOVES, MOVES_REVERSIBLE, as_grid
+from utils.search_state import INF, out_of_bounds
+
+# Algorithms whose single-source trees can be cached, and their cost models
+TREE_BUILDERS = {
+    "BFS": bfs_tree,
+    "UCS": ucs_tree,
+}
+COST_MODELS = {
+    "BFS": "unit",
+    "UCS": tuple(cost for _, _, cost in MOVES),
+}
+
+
+class DistanceField:
+    """Parent and cost arrays of a complete single-source search"""
+    def __init__(self, source, state):
+        self.source = source
+        self.state = state
+        self.nbytes = sum(a.itemsize * len(a) for a in (state.parent, state.cost))
+        self.reached = len(state.visited_cells())
+
+    def cost_to(self, cell):
+        cost = self.state.cost[cell]
+        return None if cost == INF else cost
+
+    def path_to(self, cell):
+        """Path from the source to cell, or None if cell is unreachable"""
+        if self.state.cost[cell] == INF:
+            return None
+        return self.state.reconstruct_path(cell)
+
+
+class DistanceFieldCache:
+    """
+    LRU cache of DistanceFields keyed by
+    (grid fingerprint, source, algorithm, cost model)
+    The total size of the cached arrays is kept under max_bytes
+    """
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.cells_explored = 0  # Cells expanded by all searches run on misses
+        self._fields = OrderedDict()
+
+    def __len__(self):
+        return len(self._fields)
+
+    def get(self, key):
+        field = self._fields.get(key)
+        if field is not None:
+            self._fields.move_to_end(key)
+        return field
+
+    def put(self, key, field):
+        if field.nbytes > self.max_bytes:
+            return  # Larger than the whole budget; never cached
+        old = self._fields.pop(key, None)
+        if old is not None:
+            self.current_bytes -= old.nbytes
+        self._fields[key] = field
+        self.current_bytes += field.nbytes
+        while self.current_bytes > self.max_bytes:
+            _, evicted = self._fields.popitem(last=False)
+            self.current_bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def clear(self):
+        self._fields.clear()
+        self.current_bytes = 0
+
+    def stats(self):
+        return {
+            "entries": len(self._fields),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "cells_explored": self.cells_explored,
+        }
+
+    def field(self, grid, source, algorithm="BFS"):
+        """DistanceField from source, computed on a miss"""
+        grid = as_grid(grid)
+        key = _key(grid, source, algorithm)
+        field = self.get(key)
+        if field is None:
+            self.misses += 1
+            field = DistanceField(tuple(source), TREE_BUILDERS[algorithm](grid, source))
+            self.cells_explored += field.reached
+            self.put(key, field)
+        else:
+            self.hits += 1
+        return field
+
+    def path(self, grid, start, goal, algorithm="BFS"):
+        """
+        Shortest (path, cost) from start to goal using cached fields
+        A field rooted at goal is reused too when moves are reversible; otherwise
+        the field from start is computed. Returns (None, None) if unreachable
+        """
+        grid = as_grid(grid)
+        if algorithm not in TREE_BUILDERS:
+            raise ValueError(f"Distance fields are not available for {algorithm}")
+        if out_of_bounds(grid, start, goal):
+            return None, None
+
+        if MOVES_REVERSIBLE and self.get(_key(grid, start, algorithm)) is None:
+            field = self.get(_key(grid, goal, algorithm))
+            if field is not None:
+                self.hits += 1
+                path = field.path_to(grid.cell_id(*start))
+                if path is None:
+                    return None, None
+                return path[::-1], field.cost_to(grid.cell_id(*start))
+
+        field = self.field(grid, start, algorithm)
+        goal_id = grid.cell_id(*goal)
+        return field.path_to(goal_id), field.cost_to(goal_id)
+
+
+def _key(grid, source, algorithm):
+    return (grid.fingerprint(), tuple(source), algorithm, COST_MODELS[algorithm])
@@ -1,56 +1,179 @@
 """Depth-Limited Search (DLS) Algorithm"""
-from utils.grid_utils import Node, get_neighbors, reconstruct_path
+from array import array
+from time import perf_counter
+from algorithms.stepper import run_steps
+from utils.adjacency import get_adjacency
+from utils.grid_utils import as_grid
+from utils.search_state import SearchState, out_of_bounds
+from utils.trace import EXPANDED, PUSHED, POPPED, FOUND, RESTART, make_emitter
 
-def dls_recursive(current, goal_node, grid, depth_limit, visited, visualizer=None, frontier=None):
+# Depth-table value of a cell not reached yet in the current search
+UNREACHED_DEPTH = 2 ** 31 - 1
+
+
+def dls_search(grid, start_id, goal_id, depth_limit, state, emit=None, stats=None):
     """
-    Recursive helper for DLS
+    Iterative DLS over cell ids with an explicit stack
+    A generator that yields after every expansion and returns the path, "cutoff"
+    if the depth limit pruned some branch, or None if no path exists at all
+
+    As in dfs, an expanded cell claims all its unclaimed neighbors before the
+    search descends into any of them, and every cell is expanded at most once.
+    A depth table records the depth each cell was claimed at. Re-expanding
+    cells that are later reached shallower would make the search complete
+    within the limit, but in depth-first order that happens over and over
+    (about 70 expansions per cell on an open 200x200 grid with a limit of
+    1000). Instead, if the limit cut the search off and some cell was reached
+    shallower than it was claimed, a breadth-first pass to the depth limit
+    settles the query, so a path is found whenever one fits the limit and no
+    cell is expanded more than twice
     """
-    if frontier is None:
-        frontier = []
-    
-    # Visualize current state
-    if visualizer:
-        visualizer.update(current, frontier, visited)
-    
-    # Check if goal reached
-    if current == goal_node:
-        return reconstruct_path(current)
-    
-    # Check depth limit
-    if depth_limit == 0:
-        return "cutoff"
-    
-    visited.add(current)
+    adjacency = get_adjacency(grid)
+    offsets, targets = adjacency.offsets, adjacency.targets
+    parent = state.parent
+    best_depth = array('i', [UNREACHED_DEPTH]) * grid.size
+
+    # The stack holds claimed cells, depths the depth each was claimed at
+    best_depth[start_id] = 0
+    stack = [start_id]
+    depths = [0]
     cutoff_occurred = False
-    
-    # Explore neighbors
-    for neighbor in get_neighbors(current, grid):
-        if neighbor not in visited:
-            frontier.append(neighbor)
-            result = dls_recursive(neighbor, goal_node, grid, depth_limit - 1, visited, visualizer, frontier)
-            frontier.remove(neighbor)
-            
-            if result == "cutoff":
-                cutoff_occurred = True
-            elif result is not None:
-                return result
-    
-    if cutoff_occurred:
-        return "cutoff"
-    return None
-
-
-def dls(grid, start, goal, depth_limit=15, visualizer=None):
+    reached_shallower = False
+
+    while stack:
+        if stats is not None:
+            began = perf_counter()
+        current = stack.pop()
+        depth = depths.pop()
+        state.mark(current)
+        if stats is not None:
+            stats.record_pop(began)
+        if emit is not None:
+            emit(EXPANDED, current)
+
+        # Check if goal reached
+        if current == goal_id:
+            if emit is not None:
+                emit(FOUND, current)
+            return state.reconstruct_path(current)
+
+        # Check depth limit
+        if depth >= depth_limit:
+            cutoff_occurred = True
+            if emit is not None:
+                emit(POPPED, current)
+            yield current
+            continue
+
+        # Claim neighbors; pushed in reverse so they are explored in DIRECTIONS order
+        if stats is not None:
+            stats.begin_neighbors()
+        depth += 1
+        for k in range(offsets[current + 1] - 1, offsets[current] - 1, -1):
+            neighbor = targets[k]
+            claimed = best_depth[neighbor]
+            if claimed == UNREACHED_DEPTH:
+                best_depth[neighbor] = depth
+                parent[neighbor] = current
+                if stats is not None:
+                    began = perf_counter()
+                stack.append(neighbor)
+                depths.append(depth)
+                if stats is not None:
+                    stats.record_push(began, len(stack))
+                if emit is not None:
+                    emit(PUSHED, neighbor)
+            elif claimed > depth:
+                reached_shallower = True
+        if stats is not None:
+            stats.end_neighbors()
+        yield current
+
+    if not cutoff_occurred:
+        return None  # Every reachable cell was expanded
+    if not reached_shallower:
+        return "cutoff"  # Every cell was claimed at its shallowest depth
+
+    if emit is not None:
+        emit(RESTART, 0)
+    return (yield from _layered_search(grid, start_id, goal_id, depth_limit, state, emit, stats))
+
+
+def _layered_search(grid, start_id, goal_id, depth_limit, state, emit=None, stats=None):
+    """
+    Breadth-first pass from start_id to depth_limit, with dls_search's
+    generator contract; every cell is claimed at its shallowest depth
+    """
+    adjacency = get_adjacency(grid)
+    offsets, targets = adjacency.offsets, adjacency.targets
+    parent = state.parent
+    claimed = bytearray(grid.size)
+
+    claimed[start_id] = 1
+    layer = [start_id]
+    if stats is not None:
+        stats.record_push(perf_counter(), 1)
+    for depth in range(depth_limit + 1):
+        next_layer = []
+        for current in layer:
+            state.mark(current)
+            if stats is not None:
+                stats.expansions += 1
+            if emit is not None:
+                emit(EXPANDED, current)
+
+            # Check if goal reached
+            if current == goal_id:
+                if emit is not None:
+                    emit(FOUND, current)
+                return state.reconstruct_path(current)
+
+            if depth < depth_limit:
+                if stats is not None:
+                    stats.begin_neighbors()
+                for k in range(offsets[current], offsets[current + 1]):
+                    neighbor = targets[k]
+                    if not claimed[neighbor]:
+                        claimed[neighbor] = 1
+                        parent[neighbor] = current
+                        next_layer.append(neighbor)
+                        if stats is not None:
+                            stats.record_push(perf_counter(), len(next_layer))
+                        if emit is not None:
+                            emit(PUSHED, neighbor)
+                if stats is not None:
+                    stats.end_neighbors()
+            yield current
+        if depth == depth_limit:
+            return "cutoff"  # The cells at the limit were not expanded further
+        if not next_layer:
+            return None
+        layer = next_layer
+
+
+def dls(grid, start, goal, depth_limit=15, visualizer=None, trace=None, stats=None):
     """
     Depth-Limited Search algorithm
     DFS with a maximum depth limit
     """
-    start_node = Node(start[0], start[1])
-    goal_node = Node(goal[0], goal[1])
-    
-    visited = set()
-    result = dls_recursive(start_node, goal_node, grid, depth_limit, visited, visualizer)
-    
+    return run_steps(dls_steps(grid, start, goal, depth_limit, visualizer, trace, stats))
+
+
+def dls_steps(grid, start, goal, depth_limit=15, visualizer=None, trace=None, stats=None):
+    """Resumable DLS: yields after every expansion, returns (path, visited)"""
+    grid = as_grid(grid)
+    if out_of_bounds(grid, start, goal):
+        return None, frozenset()
+    start_id = grid.cell_id(*start)
+    goal_id = grid.cell_id(*goal)
+
+    state = SearchState(grid, with_cost=False)
+    emit = make_emitter(visualizer, trace)
+    if stats is not None:
+        emit = stats.wrap_emit(emit)
+        stats.record_push(perf_counter(), 1)
+    result = yield from dls_search(grid, start_id, goal_id, depth_limit, state, emit, stats)
+
     if result == "cutoff" or result is None:
-        return None, visited
-    return result, visited
+        return None, state.visited_cells()
+    return result, state.visited_cells()
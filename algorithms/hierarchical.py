@@ -0,0 +1,438 @@
+"""Hierarchical search over a cluster abstraction of the grid (HPA*-style, without a heuristic)"""
+import heapq
+import weakref
+from collections import OrderedDict
+from time import perf_counter
+from algorithms.stepper import run_steps
+from algorithms.ucs import ucs_steps
+from utils.grid_utils import MOVES, MOVES_REVERSIBLE, WALL, as_grid
+from utils.search_state import NO_PARENT, INF
+from utils.trace import EXPANDED, PUSHED, FOUND, make_emitter
+
+DEFAULT_CLUSTER_SIZE = 16
+LONG_ENTRANCE = 6  # Entrances at least this wide get a transition at each end instead of one in the middle
+
+# Hierarchies built by hierarchical_search, per grid and cluster size, and the
+# most recent ones by (grid fingerprint, cluster size): list-of-lists grids
+# become a new Grid on every call, which then finds the hierarchy by content
+HIERARCHY_CACHE_SIZE = 8
+_hierarchies = weakref.WeakKeyDictionary()
+_by_fingerprint = OrderedDict()
+
+
+class ClusterHierarchy:
+    """
+    Abstract graph over square clusters of cluster_size x cluster_size cells
+    Every maximal run of open cells along the border between two clusters (an
+    entrance) gets one or two transitions: a crossing move whose two cells
+    become abstract nodes. Inside each cluster, UCS restricted to the cluster
+    gives the cost between every pair of its abstract nodes. A query connects
+    start and goal to the nodes of their clusters, searches the abstract graph,
+    then refines the route with UCS restricted to the clusters it passes
+    through, so only those clusters are searched at cell level. Paths are
+    near-optimal: the cheapest path may leave that corridor of clusters
+
+    With track_changes, wall changes are recorded through a grid listener and
+    only the clusters around changed cells are rebuilt, on the next query.
+    The grid is held weakly so that cached hierarchies do not keep it alive;
+    fingerprint is the grid's content hash when built, None once it changed
+    """
+    def __init__(self, grid, cluster_size=DEFAULT_CLUSTER_SIZE, track_changes=True):
+        if not MOVES_REVERSIBLE:
+            raise ValueError("cluster hierarchies need reversible moves")
+        grid = as_grid(grid)
+        self._grid = weakref.ref(grid)
+        self.cluster_size = cluster_size
+        self.clusters_x = -(-grid.width // cluster_size)
+        self.clusters_y = -(-grid.height // cluster_size)
+        self.clusters = self.clusters_x * self.clusters_y
+        self.fingerprint = grid.fingerprint()
+
+        self.transitions = [{} for _ in range(self.clusters)]  # Neighbor cluster -> [(u, v, cost)] leaving the cluster
+        self.exits = [{} for _ in range(self.clusters)]  # Node -> [(v, cost)] inter-cluster edges
+        self.entrances = [() for _ in range(self.clusters)]  # Sorted abstract nodes of the cluster
+        self.intra = [{} for _ in range(self.clusters)]  # Node -> [(node, cost)] inside the cluster
+        self.rebuilds = 0  # Clusters whose intra-cluster edges have been computed
+
+        self.pending = set()  # Changed cell ids not yet applied
+        self._tracking = track_changes
+        if track_changes:
+            grid.add_listener(self._on_change)
+
+        for cluster in range(self.clusters):
+            self._find_transitions(cluster)
+        for cluster in range(self.clusters):
+            self.entrances[cluster] = self._collect_entrances(cluster)
+            self._connect(cluster)
+
+    @property
+    def grid(self):
+        return self._grid()
+
+    def _on_change(self, cell, old, new):
+        self.pending.add(cell)
+        self.fingerprint = None
+
+    def adopt(self, grid):
+        """Serve grid, whose cells equal those this hierarchy was built for, after its own grid is gone"""
+        self._grid = weakref.ref(grid)
+        if self._tracking:
+            grid.add_listener(self._on_change)
+
+    def close(self):
+        """Stop listening to grid changes"""
+        grid = self.grid
+        if self._tracking and grid is not None:
+            grid.remove_listener(self._on_change)
+        self._tracking = False
+
+    def notify(self, cells):
+        """Report changed (row, col) cells (needed only when track_changes=False)"""
+        for row, col in cells:
+            self.pending.add(self.grid.cell_id(row, col))
+
+    def node_count(self):
+        return sum(len(nodes) for nodes in self.entrances)
+
+    def edge_count(self):
+        return sum(len(edges) for intra in self.intra for edges in intra.values()) + \
+            sum(len(edges) for exits in self.exits for edges in exits.values())
+
+    def cluster_of(self, cell):
+        row, col = divmod(cell, self.grid.width)
+        size = self.cluster_size
+        return (row // size) * self.clusters_x + col // size
+
+    def bounds(self, cluster):
+        """(first row, first col, end row, end col) of a cluster"""
+        grid, size = self.grid, self.cluster_size
+        cluster_row, cluster_col = divmod(cluster, self.clusters_x)
+        first_row, first_col = cluster_row * size, cluster_col * size
+        return first_row, first_col, min(grid.height, first_row + size), min(grid.width, first_col + size)
+
+    def _neighbor_clusters(self, cluster):
+        cluster_row, cluster_col = divmod(cluster, self.clusters_x)
+        for row in range(max(0, cluster_row - 1), min(self.clusters_y, cluster_row + 2)):
+            for col in range(max(0, cluster_col - 1), min(self.clusters_x, cluster_col + 2)):
+                if row != cluster_row or col != cluster_col:
+                    yield row * self.clusters_x + col
+
+    def _find_transitions(self, cluster):
+        """Group the moves leaving cluster into entrances and pick their transitions"""
+        grid, size = self.grid, self.cluster_size
+        width, height, cells = grid.width, grid.height, grid.cells
+        first_row, first_col, end_row, end_col = self.bounds(cluster)
+        cluster_row, cluster_col = divmod(cluster, self.clusters_x)
+
+        border = {(row, col) for row in (first_row, end_row - 1) for col in range(first_col, end_col)}
+        border.update((row, col) for col in (first_col, end_col - 1) for row in range(first_row, end_row))
+
+        # Crossing moves per neighbor cluster, as (position of u along the border,
+        # position of v along the border, u, v, cost)
+        crossings = {}
+        for row, col in border:
+            if cells[row * width + col] == WALL:
+                continue
+            for dr, dc, cost in MOVES:
+                new_row, new_col = row + dr, col + dc
+                if not (0 <= new_row < height and 0 <= new_col < width) \
+                        or (first_row <= new_row < end_row and first_col <= new_col < end_col) \
+                        or cells[new_row * width + new_col] == WALL:
+                    continue
+                if new_row // size == cluster_row:
+                    along = (row, new_row)  # Side by side: the border runs down a column
+                elif new_col // size == cluster_col:
+                    along = (col, new_col)  # Stacked: the border runs along a row
+                else:
+                    along = (0, 0)  # Diagonal neighbor: a single corner move
+                other = (new_row // size) * self.clusters_x + new_col // size
+                crossings.setdefault(other, []).append(
+                    (along[0], along[1], row * width + col, new_row * width + new_col, cost))
+
+        # Consecutive crossings whose cells are adjacent on both sides belong to
+        # the same entrance: any of them can reach the transition inside each cluster
+        transitions = {}
+        for other, moves in crossings.items():
+            moves.sort()
+            entrance = [moves[0]]
+            entrances = [entrance]
+            for previous, move in zip(moves, moves[1:]):
+                if move[0] - previous[0] > 1 or abs(move[1] - previous[1]) > 1:
+                    entrance = []
+                    entrances.append(entrance)
+                entrance.append(move)
+            chosen = []
+            for entrance in entrances:
+                if entrance[-1][0] - entrance[0][0] + 1 >= LONG_ENTRANCE:
+                    picks = (entrance[0], entrance[-1])
+                else:
+                    picks = (entrance[len(entrance) // 2],)
+                chosen.extend((u, v, cost) for _, _, u, v, cost in picks)
+            transitions[other] = chosen
+
+        self.transitions[cluster] = transitions
+        exits = {}
+        for chosen in transitions.values():
+            for u, v, cost in chosen:
+                exits.setdefault(u, []).append((v, cost))
+        self.exits[cluster] = exits
+
+    def _collect_entrances(self, cluster):
+        """Abstract nodes of cluster: transition cells on its side of every entrance"""
+        nodes = set(self.exits[cluster])
+        for other in self._neighbor_clusters(cluster):
+            for _, v, _ in self.transitions[other].get(cluster, ()):
+                nodes.add(v)
+        return tuple(sorted(nodes))
+
+    def _connect(self, cluster):
+        """Intra-cluster edges: UCS cost from every node of cluster to the others"""
+        nodes = self.entrances[cluster]
+        self.intra[cluster] = {}
+        self.rebuilds += 1
+        if len(nodes) < 2:
+            return
+
+        # Moves between the cluster's open cells, by local index, built once for all nodes
+        grid = self.grid
+        width, cells = grid.width, grid.cells
+        first_row, first_col, end_row, end_col = self.bounds(cluster)
+        local_width = end_col - first_col
+        count = (end_row - first_row) * local_width
+        edges = [()] * count
+        for row in range(first_row, end_row):
+            for col in range(first_col, end_col):
+                if cells[row * width + col] == WALL:
+                    continue
+                edges[(row - first_row) * local_width + col - first_col] = [
+                    ((row + dr - first_row) * local_width + col + dc - first_col, cost)
+                    for dr, dc, cost in MOVES
+                    if first_row <= row + dr < end_row and first_col <= col + dc < end_col
+                    and cells[(row + dr) * width + col + dc] != WALL]
+
+        local_nodes = [((node // width) - first_row) * local_width + node % width - first_col
+                       for node in nodes]
+        intra = self.intra[cluster]
+        for node, source in zip(nodes, local_nodes):
+            cost_so_far = [INF] * count
+            cost_so_far[source] = 0
+            queue = [(0, source)]
+            while queue:
+                current_cost, current = heapq.heappop(queue)
+                if current_cost > cost_so_far[current]:
+                    continue  # Stale entry
+                for neighbor, move_cost in edges[current]:
+                    new_cost = current_cost + move_cost
+                    if new_cost < cost_so_far[neighbor]:
+                        cost_so_far[neighbor] = new_cost
+                        heapq.heappush(queue, (new_cost, neighbor))
+            intra[node] = [(other, cost_so_far[local]) for other, local in zip(nodes, local_nodes)
+                           if other != node and cost_so_far[local] != INF]
+
+    def update(self):
+        """Rebuild the clusters around cells changed since the last update"""
+        if not self.pending:
+            return
+        dirty = {self.cluster_of(cell) for cell in self.pending}
+        self.pending.clear()
+
+        # Crossings of a cluster depend on its cells and its neighbors' cells
+        touched = set(dirty)
+        for cluster in dirty:
+            touched.update(self._neighbor_clusters(cluster))
+        for cluster in touched:
+            self._find_transitions(cluster)
+        for cluster in touched:
+            nodes = self._collect_entrances(cluster)
+            if cluster in dirty or nodes != self.entrances[cluster]:
+                self.entrances[cluster] = nodes
+                self._connect(cluster)
+
+    def local_ucs(self, source, clusters, goal=NO_PARENT, reverse=False, emit=None, stats=None):
+        """
+        UCS from source over the cells of a set of clusters (over reversed moves
+        with reverse=True); yields each expanded cell and returns (cost, parent,
+        expanded) dicts and set, stopping early once goal is settled
+        """
+        grid = self.grid
+        width, height, cells = grid.width, grid.height, grid.cells
+        size, clusters_x = self.cluster_size, self.clusters_x
+        sign = -1 if reverse else 1
+
+        cost, parent, expanded = {source: 0}, {source: NO_PARENT}, set()
+        counter = 0
+        queue = [(0, counter, source)]
+        if stats is not None:
+            stats.record_push(perf_counter(), 1)
+        while queue:
+            if stats is not None:
+                began = perf_counter()
+            current_cost, _, current = heapq.heappop(queue)
+            if current in expanded:
+                if stats is not None:
+                    stats.frontier_time += perf_counter() - began
+                    stats.stale_pops += 1
+                continue
+            expanded.add(current)
+            if stats is not None:
+                stats.record_pop(began)
+            if emit is not None:
+                emit(EXPANDED, current)
+            if current == goal:
+                break
+
+            # Explore neighbors inside the clusters
+            row, col = divmod(current, width)
+            for dr, dc, move_cost in MOVES:
+                new_row, new_col = row + sign * dr, col + sign * dc
+                if 0 <= new_row < height and 0 <= new_col < width \
+                        and (new_row // size) * clusters_x + new_col // size in clusters:
+                    neighbor = new_row * width + new_col
+                    new_cost = current_cost + move_cost
+                    if cells[neighbor] != WALL and new_cost < cost.get(neighbor, INF):
+                        cost[neighbor] = new_cost
+                        parent[neighbor] = current
+                        counter += 1
+                        heapq.heappush(queue, (new_cost, counter, neighbor))
+                        if stats is not None:
+                            stats.record_push(perf_counter(), len(queue))
+            yield current
+        return cost, parent, expanded
+
+    def search_steps(self, start, goal, emit=None, stats=None):
+        """
+        Resumable hierarchical query: yields after every expansion (abstract
+        or cell level) and returns (path, visited), where visited holds the
+        (row, col) cells expanded by the cell-level searches
+        """
+        self.update()
+        grid = self.grid
+        width = grid.width
+        visited = set()
+        if not grid.is_open(*start) or not grid.is_open(*goal):
+            return None, visited  # Checked first: ids of cells off the grid alias other cells
+
+        start_id = grid.cell_id(*start)
+        goal_id = grid.cell_id(*goal)
+        start_cluster, goal_cluster = self.cluster_of(start_id), self.cluster_of(goal_id)
+
+        # Connect start and goal to the nodes of their clusters
+        cost_from_start, _, expanded = \
+            yield from self.local_ucs(start_id, {start_cluster}, emit=emit, stats=stats)
+        visited.update(expanded)
+        cost_to_goal, _, expanded = \
+            yield from self.local_ucs(goal_id, {goal_cluster}, reverse=True, emit=emit, stats=stats)
+        visited.update(expanded)
+        start_edges = [(node, cost_from_start[node]) for node in self.entrances[start_cluster]
+                       if node in cost_from_start]
+        if goal_id in cost_from_start:
+            start_edges.append((goal_id, cost_from_start[goal_id]))
+        goal_edges = {node: cost_to_goal[node] for node in self.entrances[goal_cluster]
+                      if node in cost_to_goal}
+
+        # UCS over the abstract graph
+        cost_so_far, parent = {start_id: 0}, {start_id: NO_PARENT}
+        settled = set()
+        counter = 0
+        queue = [(0, counter, start_id)]
+        while queue:
+            current_cost, _, current = heapq.heappop(queue)
+            if current in settled:
+                continue
+            settled.add(current)
+            if emit is not None:
+                emit(EXPANDED, current)
+            if current == goal_id:
+                break
+
+            cluster = self.cluster_of(current)
+            edges = self.intra[cluster].get(current, []) + self.exits[cluster].get(current, [])
+            if current == start_id:
+                edges = edges + start_edges
+            if current in goal_edges:
+                edges = edges + [(goal_id, goal_edges[current])]
+            for neighbor, edge_cost in edges:
+                new_cost = current_cost + edge_cost
+                if new_cost < cost_so_far.get(neighbor, INF):
+                    cost_so_far[neighbor] = new_cost
+                    parent[neighbor] = current
+                    counter += 1
+                    heapq.heappush(queue, (new_cost, counter, neighbor))
+                    if emit is not None:
+                        emit(PUSHED, neighbor)
+            yield current
+
+        if goal_id not in settled:
+            return None, {divmod(cell, width) for cell in visited}
+
+        # Refine: UCS over the cells of the clusters on the abstract route
+        corridor = set()
+        node = goal_id
+        while node != NO_PARENT:
+            corridor.add(self.cluster_of(node))
+            node = parent[node]
+        _, corridor_parent, expanded = \
+            yield from self.local_ucs(start_id, corridor, goal_id, emit=emit, stats=stats)
+        visited.update(expanded)
+        if emit is not None:
+            emit(FOUND, goal_id)
+        path = [divmod(cell, width) for cell in _walk_back(corridor_parent, goal_id)]
+        return path[::-1], {divmod(cell, width) for cell in visited}
+
+
+def _walk_back(parent, cell):
+    """Cells from cell back to the root of a parent dict"""
+    cells = []
+    while cell != NO_PARENT:
+        cells.append(cell)
+        cell = parent[cell]
+    return cells
+
+
+def get_hierarchy(grid, cluster_size=DEFAULT_CLUSTER_SIZE):
+    """
+    ClusterHierarchy of grid, built on first use and kept up to date by its grid listener
+    A grid with the same cells as a recently used grid that no longer exists
+    takes over that grid's hierarchy instead of building a new one
+    """
+    by_size = _hierarchies.setdefault(grid, {})
+    hierarchy = by_size.get(cluster_size)
+    if hierarchy is not None:
+        return hierarchy
+
+    key = (grid.fingerprint(), cluster_size)
+    hierarchy = _by_fingerprint.get(key)
+    if hierarchy is not None and hierarchy.grid is None and hierarchy.fingerprint == key[0]:
+        hierarchy.adopt(grid)
+        _by_fingerprint.move_to_end(key)
+    else:
+        hierarchy = ClusterHierarchy(grid, cluster_size)
+        _by_fingerprint[key] = hierarchy
+        while len(_by_fingerprint) > HIERARCHY_CACHE_SIZE:
+            _by_fingerprint.popitem(last=False)
+    by_size[cluster_size] = hierarchy
+    return hierarchy
+
+
+def hierarchical_search(grid, start, goal, visualizer=None, trace=None, stats=None,
+                        cluster_size=DEFAULT_CLUSTER_SIZE):
+    """
+    Hierarchical search
+    Plans over a cluster abstraction of the grid, built on first use per grid
+    and repaired per cluster when walls change, then refines the route into
+    cells; near-optimal rather than optimal
+    """
+    return run_steps(hierarchical_steps(grid, start, goal, visualizer, trace, stats, cluster_size))
+
+
+def hierarchical_steps(grid, start, goal, visualizer=None, trace=None, stats=None,
+                       cluster_size=DEFAULT_CLUSTER_SIZE):
+    """Resumable hierarchical search: yields after every expansion, returns (path, visited)"""
+    if not MOVES_REVERSIBLE:
+        return (yield from ucs_steps(grid, start, goal, visualizer, trace, stats))
+    grid = as_grid(grid)
+    emit = make_emitter(visualizer, trace)
+    if stats is not None:
+        emit = stats.wrap_emit(emit)
+    hierarchy = get_hierarchy(grid, cluster_size)
+    return (yield from hierarchy.search_steps(start, goal, emit, stats))
@@ -1,25 +1,46 @@
 """Iterative Deepening Depth-First Search (IDDFS) Algorithm"""
-from algorithms.dls import dls_recursive
-from utils.grid_utils import Node
+from time import perf_counter
+from algorithms.dls import dls_search
+from algorithms.stepper import run_steps
+from utils.grid_utils import as_grid
+from utils.search_state import SearchState, out_of_bounds
+from utils.trace import RESTART, make_emitter
 
 
-def iddfs(grid, start, goal, max_depth=30, visualizer=None):
+def iddfs(grid, start, goal, max_depth=30, visualizer=None, trace=None, stats=None):
     """
     Iterative Deepening DFS algorithm
     Performs DLS with increasing depth limits
     """
-    start_node = Node(start[0], start[1])
-    goal_node = Node(goal[0], goal[1])
-    
-    all_visited = set()
-    
+    return run_steps(iddfs_steps(grid, start, goal, max_depth, visualizer, trace, stats))
+
+
+def iddfs_steps(grid, start, goal, max_depth=30, visualizer=None, trace=None, stats=None):
+    """Resumable IDDFS: yields after every expansion, returns (path, visited)"""
+    grid = as_grid(grid)
+    if out_of_bounds(grid, start, goal):
+        return None, frozenset()
+    start_id = grid.cell_id(*start)
+    goal_id = grid.cell_id(*goal)
+
+    all_visited = SearchState(grid, with_cost=False).visited_cells()
+    emit = make_emitter(visualizer, trace)
+    if stats is not None:
+        emit = stats.wrap_emit(emit)
+
     # Try increasing depths
     for depth in range(max_depth):
-        visited = set()
-        result = dls_recursive(start_node, goal_node, grid, depth, visited, visualizer)
-        all_visited.update(visited)
-        
-        if result != "cutoff" and result is not None:
+        if emit is not None and depth > 0:
+            emit(RESTART, 0)
+        state = SearchState(grid, with_cost=False)
+        if stats is not None:
+            stats.record_push(perf_counter(), 1)
+        result = yield from dls_search(grid, start_id, goal_id, depth, state, emit, stats)
+        all_visited = all_visited.union(state.visited_cells())
+
+        if result is None:
+            break  # Nothing was cut off: deeper limits cannot reach more cells
+        if result != "cutoff":
             return result, all_visited
-    
+
     return None, all_visited  # No path found
@@ -0,0 +1,152 @@
+"""Incremental replanning: Lifelong Planning A* with a zero heuristic (incremental UCS)"""
+import heapq
+from array import array
+from utils.grid_utils import MOVES, WALL, as_grid
+from utils.search_state import INF, out_of_bounds
+
+
+class IncrementalPlanner:
+    """
+    Keeps a UCS cost-to-come tree from start and repairs only the part of it
+    affected by changed cells, in the style of LPA*/D* Lite
+    g is the settled cost, rhs the one-step lookahead cost; a cell is
+    inconsistent (and queued) while the two differ
+    """
+    def __init__(self, grid, start, goal, track_changes=True):
+        self.grid = as_grid(grid)
+        if out_of_bounds(self.grid, start, goal):
+            raise ValueError(f"start {start} and goal {goal} must lie inside the grid")
+        size = self.grid.size
+        self.start = self.grid.cell_id(*start)
+        self.goal = self.grid.cell_id(*goal)
+
+        self.g = array('d', [INF]) * size
+        self.rhs = array('d', [INF]) * size
+        self.rhs[self.start] = 0
+        self.queue = [(0, self.start)]
+
+        self.pending = set()  # Changed cell ids not yet repaired
+        self.expansions = 0  # Cells expanded by all plan() calls so far
+        self._tracking = track_changes
+        if track_changes:
+            self.grid.add_listener(self._on_change)
+
+    def _on_change(self, cell, old, new):
+        self.pending.add(cell)
+
+    def close(self):
+        """Stop listening to grid changes"""
+        if self._tracking:
+            self.grid.remove_listener(self._on_change)
+            self._tracking = False
+
+    def notify(self, cells):
+        """Report changed (row, col) cells (needed only when track_changes=False)"""
+        for row, col in cells:
+            self.pending.add(self.grid.cell_id(row, col))
+
+    def _successors(self, cell):
+        """(successor id, cost) pairs of an open cell"""
+        grid = self.grid
+        width, height, cells = grid.width, grid.height, grid.cells
+        if cells[cell] == WALL:
+            return
+        row, col = divmod(cell, width)
+        for dr, dc, cost in MOVES:
+            new_row, new_col = row + dr, col + dc
+            if 0 <= new_row < height and 0 <= new_col < width:
+                neighbor = new_row * width + new_col
+                if cells[neighbor] != WALL:
+                    yield neighbor, cost
+
+    def _predecessors(self, cell):
+        """(predecessor id, cost) pairs of an open cell"""
+        grid = self.grid
+        width, height, cells = grid.width, grid.height, grid.cells
+        if cells[cell] == WALL:
+            return
+        row, col = divmod(cell, width)
+        for dr, dc, cost in MOVES:
+            prev_row, prev_col = row - dr, col - dc
+            if 0 <= prev_row < height and 0 <= prev_col < width:
+                neighbor = prev_row * width + prev_col
+                if cells[neighbor] != WALL:
+                    yield neighbor, cost
+
+    def _update_vertex(self, cell):
+        g, rhs = self.g, self.rhs
+        if cell != self.start:
+            best = INF
+            for pred, cost in self._predecessors(cell):
+                if g[pred] + cost < best:
+                    best = g[pred] + cost
+            rhs[cell] = best
+        if g[cell] != rhs[cell]:
+            heapq.heappush(self.queue, (min(g[cell], rhs[cell]), cell))
+
+    def _top_key(self):
+        """Smallest valid queue key, dropping stale entries"""
+        g, rhs, queue = self.g, self.rhs, self.queue
+        while queue:
+            key, cell = queue[0]
+            if g[cell] != rhs[cell] and key == min(g[cell], rhs[cell]):
+                return key
+            heapq.heappop(queue)
+        return INF
+
+    def _compute_shortest_path(self):
+        g, rhs, queue, goal = self.g, self.rhs, self.queue, self.goal
+        while self._top_key() < min(g[goal], rhs[goal]) or rhs[goal] != g[goal]:
+            if not queue:
+                break
+            _, cell = heapq.heappop(queue)
+            self.expansions += 1
+            if g[cell] > rhs[cell]:
+                # Overconsistent: settle the cheaper cost
+                g[cell] = rhs[cell]
+            else:
+                # Underconsistent: the old cost is no longer valid
+                g[cell] = INF
+                self._update_vertex(cell)
+            for succ, _ in self._successors(cell):
+                self._update_vertex(succ)
+
+    def _apply_changes(self):
+        grid = self.grid
+        width, height = grid.width, grid.height
+        for cell in self.pending:
+            # Edges into and out of the cell changed: repair it and its neighbors
+            self._update_vertex(cell)
+            row, col = divmod(cell, width)
+            for dr, dc, _ in MOVES:
+                new_row, new_col = row + dr, col + dc
+                if 0 <= new_row < height and 0 <= new_col < width:
+                    self._update_vertex(new_row * width + new_col)
+        self.pending.clear()
+
+    def plan(self):
+        """Apply pending changes and return the current shortest path, or None"""
+        self._apply_changes()
+        self._compute_shortest_path()
+        return self.path()
+
+    def cost(self):
+        cost = self.g[self.goal]
+        return None if cost == INF else cost
+
+    def path(self):
+        """Walk back from goal along the cheapest predecessors"""
+        g = self.g
+        if g[self.goal] == INF:
+            return None
+        width = self.grid.width
+        cell = self.goal
+        path = [divmod(cell, width)]
+        while cell != self.start:
+            best, best_cost = None, INF
+            for pred, cost in self._predecessors(cell):
+                if g[pred] + cost < best_cost:
+                    best, best_cost = pred, g[pred] + cost
+            cell = best
+            path.append(divmod(cell, width))
+        return path[::-1]
@@ -0,0 +1,300 @@
+"""Jump-point UCS backend: symmetry pruning for the six-direction move set"""
+import heapq
+from array import array
+from time import perf_counter
+from utils.grid_utils import MOVES, WALL
+from utils.search_state import INF
+from utils.trace import EXPANDED, PUSHED, FOUND
+
+# Any optimal path can be reordered, one swap of adjacent moves at a time, so
+# that its moves come in one of these canonical orders (mixing any other pair
+# of moves, e.g. Down with Right, is never optimal since the pair can be
+# replaced by a cheaper move or by nothing):
+#   DR* D*   DR* R*   UL* U*   UL* L*   D* L*   U* R*
+# Each move of a canonical path has a kind that fixes which moves may follow:
+#   diagonal  (DR, UL): the same diagonal or either of its straight parts
+#   turning   (D, U):   the same move or a turn (L after D, R after U)
+#   straight  (D, U, R, L after a diagonal or a turn): only the same move
+# As in JPS, walls break this: a neighbor that the canonical order would
+# reach around a cell x can only be reached through x when the cell in
+# between is a wall (a forced neighbor). Every kind jumps: straight kinds run
+# until a cell with a forced neighbor (or the goal), diagonal and turning
+# kinds additionally stop at a cell from which one of their straight
+# continuations finds such a cell. Only the cells jumps stop at are queued;
+# a jump point with a forced neighbor restarts in every direction, since the
+# wall next to it may make any canonical order after it the only way around
+
+# Kind -> (row step, col step, runs straight)
+_DR, _UL, _D_TURN, _U_TURN, _D, _U, _R, _L = range(8)
+KINDS = (
+    (1, 1, False),
+    (-1, -1, False),
+    (1, 0, False),
+    (-1, 0, False),
+    (1, 0, True),
+    (-1, 0, True),
+    (0, 1, True),
+    (0, -1, True),
+)
+
+# Kinds tried from the start: every direction, with the kind that allows the most turns
+RESTART_KINDS = (_DR, _UL, _D_TURN, _U_TURN, _R, _L)
+_WIDEST_KIND = {KINDS[kind][:2]: kind for kind in RESTART_KINDS}
+
+# Kinds that continue a canonical path at a jump point reached by each kind
+CONTINUE_KINDS = (
+    (_DR, _D, _R),
+    (_UL, _U, _L),
+    (_D_TURN, _L),
+    (_U_TURN, _R),
+    (_D,),
+    (_U,),
+    (_R,),
+    (_L,),
+)
+
+STRAIGHT_KINDS = tuple(kind for kind, (_, _, straight) in enumerate(KINDS) if straight)
+UNKNOWN, NO_JUMP = -2, -1
+
+# Costs reached along different canonical orders may differ in the last bits
+COST_EPSILON = 1e-9
+
+
+def _move_costs():
+    """Cost of each jump kind's single step, or None if MOVES is not the six-direction set"""
+    costs = {(dr, dc): cost for dr, dc, cost in MOVES}
+    expected = {(-1, 0), (0, 1), (1, 0), (1, 1), (0, -1), (-1, -1)}
+    if set(costs) != expected:
+        return None
+    straight, diagonal = costs[(1, 0)], costs[(1, 1)]
+    if any(costs[move] != straight for move in expected if 0 in move) \
+            or costs[(-1, -1)] != diagonal or not diagonal < 2 * straight:
+        return None  # The canonical orders above rely on these costs
+    return tuple(costs[(dr, dc)] for dr, dc, _ in KINDS)
+
+
+# None when the configured moves are not the ones the pruning rules were derived for
+KIND_COSTS = _move_costs()
+
+
+def _forced_neighbors():
+    """
+    Per kind, (neighbor, blockers, kind) for each move out of a cell x reached
+    by that kind that is not one of its continuations: the neighbor must be
+    tried from x (with that kind) when every blocker, a cell next to both the
+    previous cell and the neighbor, is a wall or off the grid. Neighbors one
+    move away from the previous cell never need x
+    """
+    costs = {(dr, dc): cost for dr, dc, cost in MOVES}
+    rules = []
+    for kind, (dr, dc, _) in enumerate(KINDS):
+        back = (-dr, -dc)
+        natural = {KINDS[follow][:2] for follow in CONTINUE_KINDS[kind]}
+        forced = []
+        for move, cost in costs.items():
+            if move in natural or move == back or (move[0] + dr, move[1] + dc) in costs:
+                continue
+            through_x = costs[(dr, dc)] + cost
+            blockers = tuple(
+                cell for cell in costs
+                if (cell[0] - back[0], cell[1] - back[1]) in costs
+                and (move[0] - cell[0], move[1] - cell[1]) in costs
+                and costs[(cell[0] - back[0], cell[1] - back[1])]
+                + costs[(move[0] - cell[0], move[1] - cell[1])] <= through_x + COST_EPSILON)
+            forced.append((move, blockers, _WIDEST_KIND[move]))
+        rules.append(tuple(forced))
+    return tuple(rules)
+
+
+FORCED = _forced_neighbors() if KIND_COSTS is not None else None
+
+
+# Largest share of walls jump_search is used on. Jumps test every cell they
+# scan for forced neighbors, so they only pay off on open maps: corner to
+# corner on 500x500 it runs 3x faster than heap UCS with no walls and 1.2x at
+# this share, breaks even at 1 wall per 20000 cells and is 2-4x slower from
+# 1 per 1000 up, where nearly every row and column has a forced neighbor
+MAX_WALL_FRACTION = 1 / 50000
+
+
+def jump_supported(grid):
+    """Whether jump_search is used on grid: the six-direction moves and an open map"""
+    return KIND_COSTS is not None and grid.wall_count() <= grid.size * MAX_WALL_FRACTION
+
+
+def jump_search(grid, start_id, goal_id, state, emit=None, stats=None):
+    """
+    UCS over jump points; yields each expanded jump point and returns True once
+    goal_id is settled. state.parent links each cell to the cell its jump
+    started from, see jump_path
+    """
+    width, height, cells = grid.width, grid.height, grid.cells
+    visited, parent, cost_so_far = state.visited, state.parent, state.cost
+    kinds = bytearray(grid.size)  # Bitmask of the kinds each cell was reached by at its best cost
+
+    def forced_kinds(row, col, kind):
+        """Kinds of the forced neighbors of (row, col) when reached by kind"""
+        result = []
+        for (dr, dc), blockers, forced_kind in FORCED[kind]:
+            n_row, n_col = row + dr, col + dc
+            if not (0 <= n_row < height and 0 <= n_col < width) \
+                    or cells[n_row * width + n_col] == WALL:
+                continue
+            for br, bc in blockers:
+                b_row, b_col = row + br, col + bc
+                if 0 <= b_row < height and 0 <= b_col < width \
+                        and cells[b_row * width + b_col] != WALL:
+                    break
+            else:
+                result.append(forced_kind)
+        return result
+
+    # Per straight kind, the jump point a straight run from each cell ends at
+    # (NO_JUMP if it ends at a wall or the edge), filled in as runs are taken
+    # so that the scans of neighboring diagonals never retrace them
+    straight_ends = {kind: array('i', [UNKNOWN]) * grid.size for kind in STRAIGHT_KINDS}
+
+    def run_straight(row, col, kind):
+        """Jump point a straight run of kind from (row, col) ends at, or NO_JUMP"""
+        ends = straight_ends[kind]
+        dr, dc, _ = KINDS[kind]
+        passed = []
+        end = NO_JUMP
+        while True:
+            cell = row * width + col
+            known = ends[cell]
+            if known != UNKNOWN:
+                end = known
+                break
+            passed.append(cell)
+            row, col = row + dr, col + dc
+            if not (0 <= row < height and 0 <= col < width) or cells[row * width + col] == WALL:
+                break
+            if row * width + col == goal_id or forced_kinds(row, col, kind):
+                end = row * width + col
+                break
+        for cell in passed:
+            ends[cell] = end
+        return end
+
+    def walk(row, col, kind):
+        """
+        Follow kind from (row, col) to its next jump point: the goal or a cell
+        with a forced neighbor, or for diagonal and turning kinds a cell from
+        which one of their straight continuations finds one. Returns
+        (cell, steps) or None
+        """
+        dr, dc, straight = KINDS[kind]
+        if straight:
+            end = run_straight(row, col, kind)
+            if end == NO_JUMP:
+                return None
+            end_row, end_col = divmod(end, width)
+            return end, max(abs(end_row - row), abs(end_col - col))
+        scans = CONTINUE_KINDS[kind][1:]
+        steps = 0
+        while True:
+            row, col = row + dr, col + dc
+            if not (0 <= row < height and 0 <= col < width):
+                return None
+            cell = row * width + col
+            if cells[cell] == WALL:
+                return None
+            steps += 1
+            if cell == goal_id or forced_kinds(row, col, kind):
+                return cell, steps
+            for scan in scans:
+                if run_straight(row, col, scan) != NO_JUMP:
+                    return cell, steps
+
+    cost_so_far[start_id] = 0
+    counter = 0
+    priority_queue = [(0, counter, start_id)]
+    if stats is not None:
+        stats.record_push(perf_counter(), 1)
+    if emit is not None:
+        emit(PUSHED, start_id)
+
+    while priority_queue:
+        if stats is not None:
+            began = perf_counter()
+        current_cost, _, current = heapq.heappop(priority_queue)
+
+        if visited[current >> 3] >> (current & 7) & 1 or current_cost > cost_so_far[current]:
+            # Already expanded, or queued again since at a lower cost
+            if stats is not None:
+                stats.frontier_time += perf_counter() - began
+                stats.stale_pops += 1
+            continue
+
+        visited[current >> 3] |= 1 << (current & 7)
+        if stats is not None:
+            stats.record_pop(began)
+        if emit is not None:
+            emit(EXPANDED, current)
+
+        # Check if goal reached
+        if current == goal_id:
+            if emit is not None:
+                emit(FOUND, current)
+            return True
+
+        # Kinds to jump in: every direction from the start, otherwise the
+        # continuations of the kinds that reached current plus its forced neighbors
+        row, col = divmod(current, width)
+        mask = kinds[current]
+        if current == start_id or any(mask >> kind & 1 and forced_kinds(row, col, kind)
+                                      for kind in range(8)):
+            successors = RESTART_KINDS
+        else:
+            successors = set()
+            for kind in range(8):
+                if mask >> kind & 1:
+                    successors.update(CONTINUE_KINDS[kind])
+
+        # Explore jump points
+        if stats is not None:
+            stats.begin_neighbors()
+        for kind in successors:
+            jump = walk(row, col, kind)
+            if jump is None:
+                continue
+            neighbor, steps = jump
+            new_cost = current_cost + steps * KIND_COSTS[kind]
+
+            if new_cost < cost_so_far[neighbor] - COST_EPSILON:
+                if stats is not None:
+                    duplicate = cost_so_far[neighbor] != INF
+                    began = perf_counter()
+                cost_so_far[neighbor] = new_cost
+                parent[neighbor] = current
+                kinds[neighbor] = 1 << kind
+                counter += 1
+                heapq.heappush(priority_queue, (new_cost, counter, neighbor))
+                if stats is not None:
+                    stats.record_push(began, len(priority_queue), duplicate)
+                if emit is not None:
+                    emit(PUSHED, neighbor)
+            elif new_cost <= cost_so_far[neighbor] + COST_EPSILON \
+                    and not visited[neighbor >> 3] >> (neighbor & 7) & 1:
+                # Just as cheap along another canonical order: continue that one too
+                kinds[neighbor] |= 1 << kind
+        if stats is not None:
+            stats.end_neighbors()
+        yield current
+
+    return False
+
+
+def jump_path(state, goal_id):
+    """(row, col) path to goal_id, filling in the cells jumped over"""
+    jump_points = state.reconstruct_path(goal_id)
+    path = jump_points[:1]
+    for (row, col), (next_row, next_col) in zip(jump_points, jump_points[1:]):
+        dr = (next_row > row) - (next_row < row)
+        dc = (next_col > col) - (next_col < col)
+        while (row, col) != (next_row, next_col):
+            row, col = row + dr, col + dc
+            path.append((row, col))
+    return path
+
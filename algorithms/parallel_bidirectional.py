@@ -0,0 +1,317 @@
+"""Bidirectional breadth-first search with the two sides in separate processes"""
+import multiprocessing
+import struct
+import sys
+from array import array
+from multiprocessing import shared_memory
+from time import perf_counter
+from algorithms.bfs import bfs_steps
+from algorithms.stepper import run_steps
+from utils.adjacency import get_adjacency
+from utils.grid_utils import MOVES_REVERSIBLE, as_grid, np
+from utils.search_state import VisitedCells, NO_PARENT, out_of_bounds
+from utils.trace import EXPANDED, PUSHED, FOUND, make_emitter
+
+UNREACHED = -1
+NO_MEETING = 2 ** 31 - 1  # mu before any meeting has been seen
+
+# The shared block holds int32 arrays, in this order:
+# offsets (size + 1), targets (edges), then distance and parent for each side (size each)
+_ITEM = array('i').itemsize
+
+# Each side reports these numbers in its slice of a shared double array
+_EXPANSIONS, _PUSHES, _HIGH_WATER, _LAYERS, _SECONDS = range(5)
+_COUNTERS = 5
+
+# Without NumPy, reached cells are found from the most significant byte of
+# each int32 distance: 0xff for UNREACHED, 0 for any distance below 2 ** 24
+_HIGH_BYTE = _ITEM - 1 if sys.byteorder == 'little' else 0
+_BYTE_LIMIT = 1 << 24
+_UNREACHED_TO_BIT = bytes([1]) + bytes(254) + bytes([0])
+_PACK_BITS = 0x0102040810204080  # Eight 0/1 bytes (little-endian) * this >> 56 = one bit each
+
+
+def _high_bytes(distance):
+    return int.from_bytes(distance.tobytes()[_HIGH_BYTE::_ITEM], 'little')
+
+
+def _layout(size, edges):
+    """Byte offset and length of every shared array"""
+    lengths = (size + 1, edges, size, size, size, size)
+    spans, start = [], 0
+    for length in lengths:
+        spans.append((start, length))
+        start += length * _ITEM
+    return spans, start
+
+
+def _views(buf, spans):
+    return [buf[start:start + length * _ITEM].cast('i') for start, length in spans]
+
+
+def _search_side(shm_name, spans, side, root, mu, meeting, lock, generated, stop, counters):
+    """
+    One side of the search, run in a child process
+    Expands whole BFS layers from root, writing distance and parent for this
+    side and reading the other side's distances to spot meetings. Meetings
+    lower the shared mu (start-goal path length) under lock; after each layer
+    this side publishes how deep it has fully generated and stops once both
+    depths together reach mu, or when it runs out of cells. Its expansions,
+    pushes, largest layer, layers expanded and search time go to counters
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    views = _views(shm.buf, spans)
+    try:
+        offsets, targets = views[0], views[1]
+        distance, parent = views[2 + side], views[4 + side]
+        other_distance = views[3 - side]
+        other = 1 - side
+        report = side * _COUNTERS
+
+        began = perf_counter()
+        frontier = [root]
+        depth = 0
+        while frontier and not stop.is_set():
+            next_depth = depth + 1
+            discovered = []
+            for current in frontier:
+                for k in range(offsets[current], offsets[current + 1]):
+                    neighbor = targets[k]
+                    if distance[neighbor] != UNREACHED:
+                        continue
+                    # Parent first: the other side may read it as soon as the distance is set
+                    parent[neighbor] = current
+                    distance[neighbor] = next_depth
+                    discovered.append(neighbor)
+
+                    # Check if this side met the other one
+                    other_depth = other_distance[neighbor]
+                    if other_depth != UNREACHED and next_depth + other_depth < mu.value:
+                        with lock:
+                            if next_depth + other_depth < mu.value:
+                                mu.value = next_depth + other_depth
+                                meeting.value = neighbor
+            counters[report + _EXPANSIONS] += len(frontier)
+            counters[report + _PUSHES] += len(discovered)
+            counters[report + _HIGH_WATER] = max(counters[report + _HIGH_WATER], len(discovered))
+            counters[report + _LAYERS] = next_depth
+            frontier = discovered
+            depth = next_depth
+            generated[side] = depth
+            if mu.value != NO_MEETING and depth + generated[other] >= mu.value:
+                break
+
+        if not frontier:
+            # Everything reachable from root has its final distance
+            generated[side] = NO_MEETING
+        counters[report + _SECONDS] = perf_counter() - began
+        stop.set()
+    finally:
+        for view in views:
+            view.release()
+        shm.close()
+
+
+def parallel_bidirectional_search(grid, start, goal, visualizer=None, trace=None, stats=None,
+                                  context=None):
+    """
+    Bidirectional BFS with the forward and backward sides on two processes
+    The CSR adjacency and both sides' distance and parent arrays live in one
+    shared memory block, so each side reads the other's distances directly.
+    A shared mu (best meeting so far, updated under a lock), the depth each
+    side has fully generated, and a stop event are the only coordination.
+    Once the generated depths add up to mu, every shortest path has a cell
+    that both sides have reached, so the final meeting cell is the one with
+    the smallest distance sum. Returns the same (path, visited) pair as
+    bidirectional_search; the path has the fewest moves
+
+    Worth it only for long queries on large maps: starting the processes and
+    copying the adjacency into shared memory costs tens of milliseconds
+    """
+    return run_steps(parallel_bidirectional_steps(grid, start, goal, visualizer, trace, stats,
+                                                  context))
+
+
+def parallel_bidirectional_steps(grid, start, goal, visualizer=None, trace=None, stats=None,
+                                 context=None):
+    """
+    Step generator form of parallel_bidirectional_search (the "parallel"
+    backend of bidirectional_search)
+    The search itself runs to completion in the two processes first; the
+    layers each side expanded are then replayed to the visualizer / trace,
+    yielding after every replayed expansion. stats gets both sides'
+    expansions and pushes, their largest layer, and their search time
+    (summed) as neighbor_time
+    """
+    if not MOVES_REVERSIBLE:
+        return (yield from bfs_steps(grid, start, goal, visualizer, trace=trace, stats=stats))
+    grid = as_grid(grid)
+    if out_of_bounds(grid, start, goal):
+        return None, frozenset()
+    start_id = grid.cell_id(*start)
+    goal_id = grid.cell_id(*goal)
+
+    emit = make_emitter(visualizer, trace)
+    if stats is not None:
+        emit = stats.wrap_emit(emit)
+        stats.record_push(perf_counter(), 1)
+        stats.record_push(perf_counter(), 1)
+    if start_id == goal_id:
+        bits = bytearray((grid.size + 7) >> 3)
+        bits[start_id >> 3] |= 1 << (start_id & 7)
+        if emit is not None:
+            emit(PUSHED, start_id)
+            emit(FOUND, start_id)
+        return [tuple(start)], VisitedCells(grid, bits)
+
+    adjacency = get_adjacency(grid)
+    spans, nbytes = _layout(grid.size, len(adjacency.targets))
+    shm = shared_memory.SharedMemory(create=True, size=nbytes)
+    views = _views(shm.buf, spans)
+    try:
+        offsets, targets, distance_forward, distance_backward, parent_forward, parent_backward = views
+        offsets[:] = adjacency.offsets
+        targets[:] = adjacency.targets
+        # -1 in every byte is -1 in every int32
+        first, _ = spans[2]
+        shm.buf[first:nbytes] = b'\xff' * (nbytes - first)
+        distance_forward[start_id] = 0
+        distance_backward[goal_id] = 0
+
+        context = context or multiprocessing.get_context()
+        lock = context.Lock()
+        mu = context.RawValue('i', NO_MEETING)
+        meeting = context.RawValue('i', NO_PARENT)
+        generated = context.RawArray('i', 2)
+        counters = context.RawArray('d', 2 * _COUNTERS)
+        stop = context.Event()
+        sides = [context.Process(target=_search_side,
+                                 args=(shm.name, spans, side, root, mu, meeting, lock, generated,
+                                       stop, counters))
+                 for side, root in ((0, start_id), (1, goal_id))]
+        for process in sides:
+            process.start()
+        for process in sides:
+            process.join()
+        for process in sides:
+            if process.exitcode != 0:
+                raise RuntimeError(f"search process failed with exit code {process.exitcode}")
+
+        best = _best_meeting(distance_forward, distance_backward)
+        visited = _visited_cells(grid, distance_forward, distance_backward)
+        path = None if best is None else _merge(grid, best, parent_forward, parent_backward)
+        distances = None
+        if emit is not None:
+            distances = (array('i', distance_forward), array('i', distance_backward))
+    finally:
+        for view in views:
+            view.release()
+        shm.close()
+        shm.unlink()
+
+    if stats is not None:
+        for side in (0, 1):
+            report = side * _COUNTERS
+            expansions = int(counters[report + _EXPANSIONS])
+            stats.expansions += expansions
+            stats.neighbor_calls += expansions
+            stats.pushes += int(counters[report + _PUSHES])
+            stats.frontier_high_water = max(stats.frontier_high_water,
+                                            int(counters[report + _HIGH_WATER]))
+            stats.neighbor_time += counters[report + _SECONDS]
+    if emit is not None:
+        layers = [int(counters[side * _COUNTERS + _LAYERS]) for side in (0, 1)]
+        yield from _replay(emit, distances, layers)
+        if best is not None:
+            emit(FOUND, best)
+    return path, visited
+
+
+def _replay(emit, distances, layers):
+    """
+    Emit the events of both sides' expanded layers, interleaved by depth:
+    each cell of a layer is EXPANDED, then the next layer is PUSHED
+    """
+    by_depth = []
+    for distance, expanded in zip(distances, layers):
+        cells = [[] for _ in range(expanded + 1)]
+        for cell, depth in enumerate(distance):
+            if 0 <= depth <= expanded:
+                cells[depth].append(cell)
+        by_depth.append(cells)
+
+    for side in (0, 1):
+        emit(PUSHED, by_depth[side][0][0])
+    for depth in range(max(layers)):
+        for side in (0, 1):
+            if depth >= layers[side]:
+                continue
+            for cell in by_depth[side][depth]:
+                emit(EXPANDED, cell)
+                yield cell
+            for cell in by_depth[side][depth + 1]:
+                emit(PUSHED, cell)
+
+
+def _best_meeting(distance_forward, distance_backward):
+    """Cell reached by both sides with the smallest distance sum, or None"""
+    if np is not None:
+        forward = np.frombuffer(distance_forward, dtype=np.int32)
+        backward = np.frombuffer(distance_backward, dtype=np.int32)
+        both = (forward >= 0) & (backward >= 0)
+        if not both.any():
+            return None
+        totals = np.where(both, forward.astype(np.int64) + backward, np.iinfo(np.int64).max)
+        return int(np.argmin(totals))
+
+    size = len(distance_forward)
+    if size < _BYTE_LIMIT:
+        # 0 high bytes on both sides mark the cells both reached
+        both = (_high_bytes(distance_forward) | _high_bytes(distance_backward)).to_bytes(size, 'little')
+        cells = []
+        cell = both.find(0)
+        while cell != -1:
+            cells.append(cell)
+            cell = both.find(0, cell + 1)
+    else:
+        cells = [cell for cell in range(size)
+                 if distance_forward[cell] >= 0 and distance_backward[cell] >= 0]
+    return min(cells, key=lambda cell: distance_forward[cell] + distance_backward[cell], default=None)
+
+
+def _visited_cells(grid, distance_forward, distance_backward):
+    """Cells reached by either side, as a VisitedCells bitset view"""
+    if np is not None:
+        reached = ((np.frombuffer(distance_forward, dtype=np.int32) >= 0)
+                   | (np.frombuffer(distance_backward, dtype=np.int32) >= 0))
+        return VisitedCells(grid, bytearray(np.packbits(reached, bitorder='little').tobytes()))
+
+    size = grid.size
+    if size < _BYTE_LIMIT:
+        # One 0/1 byte per cell, packed eight at a time into the bitset
+        either = (_high_bytes(distance_forward) & _high_bytes(distance_backward)).to_bytes(size, 'little')
+        flags = either.translate(_UNREACHED_TO_BIT) + bytes(-size % 8)
+        return VisitedCells(grid, bytearray(
+            (word * _PACK_BITS >> 56) & 0xff for (word,) in struct.iter_unpack('<Q', flags)))
+
+    bits = bytearray((size + 7) >> 3)
+    for cell, (forward, backward) in enumerate(zip(distance_forward, distance_backward)):
+        if forward >= 0 or backward >= 0:
+            bits[cell >> 3] |= 1 << (cell & 7)
+    return VisitedCells(grid, bits)
+
+
+def _merge(grid, meeting, parent_forward, parent_backward):
+    """Path start -> meeting along forward parents, then meeting -> goal along backward ones"""
+    width = grid.width
+    path = []
+    current = meeting
+    while current != NO_PARENT:
+        path.append(divmod(current, width))
+        current = parent_forward[current]
+    path.reverse()
+    current = parent_backward[meeting]
+    while current != NO_PARENT:
+        path.append(divmod(current, width))
+        current = parent_backward[current]
+    return path
@@ -0,0 +1,86 @@
+"""Resumable, time-sliced execution of step generators"""
+import time
+
+
+def run_steps(steps):
+    """Run a step generator to completion and return its result"""
+    try:
+        while True:
+            next(steps)
+    except StopIteration as stop:
+        return stop.value
+
+
+class SearchStepper:
+    """
+    Drives a search step generator (e.g. bfs_steps) a few expansions at a time
+    Each generator step is one expansion; the (path, visited) result becomes
+    available once done is True. deadline (seconds of search time) abandons
+    the search when exceeded
+    """
+    def __init__(self, steps, deadline=None):
+        self._steps = steps
+        self.deadline = deadline
+        self.expansions = 0
+        self.elapsed = 0.0  # Seconds spent inside step() calls
+        self.done = False
+        self.abandoned = False
+        self.result = None
+
+    @property
+    def timed_out(self):
+        return self.deadline is not None and self.elapsed >= self.deadline
+
+    def step(self, n=1):
+        """Advance by up to n expansions; returns True once the search is over"""
+        if self.done:
+            return True
+        steps = self._steps
+        begin = time.perf_counter()
+        try:
+            for _ in range(n):
+                next(steps)
+                self.expansions += 1
+        except StopIteration as stop:
+            self.result = stop.value
+            self.done = True
+        self.elapsed += time.perf_counter() - begin
+        if not self.done and self.timed_out:
+            self.abandon()
+        return self.done
+
+    def run(self, budget=None, chunk=256):
+        """
+        Step until the search finishes or budget seconds have been used in this
+        call; returns True once the search is over
+        """
+        begin = time.perf_counter()
+        while not self.step(chunk):
+            if budget is not None and time.perf_counter() - begin >= budget:
+                break
+        return self.done
+
+    def abandon(self):
+        """Stop the search for good; result stays None"""
+        if not self.done:
+            self._steps.close()
+            self.done = True
+            self.abandoned = True
+
+
+def run_round_robin(steppers, quantum=256):
+    """
+    Time-slice several steppers in one thread, quantum expansions each per turn,
+    until all of them are done; returns the steppers in the order they finished
+    """
+    active = list(steppers)
+    finished = []
+    while active:
+        still_active = []
+        for stepper in active:
+            if stepper.step(quantum):
+                finished.append(stepper)
+            else:
+                still_active.append(stepper)
+        active = still_active
+    return finished
@@ -0,0 +1,146 @@
+"""BFS and UCS over tiled grids paged in from disk"""
+import heapq
+from collections import deque
+from time import perf_counter
+from utils.search_state import INF, out_of_bounds
+from utils.tiled_grid import ChunkedSearchState
+from utils.trace import EXPANDED, PUSHED, FOUND, make_emitter
+
+# These loops work on any grid whose tiles are paged (utils.tiled_grid.TiledGrid):
+# neighbors come from grid.neighbors, which reads tiles through the grid's LRU
+# cache, and visited flags, parents and costs live in per-tile chunks that are
+# only allocated for tiles the search reaches
+
+
+def tiled_bfs_steps(grid, start, goal, visualizer=None, trace=None, stats=None):
+    """Resumable BFS on a tiled grid: yields after every expansion, returns (path, visited)"""
+    if out_of_bounds(grid, start, goal):
+        return None, frozenset()
+    start_id = grid.cell_id(*start)
+    goal_id = grid.cell_id(*goal)
+    state = ChunkedSearchState(grid, with_cost=False)
+    emit = make_emitter(visualizer, trace)
+    if stats is not None:
+        emit = stats.wrap_emit(emit)
+
+    locate, chunk, neighbors = grid.locate, state.chunk, grid.neighbors
+    tile, local = locate(start_id)
+    chunk(tile)[0][local] = 1
+    queue = deque([start_id])
+    if stats is not None:
+        stats.record_push(perf_counter(), 1)
+    if emit is not None:
+        emit(PUSHED, start_id)
+
+    while queue:
+        if stats is not None:
+            began = perf_counter()
+        current = queue.popleft()
+        if stats is not None:
+            stats.record_pop(began)
+        if emit is not None:
+            emit(EXPANDED, current)
+
+        # Check if goal reached
+        if current == goal_id:
+            if emit is not None:
+                emit(FOUND, current)
+            return state.reconstruct_path(goal_id), state.visited_cells()
+
+        # Explore neighbors
+        if stats is not None:
+            stats.begin_neighbors()
+        for neighbor, _ in neighbors(current):
+            tile, local = locate(neighbor)
+            visited, parent, _ = chunk(tile)
+            if not visited[local]:
+                visited[local] = 1
+                parent[local] = current
+                if stats is not None:
+                    began = perf_counter()
+                queue.append(neighbor)
+                if stats is not None:
+                    stats.record_push(began, len(queue))
+                if emit is not None:
+                    emit(PUSHED, neighbor)
+        if stats is not None:
+            stats.end_neighbors()
+        yield current
+
+    return None, state.visited_cells()  # No path found
+
+
+def tiled_ucs_steps(grid, start, goal, visualizer=None, trace=None, stats=None):
+    """Resumable UCS on a tiled grid: yields after every expansion, returns (path, visited)"""
+    if out_of_bounds(grid, start, goal):
+        return None, frozenset()
+    start_id = grid.cell_id(*start)
+    goal_id = grid.cell_id(*goal)
+    state = ChunkedSearchState(grid)
+    emit = make_emitter(visualizer, trace)
+    if stats is not None:
+        emit = stats.wrap_emit(emit)
+
+    # The visited flags are the closed set; the cost chunks hold the best known cost so far
+    locate, chunk, neighbors = grid.locate, state.chunk, grid.neighbors
+    tile, local = locate(start_id)
+    chunk(tile)[2][local] = 0
+
+    # Priority queue: (cost, counter, cell)
+    counter = 0
+    priority_queue = [(0, counter, start_id)]
+    if stats is not None:
+        stats.record_push(perf_counter(), 1)
+    if emit is not None:
+        emit(PUSHED, start_id)
+
+    while priority_queue:
+        if stats is not None:
+            began = perf_counter()
+        current_cost, _, current = heapq.heappop(priority_queue)
+
+        tile, local = locate(current)
+        visited = chunk(tile)[0]
+        if visited[local]:
+            if stats is not None:
+                stats.frontier_time += perf_counter() - began
+                stats.stale_pops += 1
+            continue
+
+        visited[local] = 1
+        if stats is not None:
+            stats.record_pop(began)
+        if emit is not None:
+            emit(EXPANDED, current)
+
+        # Check if goal reached
+        if current == goal_id:
+            if emit is not None:
+                emit(FOUND, current)
+            return state.reconstruct_path(goal_id), state.visited_cells()
+
+        # Explore neighbors
+        if stats is not None:
+            stats.begin_neighbors()
+        for neighbor, move_cost in neighbors(current):
+            new_cost = current_cost + move_cost
+            tile, local = locate(neighbor)
+            _, parent, cost_so_far = chunk(tile)
+
+            if new_cost < cost_so_far[local]:
+                if stats is not None:
+                    duplicate = cost_so_far[local] != INF
+                    began = perf_counter()
+                cost_so_far[local] = new_cost
+                parent[local] = current
+                counter += 1
+                heapq.heappush(priority_queue, (new_cost, counter, neighbor))
+                if stats is not None:
+                    stats.record_push(began, len(priority_queue), duplicate)
+                if emit is not None:
+                    emit(PUSHED, neighbor)
+        if stats is not None:
+            stats.end_neighbors()
+        yield current
+
+    return None, state.visited_cells()  # No path found
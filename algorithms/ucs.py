@@ -1,49 +1,306 @@
 """Uniform Cost Search (UCS) Algorithm"""
 import heapq
-from utils.grid_utils import Node, get_neighbors, reconstruct_path
+from array import array
+from functools import reduce
+from math import gcd
+from time import perf_counter
+from algorithms.jump import jump_path, jump_search, jump_supported
+from algorithms.stepper import run_steps
+from algorithms.tiled import tiled_ucs_steps
+from utils.adjacency import get_adjacency
+from utils.grid_utils import as_grid
+from utils.search_state import SearchState, NO_PARENT, INF, goal_steps, multi_query, out_of_bounds
+from utils.trace import EXPANDED, PUSHED, FOUND, make_emitter
 
+# Scales tried, in order, to turn the move costs into integers for the bucket queue
+COST_SCALES = (1, 10, 100, 1000, 10000)
 
-def ucs(grid, start, goal, visualizer=None):
+# Largest scaled move cost the bucket queue accepts (it keeps one bucket per unit)
+MAX_BUCKET_COST = 1 << 16
+
+
+def ucs(grid, start, goal, visualizer=None, trace=None, stats=None, backend="heap"):
     """
     Uniform Cost Search algorithm
-    Uses a priority queue based on path cost
-    """
-    start_node = Node(start[0], start[1])
-    goal_node = Node(goal[0], goal[1])
-    start_node.g = 0
-    
-    # Priority queue: (cost, counter, node)
-    # Counter ensures consistent ordering for nodes with same cost
+    Uses a priority queue based on path cost: a binary heap by default, or
+    with backend="bucket" a bucket queue over integer-scaled costs
+    backend="jump" is for open maps: it prunes symmetric paths and expands only
+    jump points (see algorithms/jump.py), so paths stay optimal and visited
+    holds the jump points. On maps with more than jump.MAX_WALL_FRACTION walls,
+    where it is slower than the heap, the heap is used instead
+    Tiled grids (utils.tiled_grid) are searched with their tiles paged in on demand
+    """
+    return run_steps(ucs_steps(grid, start, goal, visualizer, trace, stats, backend))
+
+
+def ucs_steps(grid, start, goal, visualizer=None, trace=None, stats=None, backend="heap"):
+    """Resumable UCS: yields after every expansion, returns (path, visited)"""
+    if backend not in ("bucket", "heap", "jump"):
+        raise ValueError(f"Unknown UCS backend: {backend}")
+    if getattr(grid, 'paged', False):
+        return (yield from tiled_ucs_steps(grid, start, goal, visualizer, trace, stats))
+    grid = as_grid(grid)
+    if out_of_bounds(grid, start, goal):
+        return None, frozenset()
+    goal_id = grid.cell_id(*goal)
+    state = SearchState(grid)
+
+    emit = make_emitter(visualizer, trace)
+    if stats is not None:
+        emit = stats.wrap_emit(emit)
+    if backend == "jump" and jump_supported(grid):
+        if (yield from jump_search(grid, grid.cell_id(*start), goal_id, state, emit, stats)):
+            return jump_path(state, goal_id), state.visited_cells()
+        return None, state.visited_cells()
+    search = _ucs_bucket_search if backend == "bucket" else _ucs_search
+    if (yield from search(grid, [grid.cell_id(*start)], goal_id, state, emit, stats)):
+        return state.reconstruct_path(goal_id), state.visited_cells()
+    return None, state.visited_cells()  # No path found
+
+
+def ucs_tree(grid, source):
+    """
+    Full UCS from source with no goal
+    Returns a SearchState holding the shortest-path tree and path costs
+    """
+    grid = as_grid(grid)
+    state = SearchState(grid)
+    run_steps(_ucs_search(grid, [grid.cell_id(*source)], NO_PARENT, state))
+    return state
+
+
+def ucs_multi(grid, sources, goals, k=None, visualizer=None, trace=None, stats=None,
+              backend="heap"):
+    """
+    One UCS from all sources at once that stops when the k cheapest goals (all
+    by default) are settled
+    Returns ({goal: path}, visited), goals in order of cost; each path starts
+    at the cheapest source for its goal. Unreachable goals are left out
+    """
+    return run_steps(ucs_multi_steps(grid, sources, goals, k, visualizer, trace, stats, backend))
+
+
+def ucs_multi_steps(grid, sources, goals, k=None, visualizer=None, trace=None, stats=None,
+                    backend="heap"):
+    """Resumable ucs_multi: yields after every expansion, returns (paths, visited)"""
+    if backend not in ("bucket", "heap"):
+        raise ValueError(f"Unknown multi-source UCS backend: {backend}")
+    grid = as_grid(grid)
+    start_ids, goal_ids, k = multi_query(grid, sources, goals, k)
+    state = SearchState(grid)
+
+    emit = make_emitter(visualizer, trace)
+    if stats is not None:
+        emit = stats.wrap_emit(emit)
+    search = _ucs_bucket_search if backend == "bucket" else _ucs_search
+    steps = search(grid, start_ids, NO_PARENT, state, emit, stats)
+    return (yield from goal_steps(steps, state, goal_ids, k, emit))
+
+
+def scaled_move_costs(move_costs):
+    """
+    (integer move costs, units per cost 1) such that each move cost is its
+    integer cost divided by units, or None if a cost is not a positive
+    multiple of 1 / COST_SCALES[-1]. units is a whole number, so a scaled
+    cost is never below the cost it stands for
+    """
+    for scale in COST_SCALES:
+        scaled = [round(cost * scale) for cost in move_costs]
+        if all(units > 0 and abs(units - cost * scale) < 1e-6
+               for units, cost in zip(scaled, move_costs)):
+            divisor = gcd(reduce(gcd, scaled), scale)
+            scaled = tuple(units // divisor for units in scaled)
+            if max(scaled) > MAX_BUCKET_COST:
+                return None
+            return scaled, scale // divisor
+    return None
+
+
+def _ucs_search(grid, start_ids, goal_id, state, emit=None, stats=None):
+    """
+    UCS loop over cell ids from every cell of start_ids; yields each expanded
+    cell, fills state and returns True once goal_id is settled
+    (goal_id == NO_PARENT settles everything reachable)
+    """
+    adjacency = get_adjacency(grid)
+    offsets, targets = adjacency.offsets, adjacency.targets
+    moves, move_costs = adjacency.moves, adjacency.move_costs
+
+    # The visited bitset is the closed set; cost holds the best known cost so far
+    visited, parent, cost_so_far = state.visited, state.parent, state.cost
+
+    # Priority queue: (cost, counter, cell)
+    # Counter ensures consistent ordering for cells with same cost
     counter = 0
-    priority_queue = [(0, counter, start_node)]
-    visited = set()
-    cost_so_far = {start_node: 0}
-    
+    priority_queue = []
+    for start_id in start_ids:
+        cost_so_far[start_id] = 0
+        counter += 1
+        priority_queue.append((0, counter, start_id))
+        if stats is not None:
+            stats.record_push(perf_counter(), len(priority_queue))
+        if emit is not None:
+            emit(PUSHED, start_id)
+
     while priority_queue:
+        if stats is not None:
+            began = perf_counter()
         current_cost, _, current = heapq.heappop(priority_queue)
-        
-        if current in visited:
+
+        if visited[current >> 3] >> (current & 7) & 1:
+            if stats is not None:
+                stats.frontier_time += perf_counter() - began
+                stats.stale_pops += 1
             continue
-        
-        visited.add(current)
-        
-        # Visualize current state
-        if visualizer:
-            frontier = [node for _, _, node in priority_queue]
-            visualizer.update(current, frontier, visited)
-        
+
+        visited[current >> 3] |= 1 << (current & 7)
+        if stats is not None:
+            stats.record_pop(began)
+
+        if emit is not None:
+            emit(EXPANDED, current)
+
         # Check if goal reached
-        if current == goal_node:
-            return reconstruct_path(current), visited
-        
+        if current == goal_id:
+            if emit is not None:
+                emit(FOUND, current)
+            return True
+
         # Explore neighbors
-        for neighbor in get_neighbors(current, grid):
-            new_cost = current.g
-            
-            if neighbor not in cost_so_far or new_cost < cost_so_far[neighbor]:
+        if stats is not None:
+            stats.begin_neighbors()
+        for k in range(offsets[current], offsets[current + 1]):
+            neighbor = targets[k]
+            new_cost = current_cost + move_costs[moves[k]]
+
+            if new_cost < cost_so_far[neighbor]:
+                if stats is not None:
+                    duplicate = cost_so_far[neighbor] != INF
+                    began = perf_counter()
                 cost_so_far[neighbor] = new_cost
-                neighbor.g = new_cost
+                parent[neighbor] = current
                 counter += 1
                 heapq.heappush(priority_queue, (new_cost, counter, neighbor))
-    
-    return None, visited  # No path found
+                if stats is not None:
+                    stats.record_push(began, len(priority_queue), duplicate)
+                if emit is not None:
+                    emit(PUSHED, neighbor)
+        if stats is not None:
+            stats.end_neighbors()
+        yield current
+
+    return False
+
+
+def _ucs_bucket_search(grid, start_ids, goal_id, state, emit=None, stats=None):
+    """
+    UCS loop over a monotone bucket queue (Dial's algorithm); same contract as
+    _ucs_search. Costs are kept as integers (1 and 1.414 become 500 and 707),
+    so equal costs compare exactly; pushes allocate no tuples and the keys
+    live in state.cost, so the queue adds one slot index per cell
+    """
+    adjacency = get_adjacency(grid)
+    scaled = scaled_move_costs(adjacency.move_costs)
+    if scaled is None:
+        return (yield from _ucs_search(grid, start_ids, goal_id, state, emit, stats))
+    offsets, targets, moves = adjacency.offsets, adjacency.targets, adjacency.moves
+    move_units, units = scaled
+
+    # Queued keys lie between the last popped key and that plus the largest
+    # move, so one circular bucket per unit of that range holds a single key;
+    # occupied flags the non-empty buckets so the next one is found with find()
+    span = max(move_units) + 1
+    buckets = [[] for _ in range(span)]
+    occupied = bytearray(span)
+    slot = array('i', [0]) * grid.size  # Index of a queued cell in its bucket
+
+    # The visited bitset is the closed set; a queued cell is moved to a lower
+    # bucket in place (decrease-key), so the buckets hold no stale entries.
+    # key (state.cost) holds the scaled cost of queued cells and is divided
+    # back when a cell is settled; that cost is at most the settled key, so
+    # settled cells never pass the decrease-key check again
+    visited, parent, key = state.visited, state.parent, state.cost
+    queued = 0
+    index = 0
+    for start_id in start_ids:
+        key[start_id] = 0
+        slot[start_id] = queued
+        buckets[0].append(start_id)
+        queued += 1
+        if stats is not None:
+            stats.record_push(perf_counter(), queued)
+        if emit is not None:
+            emit(PUSHED, start_id)
+    occupied[0] = 1
+
+    while queued:
+        # Take the whole lowest bucket: its cells share one key, and neighbors
+        # only ever go to other buckets since every move costs at least 1 unit
+        if stats is not None:
+            began = perf_counter()
+        next_index = occupied.find(1, index)
+        index = next_index if next_index >= 0 else occupied.find(1)
+        settling = buckets[index]
+        buckets[index] = []
+        occupied[index] = 0
+        queued -= len(settling)
+        current_key = int(key[settling[0]])
+        current_cost = current_key / units
+        if stats is not None:
+            stats.frontier_time += perf_counter() - began
+
+        for current in settling:
+            visited[current >> 3] |= 1 << (current & 7)
+            key[current] = current_cost
+            if stats is not None:
+                stats.record_pop(perf_counter())
+
+            if emit is not None:
+                emit(EXPANDED, current)
+
+            # Check if goal reached
+            if current == goal_id:
+                if emit is not None:
+                    emit(FOUND, current)
+                return True
+
+            # Explore neighbors (settled cells have a key no larger than current's)
+            if stats is not None:
+                stats.begin_neighbors()
+            for k in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[k]
+                new_key = current_key + move_units[moves[k]]
+                old_key = key[neighbor]
+
+                if new_key < old_key:
+                    if stats is not None:
+                        began = perf_counter()
+                    if old_key != INF:
+                        # Decrease-key: swap the last cell of its bucket into its slot
+                        old_index = int(old_key) % span
+                        bucket = buckets[old_index]
+                        last = bucket.pop()
+                        if last != neighbor:
+                            position = slot[neighbor]
+                            bucket[position] = last
+                            slot[last] = position
+                        elif not bucket:
+                            occupied[old_index] = 0
+                        queued -= 1
+                    key[neighbor] = new_key
+                    parent[neighbor] = current
+                    new_index = new_key % span
+                    bucket = buckets[new_index]
+                    slot[neighbor] = len(bucket)
+                    bucket.append(neighbor)
+                    occupied[new_index] = 1
+                    queued += 1
+                    if stats is not None:
+                        stats.record_push(began, queued, old_key != INF)
+                    if emit is not None:
+                        emit(PUSHED, neighbor)
+            if stats is not None:
+                stats.end_neighbors()
+            yield current
+
+    return False
@@ -0,0 +1,166 @@
+"""Vectorized wavefront BFS backend (requires NumPy)"""
+from time import perf_counter
+from algorithms.stepper import run_steps
+from utils.grid_utils import MOVES, WALL, as_grid, np
+from utils.search_state import VisitedCells, out_of_bounds
+from utils.trace import EXPANDED, PUSHED, FOUND, make_emitter
+
+UNREACHED = -1
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("the wavefront BFS backend requires NumPy")
+
+
+def _expand_layers(grid, source, goal=None, on_layer=None):
+    """
+    Expand whole BFS layers at once from source, yielding the cell ids
+    expanded by each layer
+    Returns (flat int32 distance field, flat bool reached mask); stops early
+    once goal (a cell id) has a distance. on_layer(expanded, discovered) is
+    called with the cell ids of every layer step
+    """
+    _require_numpy()
+    width, height = grid.width, grid.height
+    passable = np.frombuffer(grid.cells, dtype=np.uint8) != WALL
+
+    distance = np.full(grid.size, UNREACHED, dtype=np.int32)
+    reached = np.zeros(grid.size, dtype=bool)
+    distance[source] = 0
+    reached[source] = True
+
+    # Each layer is an array of cell ids; neighbors come from shifting the layer's
+    # (row, col) coordinates along every move in DIRECTIONS
+    frontier = np.array([source] if passable[source] else [], dtype=np.int64)
+    depth = 0
+    while frontier.size and (goal is None or not reached[goal]):
+        depth += 1
+        rows, cols = np.divmod(frontier, width)
+        layer = []
+        for dr, dc, _ in MOVES:
+            new_rows, new_cols = rows + dr, cols + dc
+            inside = (new_rows >= 0) & (new_rows < height) & (new_cols >= 0) & (new_cols < width)
+            cells = new_rows[inside] * width + new_cols[inside]
+            # One move maps distinct cells to distinct cells, so no duplicates here;
+            # marking reached before the next move keeps the layer duplicate-free
+            cells = cells[passable[cells] & ~reached[cells]]
+            if cells.size:
+                reached[cells] = True
+                layer.append(cells)
+        discovered = np.concatenate(layer) if layer else np.empty(0, dtype=np.int64)
+        distance[discovered] = depth
+        if on_layer is not None:
+            on_layer(frontier, discovered)
+        expanded, frontier = frontier, discovered
+        yield expanded
+    return distance, reached
+
+
+def distance_field(grid, source, goal=None):
+    """
+    BFS distance (in moves) from source to every cell, as a (height, width) int32
+    array; unreachable cells hold -1
+    With a goal, expansion stops as soon as the goal's distance is known
+    """
+    grid = as_grid(grid)
+    goal_id = grid.cell_id(*goal) if goal is not None else None
+    distance, _ = run_steps(_expand_layers(grid, grid.cell_id(*source), goal_id))
+    return distance.reshape(grid.height, grid.width)
+
+
+def descend_path(grid, distance, goal):
+    """
+    Rebuild a shortest path by walking down a distance field from goal to its
+    source; distance may be flat or (height, width). Returns None if unreachable
+    """
+    grid = as_grid(grid)
+    distance = distance.reshape(-1)
+    width, height = grid.width, grid.height
+    row, col = goal
+    if distance[row * width + col] == UNREACHED:
+        return None
+
+    path = [(row, col)]
+    while distance[row * width + col] > 0:
+        step = distance[row * width + col] - 1
+        for dr, dc, _ in MOVES:
+            # A predecessor p satisfies p + (dr, dc) == current cell
+            prev_row, prev_col = row - dr, col - dc
+            if 0 <= prev_row < height and 0 <= prev_col < width \
+                    and distance[prev_row * width + prev_col] == step:
+                row, col = prev_row, prev_col
+                break
+        path.append((row, col))
+    return path[::-1]
+
+
+def wavefront_bfs(grid, start, goal, visualizer=None, trace=None, stats=None):
+    """
+    Breadth-First Search that expands a whole frontier layer per NumPy step
+    Returns the same (path, visited) pair as bfs; the path is a shortest path
+    but may differ from bfs's when several exist
+    """
+    return run_steps(_wavefront_layers(grid, start, goal, visualizer, trace, stats))
+
+
+def wavefront_steps(grid, start, goal, visualizer=None, trace=None, stats=None):
+    """
+    Resumable wavefront BFS: yields once per expanded cell, like the other
+    backends, so steppers budget and count expansions rather than layers;
+    the cells of a layer are yielded after the layer's array step
+    """
+    layers = _wavefront_layers(grid, start, goal, visualizer, trace, stats)
+    while True:
+        try:
+            expanded = next(layers)
+        except StopIteration as stop:
+            return stop.value
+        yield from expanded.tolist()
+
+
+def _wavefront_layers(grid, start, goal, visualizer=None, trace=None, stats=None):
+    """
+    Wavefront BFS that yields the cell ids expanded by each layer
+    stats counts cells per layer; each layer's array work is neighbor_time
+    """
+    grid = as_grid(grid)
+    if out_of_bounds(grid, start, goal):
+        return None, frozenset()
+    start_id, goal_id = grid.cell_id(*start), grid.cell_id(*goal)
+
+    emit = make_emitter(visualizer, trace)
+    if stats is not None:
+        emit = stats.wrap_emit(emit)
+        stats.pushes += 1
+        stats.frontier_high_water = max(stats.frontier_high_water, 1)
+    if emit is not None:
+        emit(PUSHED, start_id)
+
+    on_layer = None
+    if emit is not None or stats is not None:
+        layer_began = [perf_counter()]
+
+        def on_layer(expanded, discovered):
+            if stats is not None:
+                stats.neighbor_time += perf_counter() - layer_began[0]
+                stats.expansions += len(expanded)
+                stats.neighbor_calls += len(expanded)
+                stats.pushes += len(discovered)
+                stats.frontier_high_water = max(stats.frontier_high_water, len(discovered))
+            if emit is not None:
+                for cell in expanded.tolist():
+                    emit(EXPANDED, cell)
+                for cell in discovered.tolist():
+                    emit(PUSHED, cell)
+            layer_began[0] = perf_counter()
+
+    distance, reached = yield from _expand_layers(grid, start_id, goal_id, on_layer)
+    if emit is not None and reached[goal_id]:
+        emit(FOUND, goal_id)
+    return descend_path(grid, distance, goal), _visited_cells(grid, reached)
+
+
+def _visited_cells(grid, reached):
+    """Bitset view of a bool mask, in the layout used by SearchState"""
+    return VisitedCells(grid, bytearray(np.packbits(reached, bitorder='little').tobytes()))
@@ -0,0 +1,236 @@
+"""
+AI Pathfinder - Headless batch mode
+Runs many (start, goal, algorithm) queries against one grid on a process pool
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from utils.grid_utils import Grid, TILED_FILE_EXTENSION, as_grid, load_grid, open_grid_file, path_cost
+from algorithms import DEFAULT_PARAMS, run_search, resolve_algorithm
+from algorithms.distance_cache import DistanceFieldCache, TREE_BUILDERS
+from utils.path_cache import PathCache
+from utils.stats import SearchStats
+from utils.tiled_grid import TiledGrid
+
+# Grid, distance-field cache, path cache and stats flag of the current worker
+# process, set once by _init_worker
+_worker_grid = None
+_worker_cache = None
+_worker_path_cache = None
+_worker_stats = False
+
+
+def _grid_source(grid):
+    """
+    What a worker needs to rebuild the grid: a tiled grid is reopened from its
+    file with the same tile cache budget, an unmodified memory-mapped .grid
+    file is mapped again (the workers share its pages), any other grid is sent
+    as its cells
+    """
+    if getattr(grid, 'paged', False):
+        return "tiled", grid.path, grid.cache_tiles * grid.tile_cells
+    if grid.path is not None and grid.version == 0:
+        return "file", grid.path
+    return "cells", grid.width, grid.height, bytes(grid.cells)
+
+
+def _init_worker(source, cache_bytes=None, collect_stats=False, path_cache_file=None):
+    """Process pool initializer: receive the grid once per worker"""
+    global _worker_grid, _worker_cache, _worker_path_cache, _worker_stats
+    if source[0] == "tiled":
+        _worker_grid = TiledGrid(source[1], source[2])
+    elif source[0] == "file":
+        _worker_grid = open_grid_file(source[1])
+    else:
+        _worker_grid = Grid(source[1], source[2], bytearray(source[3]))
+    _worker_cache = DistanceFieldCache(cache_bytes) if cache_bytes else None
+    _worker_path_cache = PathCache(path_cache_file) if path_cache_file else None
+    _worker_stats = collect_stats
+
+
+def run_query(grid, query, cache=None, collect_stats=False, path_cache=None):
+    """
+    Run one (start, goal, algorithm, params) query and describe the result
+    With a PathCache, a query answered before on the same grid content is
+    served from it without searching (nodes_explored is then 0). With a
+    DistanceFieldCache, BFS and UCS queries are answered from cached
+    single-source fields when possible; collect_stats adds the search's
+    SearchStats (as a dict, or None when answered from a cache). Queries on
+    a tiled grid also report the tile paging they caused under "io"
+    """
+    start, goal, algorithm, params = query
+    stats = SearchStats() if collect_stats else None
+    paged = getattr(grid, 'paged', False)
+    if paged:
+        io_before = grid.io_counters()
+    begin = time.perf_counter()
+    cache_params = {**DEFAULT_PARAMS.get(algorithm, {}), **params}
+    cached = path_cache.get(grid, start, goal, algorithm, cache_params) if path_cache else None
+    if cached is not None:
+        path, _ = cached
+        nodes_explored = 0
+        stats = None
+    elif cache is not None and algorithm in TREE_BUILDERS and not params and not paged:
+        explored_before = cache.cells_explored
+        path, _ = cache.path(grid, start, goal, algorithm)
+        nodes_explored = cache.cells_explored - explored_before
+        stats = None
+    else:
+        path, visited = run_search(algorithm, grid, start, goal, stats=stats, **params)
+        nodes_explored = len(visited)
+    if path_cache is not None and cached is None:
+        path_cache.put(grid, start, goal, algorithm, cache_params, path, nodes_explored)
+    elapsed = time.perf_counter() - begin
+    result = {
+        "start": list(start),
+        "goal": list(goal),
+        "algorithm": algorithm,
+        "path": [list(cell) for cell in path] if path else None,
+        "cost": path_cost(path) if path else None,
+        "nodes_explored": nodes_explored,
+        "time": elapsed,
+    }
+    if collect_stats:
+        result["stats"] = stats.as_dict() if stats is not None else None
+    if paged:
+        io = grid.io_counters()
+        result["io"] = {key: value - io_before[key] if key != "cached_tiles" else value
+                        for key, value in io.items()}
+    return result
+
+
+def _run_worker_query(query):
+    return run_query(_worker_grid, query, _worker_cache, _worker_stats, _worker_path_cache)
+
+
+def parse_query(line):
+    """
+    Parse one query line
+    Either JSON ({"start": [r, c], "goal": [r, c], "algorithm": "BFS", "params": {}})
+    or "start_row start_col goal_row goal_col algorithm [key=value ...]"
+    (true/false become bools, integers ints, anything else stays a string,
+    e.g. backend=jump)
+    """
+    line = line.strip()
+    if line.startswith('{'):
+        data = json.loads(line)
+        return (tuple(data["start"]), tuple(data["goal"]),
+                resolve_algorithm(data.get("algorithm", "BFS")), data.get("params", {}))
+
+    fields = line.replace(',', ' ').split()
+    if len(fields) < 5:
+        raise ValueError(f"Malformed query: {line!r}")
+    start = (int(fields[0]), int(fields[1]))
+    goal = (int(fields[2]), int(fields[3]))
+    params = {}
+    for field in fields[5:]:
+        key, _, value = field.partition('=')
+        params[key] = _parse_value(value)
+    return start, goal, resolve_algorithm(fields[4]), params
+
+
+def _parse_value(value):
+    """Value of a key=value query parameter"""
+    if value.lower() in ('true', 'false'):
+        return value.lower() == 'true'
+    if value.lstrip('-').isdigit():
+        return int(value)
+    return value
+
+
+def load_queries(path):
+    """Read queries from a file, skipping blank lines and # comments"""
+    queries = []
+    with open(path) as f:
+        for line in f:
+            if line.strip() and not line.lstrip().startswith('#'):
+                queries.append(parse_query(line))
+    return queries
+
+
+def run_batch(grid, queries, workers=None, chunksize=None, cache_bytes=None, collect_stats=False,
+              path_cache_file=None):
+    """
+    Run all queries and return their results in query order
+    The grid is sent to each worker process once, through the pool initializer;
+    cache_bytes gives every worker a distance-field cache of that size (tiled
+    grids are reopened from their file by each worker and never use the cache).
+    path_cache_file is a PathCache file shared by all workers, so results
+    survive across runs
+    """
+    if not getattr(grid, 'paged', False):
+        grid = as_grid(grid)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(queries) <= 1:
+        cache = DistanceFieldCache(cache_bytes) if cache_bytes else None
+        path_cache = PathCache(path_cache_file) if path_cache_file else None
+        try:
+            return [run_query(grid, query, cache, collect_stats, path_cache) for query in queries]
+        finally:
+            if path_cache is not None:
+                path_cache.close()
+
+    if chunksize is None:
+        chunksize = max(1, len(queries) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(_grid_source(grid), cache_bytes, collect_stats,
+                                       path_cache_file)) as pool:
+        return list(pool.map(_run_worker_query, queries, chunksize=chunksize))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run pathfinding queries in batch, without the GUI")
+    parser.add_argument("grid", help="map file: .grid, .tiles, octile .map, or text ('#' = wall, '.' = open)")
+    parser.add_argument("queries", help="query file, one query per line")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument("--cache-mb", type=float, default=0,
+                        help="per-worker distance-field cache for BFS/UCS queries, in MB")
+    parser.add_argument("--path-cache", default=None, metavar="FILE",
+                        help="persistent result cache (SQLite); repeated queries skip the search")
+    parser.add_argument("--tile-cache-mb", type=float, default=64,
+                        help="per-process tile cache for .tiles maps, in MB")
+    parser.add_argument("--stats", action="store_true",
+                        help="add per-query search counters and timers, and print their totals")
+    parser.add_argument("-o", "--output", default=None, help="write JSON lines here instead of stdout")
+    args = parser.parse_args(argv)
+
+    if args.grid.lower().endswith(TILED_FILE_EXTENSION):
+        grid = TiledGrid(args.grid, int(args.tile_cache_mb * 1024 * 1024))
+    else:
+        grid = load_grid(args.grid)
+    queries = load_queries(args.queries)
+
+    begin = time.perf_counter()
+    results = run_batch(grid, queries, workers=args.workers,
+                        cache_bytes=int(args.cache_mb * 1024 * 1024) or None,
+                        collect_stats=args.stats, path_cache_file=args.path_cache)
+    elapsed = time.perf_counter() - begin
+
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for result in results:
+            out.write(json.dumps(result) + '\n')
+    finally:
+        if args.output:
+            out.close()
+
+    print(f"{len(results)} queries in {elapsed:.2f}s "
+          f"({len(results) / elapsed if elapsed else 0:.1f} queries/s)", file=sys.stderr)
+    if args.stats:
+        totals = SearchStats()
+        for result in results:
+            if result["stats"] is not None:
+                totals.merge(SearchStats.from_dict(result["stats"]))
+        print(f"totals: {totals.to_json()}", file=sys.stderr)
+    if results and "io" in results[0]:
+        tile_reads = sum(result["io"]["tile_reads"] for result in results)
+        megabytes = sum(result["io"]["bytes_read"] for result in results) / (1024 * 1024)
+        print(f"tiles paged in: {tile_reads} ({megabytes:.1f} MB)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+AI Pathfinder - Benchmark suite
+Sweeps grid size, wall density and start/goal placement across all algorithms
+on seeded grids, and compares results against a saved baseline
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from utils.grid_utils import initialize_grid, add_random_walls, path_cost
+from utils.stats import SearchStats
+from algorithms import ALGORITHMS, run_search, resolve_algorithm
+
+SIZES = (50, 200)
+DENSITIES = (0.0, 0.2, 0.35)
+PLACEMENTS = ("corners", "center", "random")
+
+# Extra entries benchmarked alongside ALGORITHMS: name -> (algorithm, params)
+VARIANTS = {
+    "Bidirectional (parallel)": ("Bidirectional", {"backend": "parallel"}),
+    "UCS (bucket)": ("UCS", {"backend": "bucket"}),
+}
+
+# A result is slower than its baseline when its time exceeds baseline * (1 + threshold)
+DEFAULT_THRESHOLD = 0.10
+
+
+def place_endpoints(grid, placement, rng):
+    """Pick (start, goal) for a placement; the two cells are cleared of walls"""
+    height, width = grid.height, grid.width
+    if placement == "corners":
+        start, goal = (0, 0), (height - 1, width - 1)
+    elif placement == "center":
+        start, goal = (height // 2, width // 2), (height - 1, width - 1)
+    elif placement == "random":
+        start = (rng.randrange(height), rng.randrange(width))
+        goal = start
+        while goal == start:
+            goal = (rng.randrange(height), rng.randrange(width))
+    else:
+        raise ValueError(f"Unknown placement: {placement}")
+    grid[start[0]][start[1]] = 0
+    grid[goal[0]][goal[1]] = 0
+    return start, goal
+
+
+def make_case(size, density, placement, seed):
+    """Build the seeded grid and endpoints for one benchmark case"""
+    rng = random.Random(f"{seed}:{size}:{density}:{placement}")
+    grid = initialize_grid(size)
+    add_random_walls(grid, int(density * size * size), rng)
+    start, goal = place_endpoints(grid, placement, rng)
+    return grid, start, goal
+
+
+def resolve_entry(name):
+    """Benchmark entry name -> (name, algorithm, params); names are algorithms or VARIANTS keys"""
+    if name in VARIANTS:
+        return (name,) + VARIANTS[name]
+    algorithm = resolve_algorithm(name)
+    return algorithm, algorithm, {}
+
+
+def measure(algorithm, grid, start, goal, repeat=3, params=None):
+    """
+    Time one algorithm on one case
+    Wall time is the best of repeat runs; peak memory comes from a separate
+    tracemalloc run so that tracing does not skew the timing (memory used by
+    child processes, as with the parallel backend, is not seen), and the
+    expansion count from a separate SearchStats run
+    """
+    params = params or {}
+    best = None
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        path, visited = run_search(algorithm, grid, start, goal, **params)
+        elapsed = time.perf_counter() - begin
+        if best is None or elapsed < best:
+            best = elapsed
+
+    tracemalloc.start()
+    run_search(algorithm, grid, start, goal, **params)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stats = SearchStats()
+    run_search(algorithm, grid, start, goal, stats=stats, **params)
+
+    return {
+        "time": best,
+        "nodes_explored": len(visited),
+        "expansions": stats.expansions,
+        "expansions_per_sec": stats.expansions / best if best else None,
+        "peak_memory": peak,
+        "path_length": len(path) if path else None,
+        "path_cost": round(path_cost(path), 6) if path else None,
+    }
+
+
+def run_benchmarks(algorithms=None, sizes=SIZES, densities=DENSITIES, placements=PLACEMENTS,
+                   seed=0, repeat=3, log=None):
+    """Run every (size, density, placement, algorithm) case; returns the result document"""
+    entries = [resolve_entry(name) for name in (algorithms or [*ALGORITHMS, *VARIANTS])]
+    results = []
+    for size in sizes:
+        for density in densities:
+            for placement in placements:
+                grid, start, goal = make_case(size, density, placement, seed)
+                for name, algorithm, params in entries:
+                    result = {
+                        "algorithm": name,
+                        "size": size,
+                        "density": density,
+                        "placement": placement,
+                        "start": list(start),
+                        "goal": list(goal),
+                    }
+                    result.update(measure(algorithm, grid, start, goal, repeat, params))
+                    results.append(result)
+                    if log is not None:
+                        print(f"{name:>13} size={size:<5} density={density:<5} "
+                              f"{placement:<8} {result['time'] * 1000:9.2f} ms "
+                              f"{result['nodes_explored']:>8} nodes", file=log)
+    return {
+        "meta": {
+            "seed": seed,
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def _case_key(result):
+    return result["algorithm"], result["size"], result["density"], result["placement"]
+
+
+def speedups(document):
+    """
+    (variant case, algorithm it varies, speedup) for every variant result whose
+    algorithm ran on the same case; speedup is algorithm time / variant time
+    """
+    times = {_case_key(result): result["time"] for result in document["results"]}
+    found = []
+    for result in document["results"]:
+        variant = VARIANTS.get(result["algorithm"])
+        if variant is None:
+            continue
+        key = _case_key(result)
+        base = times.get((variant[0],) + key[1:])
+        if base is not None and result["time"]:
+            found.append((key, variant[0], base / result["time"]))
+    return found
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare two result documents case by case
+    Returns a list of (case, message) regressions: slower than the threshold
+    allows, more memory than the threshold allows, or a different path cost or
+    number of nodes explored
+    """
+    baseline_results = {_case_key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        key = _case_key(result)
+        old = baseline_results.get(key)
+        if old is None:
+            continue
+        if result["time"] > old["time"] * (1 + threshold):
+            regressions.append((key, f"time {old['time'] * 1000:.2f} ms -> {result['time'] * 1000:.2f} ms "
+                                     f"({result['time'] / old['time'] - 1:+.0%})"))
+        if result["peak_memory"] > old["peak_memory"] * (1 + threshold):
+            regressions.append((key, f"peak memory {old['peak_memory']} -> {result['peak_memory']} bytes"))
+        if result["path_cost"] != old["path_cost"]:
+            regressions.append((key, f"path cost {old['path_cost']} -> {result['path_cost']}"))
+        if result["nodes_explored"] != old["nodes_explored"]:
+            regressions.append((key, f"nodes explored {old['nodes_explored']} -> {result['nodes_explored']}"))
+    return regressions
+
+
+def _parse_list(text, convert):
+    return [convert(item) for item in text.split(',') if item]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the search algorithms on seeded grids")
+    parser.add_argument("--algorithms", type=lambda text: _parse_list(text, str), default=None,
+                        help="comma-separated algorithm names or variants such as "
+                             "'Bidirectional (parallel)' (default: all)")
+    parser.add_argument("--sizes", type=lambda text: _parse_list(text, int), default=list(SIZES),
+                        help="comma-separated grid sizes")
+    parser.add_argument("--densities", type=lambda text: _parse_list(text, float), default=list(DENSITIES),
+                        help="comma-separated wall densities (fraction of cells)")
+    parser.add_argument("--placements", type=lambda text: _parse_list(text, str), default=list(PLACEMENTS),
+                        help=f"comma-separated start/goal placements ({', '.join(PLACEMENTS)})")
+    parser.add_argument("--seed", type=int, default=0, help="seed for walls and placements")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case (best is kept)")
+    parser.add_argument("-o", "--output", default=None, help="write the JSON results here")
+    parser.add_argument("--compare", default=None, metavar="BASELINE",
+                        help="JSON results to compare against; exits 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed time/memory growth before flagging a regression")
+    args = parser.parse_args(argv)
+
+    current = run_benchmarks(args.algorithms, args.sizes, args.densities, args.placements,
+                             seed=args.seed, repeat=args.repeat, log=sys.stderr)
+    for (name, size, density, placement), algorithm, speedup in speedups(current):
+        print(f"{name} vs {algorithm} size={size} density={density} {placement}: "
+              f"{speedup:.2f}x cpus={current['meta']['cpus']}", file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        for (algorithm, size, density, placement), message in regressions:
+            print(f"REGRESSION {algorithm} size={size} density={density} {placement}: {message}")
+        if regressions:
+            return 1
+        print("No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -17,6 +17,7 @@ LIGHT_GRAY = (200, 200, 200)
 GRID_SIZE = 15
 CELL_SIZE = 30
 MARGIN = 2
+MAX_BOARD_SIZE = 800  # Largest board size in pixels; cells shrink to fit big maps
 
 # Window settings
 WINDOW_WIDTH = GRID_SIZE * (CELL_SIZE + MARGIN) + MARGIN + 300
@@ -24,6 +25,10 @@ WINDOW_HEIGHT = GRID_SIZE * (CELL_SIZE + MARGIN) + MARGIN + 100
 
 # Algorithm settings
 ANIMATION_DELAY = 0.05
+RESULT_DISPLAY_TIME = 3  # Seconds the final result stays up unless a key is pressed
+
+# Offscreen rendering: frames drawn per run (plus the final result)
+RENDER_FRAMES = 60
 
 # Movement directions
 DIRECTIONS = [
@@ -1,2 +1,9 @@
 """GUI package initialization"""
-from .visualizer import PathfindingVisualizer
+
+
+def __getattr__(name):
+    # Imported on first use, so that importing gui does not load pygame
+    if name == "PathfindingVisualizer":
+        from .visualizer import PathfindingVisualizer
+        return PathfindingVisualizer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,105 +1,196 @@
 """GUI Visualizer for Pathfinding Algorithms using Pygame"""
+import os
 import pygame
 import time
-from config import *
+from config import (WHITE, BLACK, RED, GREEN, BLUE, YELLOW, CYAN, ORANGE, PURPLE, GRAY,
+                    CELL_SIZE, MARGIN, MAX_BOARD_SIZE, WINDOW_HEIGHT, ANIMATION_DELAY,
+                    RENDER_FRAMES, RESULT_DISPLAY_TIME)
+from utils.grid_utils import WALL, Grid, np
+from utils.trace import EXPANDED, PUSHED, POPPED, FOUND, RESTART
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional: only needed for .gif output
+    Image = None
+
+# Events after which a live or replayed run shows a new frame
+FRAME_EVENTS = (EXPANDED, FOUND, RESTART)
+
+_palette = None
+
+
+def _gif_palette():
+    """
+    Palette image of the board colors plus a gray ramp for anti-aliased text
+    Mapping frames onto it is much faster than letting Pillow pick a palette
+    per frame
+    """
+    global _palette
+    if _palette is None:
+        colors = [WHITE, BLACK, RED, GREEN, BLUE, YELLOW, CYAN, ORANGE, PURPLE, GRAY]
+        colors += [(v, v, v) for v in range(8, 256, 8)]
+        _palette = Image.new('P', (1, 1))
+        _palette.putpalette([channel for color in colors for channel in color])
+    return _palette
 
 
 class PathfindingVisualizer:
-    """Main visualizer class for pathfinding algorithms"""
-    
-    def __init__(self, grid, start, goal, algorithm_name):
-        pygame.init()
+    """
+    Main visualizer class for pathfinding algorithms
+    Walls and grid lines are pre-rendered once to a background surface; step
+    events (live from an algorithm, or replayed from a Trace) repaint only the
+    cells they touch and push just those rectangles to the display.
+    With offscreen=True nothing is shown: the board is drawn to a plain
+    surface (no window, no event loop, no animation delay) to be saved with
+    save_image or render_trace
+    """
+
+    def __init__(self, grid, start, goal, algorithm_name, offscreen=False):
+        if getattr(grid, 'paged', False):
+            raise ValueError("tiled grids are paged from disk and cannot be visualized")
+        self.offscreen = offscreen
+        if offscreen:
+            pygame.font.init()
+        else:
+            pygame.init()
         self.grid = grid
-        self.start = start
-        self.goal = goal
+        self.start = tuple(start)
+        self.goal = tuple(goal)
         self.algorithm_name = algorithm_name
-        
-
-        self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-        pygame.display.set_caption(f"AI Pathfinder - {algorithm_name}")
-        
-        # Fonts
-        self.font = pygame.font.SysFont('Arial', 16)
-        self.title_font = pygame.font.SysFont('Arial', 24, bold=True)
-        
-        # Stats
+        self.rows = len(grid)
+        self.cols = len(grid[0])
+
+        # Shrink cells so that large maps still fit on screen
+        pitch = min(CELL_SIZE + MARGIN, max(1, MAX_BOARD_SIZE // max(self.rows, self.cols)))
+        self.margin = MARGIN if pitch >= 4 * MARGIN else 0
+        self.cell_size = pitch - self.margin
+        self.pitch = pitch
+        board_width = self.cols * pitch + self.margin
+        board_height = self.rows * pitch + self.margin
+        self.stats_x = board_width + 20
+        self.window_height = max(board_height + 100, WINDOW_HEIGHT)
+
+        size = (board_width + 300, self.window_height)
+        if offscreen:
+            self.screen = pygame.Surface(size)
+            # The bundled default font: looking up system fonts is slow
+            self.font = pygame.font.Font(None, 22)
+            self.title_font = pygame.font.Font(None, 32)
+        else:
+            self.screen = pygame.display.set_mode(size)
+            pygame.display.set_caption(f"AI Pathfinder - {algorithm_name}")
+            self.font = pygame.font.SysFont('Arial', 16)
+            self.title_font = pygame.font.SysFont('Arial', 24, bold=True)
+
+        # Stats (nodes_explored is the count shown, expanded the EXPANDED events since the last clear)
         self.nodes_explored = 0
+        self.expanded = 0
         self.path_length = 0
-        
-    def draw_grid(self):
-        """Draw the grid with cells"""
-        for row in range(GRID_SIZE):
-            for col in range(GRID_SIZE):
-                x = col * (CELL_SIZE + MARGIN) + MARGIN
-                y = row * (CELL_SIZE + MARGIN) + MARGIN
-                
+        self.closed = False
+
+        # Cached background (empty cells, walls, grid lines, start and goal)
+        self.background = pygame.Surface(self.screen.get_size())
+        self.render_background()
+
+        # Overlay color currently painted on each cell; cells not present show
+        # the background
+        self.painted = {}
+        self.current = None
+        self._dirty = []
+        self.screen.blit(self.background, (0, 0))
+        self.draw_stats()
+        if not offscreen:
+            pygame.display.flip()
+
+    def cell_rect(self, row, col):
+        """Screen rectangle of a cell"""
+        return pygame.Rect(col * self.pitch + self.margin, row * self.pitch + self.margin,
+                           self.cell_size, self.cell_size)
+
+    def render_background(self):
+        """Pre-render walls, empty cells and grid lines to the background surface"""
+        surface = self.background
+        surface.fill(WHITE)
+        draw_lines = self.cell_size >= 4
+        if not draw_lines and np is not None and isinstance(self.grid, Grid):
+            self.render_cells_numpy(surface)
+            return
+        for row in range(self.rows):
+            for col in range(self.cols):
+                rect = self.cell_rect(row, col)
+
                 # Determine color based on cell type
                 if self.grid[row][col] == 1:
                     color = BLACK  # Wall
-                elif (row, col) == (self.start[0], self.start[1]):
+                elif (row, col) == self.start:
                     color = BLUE  # Start
-                elif (row, col) == (self.goal[0], self.goal[1]):
+                elif (row, col) == self.goal:
                     color = GREEN  # Goal
                 else:
                     color = WHITE  # Empty
-                
-                pygame.draw.rect(self.screen, color, (x, y, CELL_SIZE, CELL_SIZE))
-                # Draw grid lines for all cells
-                pygame.draw.rect(self.screen, GRAY, (x, y, CELL_SIZE, CELL_SIZE), 1)
-    
-    def draw_exploration(self, current, frontier, visited):
-        """Draw the exploration state"""
-        # Draw visited nodes
-        for node in visited:
-            if (node.row, node.col) != (self.start[0], self.start[1]) and \
-               (node.row, node.col) != (self.goal[0], self.goal[1]):
-                x = node.col * (CELL_SIZE + MARGIN) + MARGIN
-                y = node.row * (CELL_SIZE + MARGIN) + MARGIN
-                pygame.draw.rect(self.screen, CYAN, (x, y, CELL_SIZE, CELL_SIZE))
-        
-        # Draw frontier nodes
-        for node in frontier:
-            if (node.row, node.col) != (self.start[0], self.start[1]) and \
-               (node.row, node.col) != (self.goal[0], self.goal[1]):
-                x = node.col * (CELL_SIZE + MARGIN) + MARGIN
-                y = node.row * (CELL_SIZE + MARGIN) + MARGIN
-                pygame.draw.rect(self.screen, YELLOW, (x, y, CELL_SIZE, CELL_SIZE))
-        
-        # Draw current node
-        if current and (current.row, current.col) != (self.start[0], self.start[1]) and \
-           (current.row, current.col) != (self.goal[0], self.goal[1]):
-            x = current.col * (CELL_SIZE + MARGIN) + MARGIN
-            y = current.row * (CELL_SIZE + MARGIN) + MARGIN
-            pygame.draw.rect(self.screen, ORANGE, (x, y, CELL_SIZE, CELL_SIZE))
-        
-        # Redraw start and goal
-        start_x = self.start[1] * (CELL_SIZE + MARGIN) + MARGIN
-        start_y = self.start[0] * (CELL_SIZE + MARGIN) + MARGIN
-        pygame.draw.rect(self.screen, BLUE, (start_x, start_y, CELL_SIZE, CELL_SIZE))
-        
-        goal_x = self.goal[1] * (CELL_SIZE + MARGIN) + MARGIN
-        goal_y = self.goal[0] * (CELL_SIZE + MARGIN) + MARGIN
-        pygame.draw.rect(self.screen, GREEN, (goal_x, goal_y, CELL_SIZE, CELL_SIZE))
-    
+
+                if color != WHITE:
+                    pygame.draw.rect(surface, color, rect)
+                if draw_lines:
+                    pygame.draw.rect(surface, GRAY, rect, 1)
+
+    def render_cells_numpy(self, surface):
+        """
+        Background for large maps, where cells are a few pixels wide with no grid
+        lines (and no margin): one pixel array instead of a rect per cell
+        """
+        walls = self.grid.as_array() == WALL
+        colors = np.where(walls[..., None], np.array(BLACK, dtype=np.uint8),
+                          np.array(WHITE, dtype=np.uint8))
+        pixels = colors.repeat(self.pitch, axis=0).repeat(self.pitch, axis=1)
+        surface.blit(pygame.surfarray.make_surface(pixels.swapaxes(0, 1)), (0, 0))
+        for cell, color in ((self.start, BLUE), (self.goal, GREEN)):
+            if self.grid[cell[0]][cell[1]] != WALL:
+                pygame.draw.rect(surface, color, self.cell_rect(*cell))
+
+    def draw_grid(self):
+        """Draw the grid with cells"""
+        self.screen.blit(self.background, (0, 0))
+        self.painted = {}
+        self.expanded = 0
+
+    def paint_cell(self, cell, color):
+        """
+        Paint one cell (color None restores the background)
+        Returns the dirty rectangle, or None if nothing changed
+        """
+        if cell == self.start or cell == self.goal or self.painted.get(cell) == color:
+            return None
+        rect = self.cell_rect(*cell)
+        if color is None:
+            del self.painted[cell]
+            self.screen.blit(self.background, rect, rect)
+        else:
+            self.painted[cell] = color
+            pygame.draw.rect(self.screen, color, rect)
+        return rect
+
     def draw_path(self, path):
         """Draw the final path"""
         if path:
-            for i, (row, col) in enumerate(path):
-                if (row, col) != (self.start[0], self.start[1]) and \
-                   (row, col) != (self.goal[0], self.goal[1]):
-                    x = col * (CELL_SIZE + MARGIN) + MARGIN
-                    y = row * (CELL_SIZE + MARGIN) + MARGIN
-                    pygame.draw.rect(self.screen, PURPLE, (x, y, CELL_SIZE, CELL_SIZE))
-    
+            for cell in path:
+                self.paint_cell(tuple(cell), PURPLE)
+
+    def stats_rect(self):
+        """Screen area used by the stats panel"""
+        return pygame.Rect(self.stats_x, 0, self.screen.get_width() - self.stats_x,
+                           self.window_height)
+
     def draw_stats(self):
         """Draw statistics on the screen"""
-        stats_x = GRID_SIZE * (CELL_SIZE + MARGIN) + 20
+        stats_x = self.stats_x
         stats_y = 20
-        
+        self.screen.fill(WHITE, self.stats_rect())
+
         # Title
         title_text = self.title_font.render(self.algorithm_name, True, BLACK)
         self.screen.blit(title_text, (stats_x, stats_y))
-        
+
         # Stats
         stats = [
             f"Nodes Explored: {self.nodes_explored}",
@@ -114,86 +205,196 @@ class PathfindingVisualizer:
             "Orange = Current",
             "Purple = Path"
         ]
-        
+
         for i, stat in enumerate(stats):
             text = self.font.render(stat, True, BLACK)
             self.screen.blit(text, (stats_x, stats_y + 40 + i * 25))
-    
-    def update(self, current, frontier, visited):
-        """Update the visualization"""
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
+        return self.stats_rect()
+
+    def apply_event(self, code, cell):
+        """Apply one step event to the board; returns the dirty rectangles"""
+        if code == RESTART:
+            self.draw_grid()
+            self.current = None
+            return [self.screen.get_rect()]
+
+        pos = divmod(cell, self.cols)
+        dirty = []
+        if code == EXPANDED:
+            self.expanded += 1
+            if self.current is not None:
+                dirty.append(self.paint_cell(self.current, CYAN))
+            self.current = pos
+            dirty.append(self.paint_cell(pos, ORANGE))
+        elif code == PUSHED:
+            dirty.append(self.paint_cell(pos, YELLOW))
+        elif code == POPPED:
+            dirty.append(self.paint_cell(pos, CYAN))
+        return [rect for rect in dirty if rect is not None]
+
+    def present(self):
+        """Push pending dirty rectangles (and the stats panel if needed) to the display"""
+        if not self.offscreen:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    self.closed = True
+                    pygame.quit()
+                    return
+
+        if self.expanded != self.nodes_explored:
+            self.nodes_explored = self.expanded
+            self._dirty.append(self.draw_stats())
+        if self._dirty:
+            if not self.offscreen:
+                pygame.display.update(self._dirty)
+            self._dirty = []
+
+    def emit(self, code, cell):
+        """Live event sink: algorithms call this for every step event"""
+        if self.closed:
+            return
+        self._dirty.extend(self.apply_event(code, cell))
+        if code in FRAME_EVENTS and not self.offscreen:
+            self.present()
+            time.sleep(ANIMATION_DELAY)
+
+    def replay(self, trace, speed=1.0, start=0, stop=None):
+        """
+        Replay recorded events (a Trace) with no search running
+        speed scales the animation rate; speed=0 skips straight to the end state
+        """
+        delay = ANIMATION_DELAY / speed if speed else 0
+        for code, cell in trace.events(start, stop):
+            if self.closed:
                 return
-        
-        self.nodes_explored = len(visited)
-        
-        # Draw everything
-        self.screen.fill(WHITE)
+            self._dirty.extend(self.apply_event(code, cell))
+            if speed and code in FRAME_EVENTS:
+                self.present()
+                time.sleep(delay)
+        if not self.closed:
+            self.present()
+
+    def seek(self, trace, index):
+        """Show the board as it was after the first index events of trace"""
         self.draw_grid()
-        self.draw_exploration(current, frontier, visited)
-        self.draw_stats()
-        
-        pygame.display.flip()
-        time.sleep(ANIMATION_DELAY)
-    
-    def show_result(self, path, visited):
-        """Show the final result"""
+        self.current = None
+        for code, cell in trace.events(0, index):
+            self.apply_event(code, cell)
+        self._dirty = [self.screen.get_rect()]
+        self.nodes_explored = -1  # Force a stats redraw
+        self.present()
+
+    def draw_result(self, path, visited):
+        """Draw the final board: visited cells, the path and the result message"""
         self.path_length = len(path) if path else 0
-        
+        self.nodes_explored = len(visited)
+
         # Final update
-        self.screen.fill(WHITE)
         self.draw_grid()
-        
-        # Draw all visited nodes
-        for node in visited:
-            if (node.row, node.col) != (self.start[0], self.start[1]) and \
-               (node.row, node.col) != (self.goal[0], self.goal[1]):
-                x = node.col * (CELL_SIZE + MARGIN) + MARGIN
-                y = node.row * (CELL_SIZE + MARGIN) + MARGIN
-                pygame.draw.rect(self.screen, CYAN, (x, y, CELL_SIZE, CELL_SIZE))
-        
+
+        # Draw all visited cells
+        for cell in visited:
+            self.paint_cell(tuple(cell), CYAN)
+
         # Draw path
         if path:
             self.draw_path(path)
-        
-        # Redraw start and goal
-        start_x = self.start[1] * (CELL_SIZE + MARGIN) + MARGIN
-        start_y = self.start[0] * (CELL_SIZE + MARGIN) + MARGIN
-        pygame.draw.rect(self.screen, BLUE, (start_x, start_y, CELL_SIZE, CELL_SIZE))
-        
-        goal_x = self.goal[1] * (CELL_SIZE + MARGIN) + MARGIN
-        goal_y = self.goal[0] * (CELL_SIZE + MARGIN) + MARGIN
-        pygame.draw.rect(self.screen, GREEN, (goal_x, goal_y, CELL_SIZE, CELL_SIZE))
-        
+
         self.draw_stats()
-        
+
         # Add result message
         result_text = "Path Found!" if path else "No Path Found!"
         result_color = GREEN if path else RED
         text = self.title_font.render(result_text, True, result_color)
-        self.screen.blit(text, (GRID_SIZE * (CELL_SIZE + MARGIN) + 20, 
-                                WINDOW_HEIGHT - 60))
-        
+        self.screen.blit(text, (self.stats_x, self.window_height - 60))
+
+    def show_result(self, path, visited):
+        """Show the final result"""
+        if self.closed:
+            return
+        self.draw_result(path, visited)
+        if self.offscreen:
+            return
+
         # Add instruction message
-        instruction_text = "Press any key or wait 3 seconds..."
+        instruction_text = f"Press any key or wait {RESULT_DISPLAY_TIME:g} seconds..."
         instruction = self.font.render(instruction_text, True, GRAY)
-        self.screen.blit(instruction, (GRID_SIZE * (CELL_SIZE + MARGIN) + 20, 
-                                       WINDOW_HEIGHT - 30))
-        
+        self.screen.blit(instruction, (self.stats_x, self.window_height - 30))
+
         pygame.display.flip()
-        
-        # Wait for user input (key press, mouse click, or close window)
-        # Or auto-close after 3 seconds
-        waiting = True
-        start_time = time.time()
-        while waiting:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT or event.type == pygame.KEYDOWN or event.type == pygame.MOUSEBUTTONDOWN:
-                    waiting = False
-            
-            # Auto-close after 3 seconds
-            if time.time() - start_time > 3:
-                waiting = False
-        
+
+        # Sleep until user input (key press, mouse click, or close window),
+        # or auto-close after RESULT_DISPLAY_TIME seconds
+        deadline = time.monotonic() + RESULT_DISPLAY_TIME
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            event = pygame.event.wait(int(remaining * 1000) + 1)
+            if event.type in (pygame.QUIT, pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN):
+                break
+
         pygame.quit()
+
+    def save_image(self, path):
+        """Write the current board to an image file (PNG, BMP, ...)"""
+        pygame.image.save(self.screen, path)
+
+    def snapshot(self):
+        """The current board as a Pillow image in the fixed GIF palette"""
+        data = pygame.image.tostring(self.screen, 'RGB')
+        image = Image.frombytes('RGB', self.screen.get_size(), data)
+        return image.quantize(palette=_gif_palette(), dither=Image.Dither.NONE)
+
+    def render_trace(self, trace, path, visited, output, frames=RENDER_FRAMES):
+        """
+        Render a recorded run offscreen to files
+        Up to frames evenly spaced frames of trace are drawn, then the final
+        result. output ending in .gif is written as an animation (needs
+        Pillow), ending in another image extension gets only the final result,
+        and anything else is a directory of frame_NNNN.png plus result.png.
+        Returns the files written
+        """
+        extension = os.path.splitext(output)[1].lower()
+        if extension == '.gif' and Image is None:
+            raise ImportError("GIF output requires Pillow")
+        if extension and extension != '.gif':
+            frames = 0
+        elif not extension:
+            os.makedirs(output, exist_ok=True)
+
+        # Frame events to stop at, evenly spread over the whole run
+        selected = set()
+        total = sum(1 for code, _ in trace.events() if code in FRAME_EVENTS) if trace else 0
+        if frames and total:
+            count = min(frames, total)
+            selected = {round(i * (total - 1) / max(1, count - 1)) for i in range(count)}
+
+        images = []
+        written = []
+        frame = 0
+        if selected:
+            for code, cell in trace.events():
+                self.apply_event(code, cell)
+                if code not in FRAME_EVENTS:
+                    continue
+                if frame in selected:
+                    self.present()
+                    if extension == '.gif':
+                        images.append(self.snapshot())
+                    else:
+                        written.append(os.path.join(output, f"frame_{len(written):04d}.png"))
+                        self.save_image(written[-1])
+                frame += 1
+
+        self.draw_result(path, visited)
+        if extension == '.gif':
+            images.append(self.snapshot())
+            images[0].save(output, save_all=True, append_images=images[1:],
+                           duration=max(1, int(ANIMATION_DELAY * 1000)), loop=0, optimize=False)
+            written.append(output)
+        else:
+            result = output if extension else os.path.join(output, "result.png")
+            self.save_image(result)
+            written.append(result)
+        return written
@@ -2,10 +2,14 @@
 AI Pathfinder - Main Application
 Implements and visualizes uninformed search algorithms
 """
+import argparse
+import os
 import sys
-from utils.grid_utils import initialize_grid, add_random_walls
-from gui.visualizer import PathfindingVisualizer
-from algorithms import bfs, dfs, ucs, dls, iddfs, bidirectional_search
+from config import RENDER_FRAMES
+from utils.grid_utils import initialize_grid, add_random_walls, load_grid
+from algorithms import ALGORITHMS, DEFAULT_PARAMS, PAGED_ALGORITHMS, run_search, resolve_algorithm
+from utils.path_cache import PathCache
+from utils.trace import Trace
 
 
 def create_test_grid():
@@ -15,64 +19,169 @@ def create_test_grid():
     return grid
 
 
-def run_algorithm(algorithm_name, grid, start, goal):
-    """Run a specific algorithm with visualization"""
+def first_open_cells(grid):
+    """
+    First and last open cells in row-major order, used as default endpoints
+    Cells are checked with is_open, so tiled grids page in only the tiles scanned
+    """
+    first = next((cell for cell in range(grid.size) if grid.is_open(*grid.cell_pos(cell))), None)
+    last = next((cell for cell in range(grid.size - 1, -1, -1)
+                 if grid.is_open(*grid.cell_pos(cell))), None)
+    if first is None:
+        raise ValueError("the map has no open cells")
+    return grid.cell_pos(first), grid.cell_pos(last)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Visualize uninformed search algorithms")
+    parser.add_argument("map", nargs="?", default=None,
+                        help="map file (.grid, octile .map or text); default: a random 15x15 grid")
+    parser.add_argument("--start", type=int, nargs=2, metavar=("ROW", "COL"), default=None)
+    parser.add_argument("--goal", type=int, nargs=2, metavar=("ROW", "COL"), default=None)
+    parser.add_argument("--path-cache", default=None, metavar="FILE",
+                        help="persistent result cache; queries answered before are shown without searching")
+    parser.add_argument("-a", "--algorithm", action="append", default=None, metavar="NAME",
+                        help="run this algorithm (repeatable, or 'all') instead of showing the menu")
+    display = parser.add_mutually_exclusive_group()
+    display.add_argument("--headless", action="store_true",
+                         help="print results only; pygame is never loaded")
+    display.add_argument("--render", default=None, metavar="OUTPUT",
+                         help="render offscreen instead of opening a window: OUTPUT.gif is an "
+                              "animation, OUTPUT.png the final result, anything else a directory "
+                              "of PNG frames")
+    parser.add_argument("--frames", type=int, default=RENDER_FRAMES,
+                        help=f"frames rendered per run with --render (default: {RENDER_FRAMES})")
+    return parser.parse_args(argv)
+
+
+def render_target(output, algorithm_name):
+    """Per-algorithm output path: the algorithm name is added to the file name or directory"""
+    slug = algorithm_name.lower().replace(' ', '_')
+    root, extension = os.path.splitext(output)
+    if extension:
+        return f"{root}_{slug}{extension}"
+    return os.path.join(output, slug)
+
+
+def run_algorithm(algorithm_name, grid, start, goal, path_cache=None, display="window",
+                  output=None, frames=RENDER_FRAMES):
+    """
+    Run a specific algorithm with visualization
+    display is "window" (animated in a pygame window), "offscreen" (the run
+    is recorded as a Trace, then up to frames frames and the result are
+    rendered to output) or "none"; pygame is imported only when needed.
+    With a PathCache, a result cached for the same grid content is shown
+    straight away instead of searching again
+    """
     print(f"\n{'='*50}")
     print(f"Running {algorithm_name}")
     print(f"{'='*50}")
     
+    if algorithm_name not in ALGORITHMS:
+        print(f"Unknown algorithm: {algorithm_name}")
+        return
+    
     # Create visualizer
-    visualizer = PathfindingVisualizer(grid.copy(), start, goal, algorithm_name)
+    visualizer = trace = None
+    if display == "window":
+        from gui.visualizer import PathfindingVisualizer
+        visualizer = PathfindingVisualizer(grid.copy(), start, goal, algorithm_name)
+    elif display == "offscreen":
+        trace = Trace(grid.width, grid.height, capacity=None)
     
-    # Select and run algorithm
-    if algorithm_name == "BFS":
-        path, visited = bfs(grid, start, goal, visualizer)
-    elif algorithm_name == "DFS":
-        path, visited = dfs(grid, start, goal, visualizer)
-    elif algorithm_name == "UCS":
-        path, visited = ucs(grid, start, goal, visualizer)
-    elif algorithm_name == "DLS":
-        path, visited = dls(grid, start, goal, depth_limit=25, visualizer=visualizer)
-    elif algorithm_name == "IDDFS":
-        path, visited = iddfs(grid, start, goal, max_depth=35, visualizer=visualizer)
-    elif algorithm_name == "Bidirectional":
-        path, visited = bidirectional_search(grid, start, goal, visualizer)
+    params = DEFAULT_PARAMS.get(algorithm_name, {})
+    cached = path_cache.get(grid, start, goal, algorithm_name, params) if path_cache else None
+    if cached is not None:
+        path, nodes_explored = cached
+        visited = ()
+        print(f"  (from path cache, searched {nodes_explored} nodes originally)")
+        explored = "(cached)"
     else:
-        print(f"Unknown algorithm: {algorithm_name}")
-        return
+        # Run the selected algorithm
+        path, visited = run_search(algorithm_name, grid, start, goal, visualizer, trace=trace)
+        if path_cache is not None:
+            path_cache.put(grid, start, goal, algorithm_name, params, path, len(visited))
+        explored = len(visited)
     
     # Show result
-    visualizer.show_result(path, visited)
+    if visualizer is not None:
+        visualizer.show_result(path, visited)
+    elif display == "offscreen":
+        from gui.visualizer import PathfindingVisualizer
+        renderer = PathfindingVisualizer(grid.copy(), start, goal, algorithm_name, offscreen=True)
+        written = renderer.render_trace(trace, path, visited, output, frames)
+        print(f"  Rendered {len(written)} file(s) to {output}")
     
     # Print results
     if path:
         print(f"✓ Path found!")
         print(f"  Path length: {len(path)}")
-        print(f"  Nodes explored: {len(visited)}")
+        print(f"  Nodes explored: {explored}")
     else:
         print(f"✗ No path found")
-        print(f"  Nodes explored: {len(visited)}")
+        print(f"  Nodes explored: {explored}")
 
 
-def main():
+def main(argv=None):
     """Main application entry point"""
+    args = parse_args(argv)
     print("="*50)
     print("AI PATHFINDER - Uninformed Search Visualization")
     print("="*50)
     
-    # Define start and goal positions
-    start = (1, 1)
-    goal = (13, 13)
-    
-    # Create grid
-    grid = create_test_grid()
-    
-    # Ensure start and goal are not walls
-    grid[start[0]][start[1]] = 0
-    grid[goal[0]][goal[1]] = 0
+    if args.map is None:
+        # Define start and goal positions
+        start = tuple(args.start or (1, 1))
+        goal = tuple(args.goal or (13, 13))
+
+        # Create grid
+        grid = create_test_grid()
+
+        # Ensure start and goal are not walls
+        grid[start[0]][start[1]] = 0
+        grid[goal[0]][goal[1]] = 0
+    else:
+        grid = load_grid(args.map)
+        first, last = first_open_cells(grid)
+        start = tuple(args.start or first)
+        goal = tuple(args.goal or last)
+        for name, (row, col) in (("start", start), ("goal", goal)):
+            if not grid.is_open(row, col):
+                sys.exit(f"The {name} cell {(row, col)} is outside the map or a wall")
+        print(f"Loaded {args.map}: {grid.width}x{grid.height}, start {start}, goal {goal}")
     
+    path_cache = None
+    if args.path_cache:
+        path_cache = PathCache(args.path_cache)
+        if not getattr(grid, 'paged', False):
+            path_cache.watch(grid)  # Tiled grids are read-only
+
     # List of algorithms
-    algorithms = ["BFS", "DFS", "UCS", "DLS", "IDDFS", "Bidirectional"]
+    algorithms = list(ALGORITHMS)
+    display = "none" if args.headless else "offscreen" if args.render else "window"
+    if getattr(grid, 'paged', False):
+        # Tiled maps are paged from disk: only BFS and UCS can search them, and
+        # the visualizer would need the whole map in memory
+        algorithms = list(PAGED_ALGORITHMS)
+        if display != "none":
+            print("Tiled maps cannot be visualized; running headless")
+            display = "none"
+
+    def run(name):
+        output = render_target(args.render, name) if args.render else None
+        run_algorithm(name, grid, start, goal, path_cache, display, output, args.frames)
+
+    if args.algorithm:
+        try:
+            names = algorithms if "all" in args.algorithm else [resolve_algorithm(name) for name in args.algorithm]
+        except ValueError as e:
+            sys.exit(str(e))
+        unsupported = [name for name in names if name not in algorithms]
+        if unsupported:
+            sys.exit(f"{', '.join(unsupported)} cannot search a tiled map; use {' or '.join(algorithms)}")
+        for name in names:
+            run(name)
+        return
     
     print("\nAvailable Algorithms:")
     for i, algo in enumerate(algorithms, 1):
@@ -81,25 +190,27 @@ def main():
     print("q. Quit")
     
     while True:
-        choice = input("\nSelect algorithm (0-6 or q): ").strip()
+        choice = input(f"\nSelect algorithm (0-{len(algorithms)} or q): ").strip()
         
         if choice.lower() == 'q':
             print("Exiting...")
             break
         
         try:
-            if choice == '0':
+            idx = int(choice) - 1
+        except ValueError:
+            print("Invalid input. Please enter a number or 'q'.")
+            continue
+
+        try:
+            if idx == -1:
                 # Run all algorithms
                 for algo in algorithms:
-                    run_algorithm(algo, grid, start, goal)
+                    run(algo)
+            elif 0 <= idx < len(algorithms):
+                run(algorithms[idx])
             else:
-                idx = int(choice) - 1
-                if 0 <= idx < len(algorithms):
-                    run_algorithm(algorithms[idx], grid, start, goal)
-                else:
-                    print("Invalid choice. Please try again.")
-        except ValueError:
-            print("Invalid input. Please enter a number or 'q'.")
+                print("Invalid choice. Please try again.")
         except KeyboardInterrupt:
             print("\n\nInterrupted by user. Exiting...")
             break
@@ -0,0 +1,303 @@
+"""
+AI Pathfinder - Query service
+Serves grid uploads and path queries as JSON lines over TCP or a Unix socket,
+running the searches on a process pool
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import signal
+import sys
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from batch import run_query
+from algorithms import resolve_algorithm
+from algorithms.distance_cache import DistanceFieldCache
+from utils.grid_utils import Grid, WALL, load_grid, open_grid_file, save_grid_file
+from utils.path_cache import PathCache
+
+DEFAULT_PORT = 8765
+DEFAULT_MAX_PENDING = 256  # Requests being worked on at once, over all connections
+DEFAULT_TIMEOUT = 30.0  # Seconds a query may wait for its result
+DEFAULT_MAX_LINE_BYTES = 64 << 20  # Longest request line (grid uploads are one line)
+DEFAULT_BACKLOG = 1024  # Connections waiting to be accepted
+
+# Grid files kept memory-mapped by each worker process
+WORKER_GRIDS = 8
+
+# Grids, distance-field cache and path cache of the current worker process
+_worker_grids = OrderedDict()
+_worker_cache = None
+_worker_path_cache = None
+
+
+def _init_worker(cache_bytes=None, path_cache_file=None):
+    """Process pool initializer"""
+    global _worker_cache, _worker_path_cache
+    _worker_cache = DistanceFieldCache(cache_bytes) if cache_bytes else None
+    _worker_path_cache = PathCache(path_cache_file) if path_cache_file else None
+
+
+def _run_file_query(path, query):
+    """
+    Run a query on the .grid file at path in a worker process
+    The file is memory-mapped on first use, so every worker shares the same
+    page-cache copy of the cells instead of receiving them with each query
+    """
+    grid = _worker_grids.get(path)
+    if grid is None:
+        grid = open_grid_file(path)
+        _worker_grids[path] = grid
+        if len(_worker_grids) > WORKER_GRIDS:
+            _worker_grids.popitem(last=False)
+    else:
+        _worker_grids.move_to_end(path)
+    return run_query(grid, query, _worker_cache, path_cache=_worker_path_cache)
+
+
+def _store_grid(grid, grid_dir):
+    """Write grid to grid_dir as <fingerprint>.grid (once) and return (grid id, path)"""
+    grid_id = grid.fingerprint()
+    path = os.path.join(grid_dir, grid_id + '.grid')
+    if not os.path.exists(path):
+        save_grid_file(grid, path + '.part')
+        os.replace(path + '.part', path)
+    return grid_id, path
+
+
+def _grid_from_request(request):
+    """Grid of an upload request: "rows" of '#' (wall) and '.' (open) strings"""
+    rows = request.get("rows")
+    if not rows or not all(isinstance(row, str) for row in rows):
+        raise ValueError("upload needs \"rows\": a list of '#'/'.' strings")
+    return Grid.from_rows([WALL if ch in '#1' else 0 for ch in row] for row in rows)
+
+
+def _query_from_request(request):
+    """(start, goal, algorithm, params) of a query request, as batch.parse_query"""
+    try:
+        start = tuple(int(v) for v in request["start"])
+        goal = tuple(int(v) for v in request["goal"])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("query needs \"start\" and \"goal\" as [row, col]") from None
+    if len(start) != 2 or len(goal) != 2:
+        raise ValueError("query needs \"start\" and \"goal\" as [row, col]")
+    params = request.get("params", {})
+    if not isinstance(params, dict):
+        raise ValueError("\"params\" must be an object")
+    return start, goal, resolve_algorithm(request.get("algorithm", "BFS")), params
+
+
+class PathfindingService:
+    """
+    JSON-lines request handler shared by all connections
+
+    Requests are JSON objects, one per line, answered in completion order (not
+    request order) with their "id" echoed:
+      {"op": "upload", "rows": ["#..", ...]}        -> {"grid": id, "width", "height"}
+      {"op": "query", "grid": id, "start": [r, c], "goal": [r, c],
+       "algorithm": "UCS", "params": {}}            -> {"result": {...}} (as batch.run_query)
+      {"op": "stats"}                               -> {"stats": {...}}
+    Failures answer {"error": message}.
+
+    Uploaded grids are stored as .grid files that the workers memory-map.
+    Identical queries (same grid, endpoints, algorithm and params) that are in
+    flight at once share one search. At most max_pending requests are worked
+    on at a time; beyond that, connections are not read until a slot frees up,
+    so busy clients are slowed down by TCP flow control instead of queueing
+    unbounded work. A query that takes longer than timeout seconds is answered
+    with an error (the search itself runs to completion on its worker and
+    still serves any other waiters)
+    """
+    def __init__(self, workers=None, grid_dir=None, max_pending=DEFAULT_MAX_PENDING,
+                 timeout=DEFAULT_TIMEOUT, cache_bytes=None, path_cache_file=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._own_grid_dir = grid_dir is None
+        self.grid_dir = tempfile.mkdtemp(prefix='pathfinder-') if grid_dir is None else grid_dir
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                        initargs=(cache_bytes, path_cache_file))
+        self.grids = {}  # Grid id -> .grid file path
+        self._inflight = {}  # Query key -> future of the search answering it
+        self._slots = None  # Semaphore of max_pending, created on the serving loop
+        self.counters = {"requests": 0, "queries": 0, "searches": 0, "coalesced": 0,
+                         "timeouts": 0, "errors": 0}
+
+    def add_grid(self, path):
+        """Serve a map file; .grid files are used in place, others are converted. Returns the grid id"""
+        grid = load_grid(path)
+        if getattr(grid, 'paged', False):
+            grid.close()
+            raise ValueError("tiled grids cannot be served")
+        if grid.path is not None:
+            grid_id, path = grid.fingerprint(), grid.path
+        else:
+            grid_id, path = _store_grid(grid, self.grid_dir)
+        self.grids[grid_id] = path
+        return grid_id
+
+    def close(self):
+        self.pool.shutdown(wait=False)
+        if self._own_grid_dir:
+            shutil.rmtree(self.grid_dir, ignore_errors=True)
+
+    async def handle_connection(self, reader, writer):
+        """Read requests from one client and answer each as soon as it is done"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Longer than the stream limit: the rest of the stream cannot be framed
+                    await self._send(writer, write_lock, {"error": "request line too long"})
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                await self._slots.acquire()
+                task = asyncio.ensure_future(self._answer(line, writer, write_lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except ConnectionError:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def _answer(self, line, writer, write_lock):
+        try:
+            request_id = None
+            self.counters["requests"] += 1
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("request must be a JSON object")
+                request_id = request.get("id")
+                reply = await self.dispatch(request)
+            except asyncio.TimeoutError:
+                self.counters["timeouts"] += 1
+                reply = {"error": f"timed out after {self.timeout}s"}
+            except Exception as e:
+                self.counters["errors"] += 1
+                reply = {"error": str(e) or type(e).__name__}
+            reply["id"] = request_id
+            await self._send(writer, write_lock, reply)
+        except ConnectionError:
+            pass
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    async def _send(writer, write_lock, reply):
+        async with write_lock:
+            writer.write(json.dumps(reply).encode() + b'\n')
+            await writer.drain()
+
+    async def dispatch(self, request):
+        """Answer one decoded request"""
+        op = request.get("op")
+        if op == "query":
+            return {"result": await self.query(request)}
+        if op == "upload":
+            return await self.upload(request)
+        if op == "stats":
+            return {"stats": dict(self.counters, pending=len(self._inflight), grids=len(self.grids))}
+        raise ValueError(f"Unknown op: {op!r}")
+
+    async def upload(self, request):
+        loop = asyncio.get_running_loop()
+        grid = await loop.run_in_executor(None, _grid_from_request, request)
+        grid_id, path = await loop.run_in_executor(None, _store_grid, grid, self.grid_dir)
+        self.grids[grid_id] = path
+        return {"grid": grid_id, "width": grid.width, "height": grid.height}
+
+    async def query(self, request):
+        path = self.grids.get(request.get("grid"))
+        if path is None:
+            raise ValueError(f"Unknown grid: {request.get('grid')!r} (upload it first)")
+        query = _query_from_request(request)
+        self.counters["queries"] += 1
+
+        # Coalesce with an identical search in flight
+        key = (path,) + query[:3] + (json.dumps(query[3], sort_keys=True),)
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(self.pool, _run_file_query, path, query)
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._search_done(key, done))
+            self.counters["searches"] += 1
+        else:
+            self.counters["coalesced"] += 1
+        # Shielded so that one waiter timing out does not cancel the others' search
+        return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+
+    def _search_done(self, key, future):
+        self._inflight.pop(key, None)
+        if not future.cancelled():
+            future.exception()  # Retrieved even when every waiter timed out
+
+
+async def serve(service, host='127.0.0.1', port=DEFAULT_PORT, unix_path=None,
+                max_line_bytes=DEFAULT_MAX_LINE_BYTES, backlog=DEFAULT_BACKLOG):
+    """Serve until cancelled"""
+    if unix_path is not None:
+        server = await asyncio.start_unix_server(service.handle_connection, unix_path,
+                                                 limit=max_line_bytes, backlog=backlog)
+        where = unix_path
+    else:
+        server = await asyncio.start_server(service.handle_connection, host, port,
+                                            limit=max_line_bytes, backlog=backlog)
+        where = ', '.join(f"{sock.getsockname()[0]}:{sock.getsockname()[1]}" for sock in server.sockets)
+    print(f"serving on {where} with {service.workers} workers", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve pathfinding queries as JSON lines")
+    parser.add_argument("--host", default='127.0.0.1')
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", default=None, help="listen on this Unix socket instead of TCP")
+    parser.add_argument("-g", "--grid", action="append", default=[],
+                        help="map file to serve from the start (repeatable); its id is printed")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument("--max-pending", type=int, default=DEFAULT_MAX_PENDING,
+                        help="requests worked on at once before clients are made to wait")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help="seconds a query may take before it is answered with an error")
+    parser.add_argument("--cache-mb", type=float, default=0,
+                        help="per-worker distance-field cache for BFS/UCS queries, in MB")
+    parser.add_argument("--path-cache", default=None, metavar="FILE",
+                        help="persistent result cache (SQLite) shared by the workers and across restarts")
+    parser.add_argument("--grid-dir", default=None,
+                        help="where uploaded grids are stored (default: a temporary directory)")
+    args = parser.parse_args(argv)
+
+    service = PathfindingService(args.workers, args.grid_dir, args.max_pending, args.timeout,
+                                 int(args.cache_mb * 1024 * 1024) or None, args.path_cache)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)  # Clean up as on Ctrl-C
+    try:
+        for path in args.grid:
+            print(f"{path}: grid {service.add_grid(path)}", file=sys.stderr)
+        asyncio.run(serve(service, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""Tests for the search algorithms against a reference Dijkstra and BFS on random grids"""
+import heapq
+import random
+from collections import deque
+import pytest
+from algorithms import ALGORITHMS, DEFAULT_PARAMS, bfs_multi, make_stepper, run_search, ucs_multi
+from algorithms.jump import jump_path, jump_search
+from algorithms.stepper import run_steps
+from algorithms.ucs import _ucs_bucket_search, ucs
+from utils.grid_utils import MOVES, initialize_grid, add_random_walls, path_cost
+from utils.search_state import NO_PARENT, SearchState
+from utils.stats import SearchStats
+
+# Searches that must return a cheapest path, with their parameters
+OPTIMAL_COST = [
+    ("UCS", {}),
+    ("UCS", {"backend": "bucket"}),
+    ("UCS", {"backend": "jump"}),
+    ("Bidirectional UCS", {}),
+]
+
+# Searches that must return a path with the fewest moves
+FEWEST_MOVES = [
+    ("BFS", {}),
+    ("Bidirectional", {}),
+]
+
+# Searches that only promise a valid path, with their parameters
+VALID_PATH = [
+    ("DFS", {}),
+    ("DLS", DEFAULT_PARAMS["DLS"]),
+    ("IDDFS", DEFAULT_PARAMS["IDDFS"]),
+    ("Bidirectional", {"balanced": False}),
+    ("Hierarchical", {}),
+]
+
+
+def reference_neighbors(rows, cell):
+    row, col = cell
+    for dr, dc, cost in MOVES:
+        r, c = row + dr, col + dc
+        if 0 <= r < len(rows) and 0 <= c < len(rows[0]) and rows[r][c] == 0:
+            yield (r, c), cost
+
+
+def reference_costs(rows, start):
+    """Cheapest cost from start to every reachable cell, by textbook Dijkstra"""
+    best = {start: 0}
+    queue = [(0, start)]
+    while queue:
+        cost, cell = heapq.heappop(queue)
+        if cost > best[cell]:
+            continue
+        for neighbor, move_cost in reference_neighbors(rows, cell):
+            if cost + move_cost < best.get(neighbor, float('inf')):
+                best[neighbor] = cost + move_cost
+                heapq.heappush(queue, (cost + move_cost, neighbor))
+    return best
+
+
+def reference_search(rows, start, goal):
+    """(cheapest cost, fewest moves) from start to goal, or (None, None), by textbook Dijkstra and BFS"""
+    depth = {start: 0}
+    frontier = deque([start])
+    while frontier:
+        cell = frontier.popleft()
+        for neighbor, _ in reference_neighbors(rows, cell):
+            if neighbor not in depth:
+                depth[neighbor] = depth[cell] + 1
+                frontier.append(neighbor)
+    return reference_costs(rows, start).get(goal), depth.get(goal)
+
+
+def assert_valid_path(grid, path, start, goal):
+    assert path[0] == start and path[-1] == goal
+    steps = {(dr, dc) for dr, dc, _ in MOVES}
+    for (r1, c1), (r2, c2) in zip(path, path[1:]):
+        assert (r2 - r1, c2 - c1) in steps
+        assert grid.is_open(r2, c2)
+
+
+def random_queries(seed, count=40, queries=5):
+    """(grid, rows, start, goal) on random grids of varied size and wall density"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        width, height = rng.randint(2, 24), rng.randint(2, 24)
+        grid = initialize_grid(width, height)
+        add_random_walls(grid, int(width * height * rng.uniform(0, 0.45)), rng)
+        rows = grid.to_rows()
+        open_cells = [(r, c) for r in range(height) for c in range(width) if rows[r][c] == 0]
+        if not open_cells:
+            continue
+        for _ in range(queries):
+            yield grid, rows, rng.choice(open_cells), rng.choice(open_cells)
+
+
+@pytest.mark.parametrize("name, params", OPTIMAL_COST)
+def test_cheapest_path_matches_dijkstra(name, params):
+    for grid, rows, start, goal in random_queries(1):
+        cost, _ = reference_search(rows, start, goal)
+        path, _ = ALGORITHMS[name](grid, start, goal, **params)
+        if cost is None:
+            assert path is None
+        else:
+            assert_valid_path(grid, path, start, goal)
+            assert path_cost(path) == pytest.approx(cost)
+
+
+@pytest.mark.parametrize("name, params", FEWEST_MOVES)
+def test_fewest_moves_matches_bfs(name, params):
+    for grid, rows, start, goal in random_queries(2):
+        _, moves = reference_search(rows, start, goal)
+        path, _ = ALGORITHMS[name](grid, start, goal, **params)
+        if moves is None:
+            assert path is None
+        else:
+            assert_valid_path(grid, path, start, goal)
+            assert len(path) - 1 == moves
+
+
+@pytest.mark.parametrize("name, params", VALID_PATH)
+def test_other_searches_return_valid_paths(name, params):
+    for grid, rows, start, goal in random_queries(3, count=25):
+        cost, _ = reference_search(rows, start, goal)
+        path, _ = ALGORITHMS[name](grid, start, goal, **params)
+        if path is None:
+            # Depth-limited searches may miss goals beyond their limit
+            assert cost is None or name in DEFAULT_PARAMS
+        else:
+            assert cost is not None
+            assert_valid_path(grid, path, start, goal)
+            assert path_cost(path) >= cost - 1e-9
+
+
+def test_depth_limits_are_exact():
+    for grid, rows, start, goal in random_queries(9, count=25, queries=3):
+        _, moves = reference_search(rows, start, goal)
+        if moves is None:
+            continue
+        # DLS finds a path exactly when one fits in the limit; IDDFS finds the shortest
+        path, _ = run_search("DLS", grid, start, goal, depth_limit=moves)
+        assert_valid_path(grid, path, start, goal)
+        assert len(path) - 1 <= moves
+        if moves:
+            assert run_search("DLS", grid, start, goal, depth_limit=moves - 1)[0] is None
+        path, _ = run_search("IDDFS", grid, start, goal, max_depth=moves + 1)
+        assert len(path) - 1 == moves
+
+
+def test_dls_expands_few_cells_twice():
+    grid = initialize_grid(200)
+    for depth_limit in (1000, 20000):
+        stats = SearchStats()
+        path, _ = run_search("DLS", grid, (0, 0), (199, 199), depth_limit=depth_limit, stats=stats)
+        assert path is not None
+        assert stats.expansions < 1000
+    # An unreachable goal (searched directly, not rejected by run_search) expands
+    # the whole map, each cell at most twice
+    grid[198][199] = grid[199][198] = grid[198][198] = 1
+    stats = SearchStats()
+    path, _ = ALGORITHMS["DLS"](grid, (0, 0), (199, 199), depth_limit=1000, stats=stats)
+    assert path is None
+    assert stats.expansions <= 2 * grid.size
+
+
+def test_parallel_bidirectional_matches_bfs():
+    for grid, rows, start, goal in random_queries(4, count=4, queries=2):
+        _, moves = reference_search(rows, start, goal)
+        path, _ = run_search("Bidirectional", grid, start, goal, backend="parallel")
+        if moves is None:
+            assert path is None
+        else:
+            assert_valid_path(grid, path, start, goal)
+            assert len(path) - 1 == moves
+
+
+def test_bucket_queue_settles_every_cell_at_its_dijkstra_cost():
+    decreased = 0
+    for grid, rows, start, _ in random_queries(7, count=20, queries=1):
+        state = SearchState(grid)
+        stats = SearchStats()
+        run_steps(_ucs_bucket_search(grid, [grid.cell_id(*start)], NO_PARENT, state, stats=stats))
+        expected = reference_costs(rows, start)
+        for cell in range(grid.size):
+            cost = expected.get(divmod(cell, grid.width))
+            if cost is None:
+                assert not state.is_visited(cell)
+            else:
+                assert state.cost[cell] == pytest.approx(cost)
+        # Decrease-key moves queued cells, so every cell is expanded once
+        assert stats.stale_pops == 0
+        assert stats.expansions == len(expected) == stats.pushes - stats.duplicate_pushes
+        decreased += stats.duplicate_pushes
+    assert decreased > 0
+
+
+def test_jump_points_give_cheapest_paths_around_walls():
+    # ucs only jumps on open maps, but the pruning rules must hold next to any wall
+    for grid, rows, start, goal in random_queries(10, count=25, queries=2):
+        cost, _ = reference_search(rows, start, goal)
+        goal_id = grid.cell_id(*goal)
+        state = SearchState(grid)
+        found = run_steps(jump_search(grid, grid.cell_id(*start), goal_id, state))
+        assert found == (cost is not None)
+        if found:
+            path = jump_path(state, goal_id)
+            assert_valid_path(grid, path, start, goal)
+            assert path_cost(path) == pytest.approx(cost)
+
+
+def test_jump_backend_only_jumps_on_open_maps():
+    grid = initialize_grid(60)
+    stats = SearchStats()
+    ucs(grid, (0, 0), (59, 59), backend="jump", stats=stats)
+    assert stats.expansions < 10
+    grid[30][20] = 1
+    stats = SearchStats()
+    path, _ = ucs(grid, (0, 0), (59, 59), backend="jump", stats=stats)
+    assert stats.expansions > 1000
+    assert path == ucs(grid, (0, 0), (59, 59))[0]
+
+
+def test_multi_goal_queries_match_the_reference():
+    for grid, rows, start, goal in random_queries(5, count=20, queries=1):
+        rng = random.Random(str(goal))
+        open_cells = [(r, c) for r, row in enumerate(rows) for c, value in enumerate(row) if value == 0]
+        sources = [start, rng.choice(open_cells)]
+        goals = rng.sample(open_cells, min(4, len(open_cells)))
+        paths, _ = ucs_multi(grid, sources, goals)
+        assert ucs_multi(grid, sources, goals, backend="bucket")[0].keys() == paths.keys()
+        moves_paths, _ = bfs_multi(grid, sources, goals)
+        for target in goals:
+            results = [reference_search(rows, source, target) for source in sources]
+            reachable = [result for result in results if result[0] is not None]
+            if not reachable:
+                assert target not in paths and target not in moves_paths
+                continue
+            assert paths[target][0] in sources and paths[target][-1] == target
+            assert path_cost(paths[target]) == pytest.approx(min(cost for cost, _ in reachable))
+            assert len(moves_paths[target]) - 1 == min(moves for _, moves in reachable)
+        # Goals come back in order of cost
+        costs = [path_cost(path) for path in paths.values()]
+        assert costs == sorted(costs)
+
+
+def test_stepper_gives_the_same_result():
+    for grid, rows, start, goal in random_queries(6, count=10, queries=2):
+        for name in ("BFS", "UCS", "Bidirectional UCS"):
+            stepper = make_stepper(name, grid, start, goal)
+            while not stepper.done:
+                stepper.step(7)
+            path, visited = run_search(name, grid, start, goal)
+            assert stepper.result[0] == path
+            assert len(stepper.result[1]) == len(visited)
+
+
+def test_walls_and_off_grid_endpoints_find_nothing():
+    grid = initialize_grid(5)
+    grid[2][2] = 1
+    for name in ALGORITHMS:
+        for start, goal in [((0, 0), (2, 2)), ((0, 0), (0, 5)), ((-1, 0), (4, 4)), ((0, 0), (5, 0))]:
+            path, _ = run_search(name, grid, start, goal)
+            assert path is None, (name, start, goal)
+
+
+def test_start_is_goal():
+    grid = initialize_grid(4)
+    for name in ALGORITHMS:
+        path, _ = run_search(name, grid, (1, 1), (1, 1))
+        assert path == [(1, 1)], name
+
+
+def test_unknown_backend_is_rejected():
+    grid = initialize_grid(3)
+    with pytest.raises(ValueError):
+        ucs(grid, (0, 0), (2, 2), backend="fibonacci")
+
+
+@pytest.mark.parametrize("backend", ["queue", "wavefront"])
+def test_bfs_steps_are_expansions(backend):
+    if backend == "wavefront":
+        pytest.importorskip("numpy")
+    grid = initialize_grid(40)
+    add_random_walls(grid, 400, rng=8)
+    grid[0][0] = grid[39][39] = 0
+    stats = SearchStats()
+    expected, _ = run_search("BFS", grid, (0, 0), (39, 39), backend=backend, stats=stats)
+    stepper = make_stepper("BFS", grid, (0, 0), (39, 39), backend=backend)
+    while not stepper.step(50):
+        pass
+    assert stepper.result[0] == expected
+    # Every expansion but the goal's is a step
+    assert stats.expansions - 1 <= stepper.expansions <= stats.expansions
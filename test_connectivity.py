@@ -0,0 +1,96 @@
+"""Tests for the connected-component index (utils/connectivity.py)"""
+import random
+from algorithms import run_search
+from algorithms.bfs import bfs
+from utils.connectivity import ConnectivityIndex, NO_LABEL, get_connectivity
+from utils.grid_utils import Grid, WALL, initialize_grid, add_random_walls
+
+
+def corridor():
+    """3x5 grid whose middle row is the only way from the left column to the right one"""
+    return Grid.from_rows([
+        [0, WALL, WALL, WALL, 0],
+        [0, 0, 0, 0, 0],
+        [0, WALL, WALL, WALL, 0],
+    ])
+
+
+def test_labels_match_bfs_reachability():
+    rng = random.Random(1)
+    for _ in range(30):
+        size = rng.randint(3, 20)
+        grid = initialize_grid(size)
+        add_random_walls(grid, int(size * size * rng.uniform(0.2, 0.5)), rng)
+        index = ConnectivityIndex(grid, track_changes=False)
+        for _ in range(10):
+            start = (rng.randrange(size), rng.randrange(size))
+            goal = (rng.randrange(size), rng.randrange(size))
+            if not (grid.is_open(*start) and grid.is_open(*goal)):
+                continue
+            path, _ = bfs(grid, start, goal)
+            assert index.reachable(start, goal) == (path is not None)
+
+
+def test_closing_a_bridge_splits_the_component():
+    grid = corridor()
+    index = ConnectivityIndex(grid)
+    assert index.component_count() == 1
+    assert index.reachable((0, 0), (0, 4))
+
+    grid[1][2] = WALL
+    assert index.component(1, 2) == NO_LABEL
+    assert not index.reachable((0, 0), (0, 4))
+    assert index.relabels == 1
+    assert index.component_count() == 2
+    assert index.reachable((2, 0), (1, 1))
+    # The part not flooded from the start is relabeled on its first query, then both are clean
+    assert index.reachable((2, 4), (0, 4))
+    assert index.relabels == 2
+    assert index.reachable((1, 3), (2, 4))
+    assert not index.reachable((1, 1), (1, 3))
+    assert index.relabels == 2
+
+
+def test_closing_a_cell_with_joined_neighbors_keeps_the_component_clean():
+    grid = initialize_grid(5)
+    index = ConnectivityIndex(grid)
+    grid[2][2] = WALL
+    assert index.reachable((0, 0), (4, 4))
+    assert index.relabels == 0
+
+
+def test_reopening_a_cell_joins_components():
+    grid = corridor()
+    grid[1][2] = WALL
+    index = ConnectivityIndex(grid)
+    assert index.component_count() == 2
+    assert not index.reachable((0, 0), (0, 4))
+
+    grid[1][2] = 0
+    assert index.reachable((0, 0), (0, 4))
+    assert index.component_count() == 1
+
+
+def test_random_edits_stay_exact():
+    rng = random.Random(7)
+    grid = initialize_grid(12)
+    add_random_walls(grid, 50, rng)
+    index = ConnectivityIndex(grid)
+    for _ in range(300):
+        row, col = rng.randrange(12), rng.randrange(12)
+        grid[row][col] = WALL if grid[row][col] != WALL else 0
+        start = (rng.randrange(12), rng.randrange(12))
+        goal = (rng.randrange(12), rng.randrange(12))
+        if grid.is_open(*start) and grid.is_open(*goal):
+            path, _ = bfs(grid, start, goal)
+            assert index.reachable(start, goal) == (path is not None)
+
+
+def test_unreachable_queries_are_rejected_without_searching():
+    grid = corridor()
+    grid[1][2] = WALL
+    assert get_connectivity(grid) is get_connectivity(grid)
+    for name in ("BFS", "UCS", "Bidirectional"):
+        path, visited = run_search(name, grid, (0, 0), (0, 4))
+        assert path is None
+        assert len(visited) == 0
@@ -0,0 +1,150 @@
+"""Tests for the grid file formats: text, binary .grid, octile .map and tiled .tiles"""
+import pytest
+from algorithms import PAGED_ALGORITHMS, run_search
+from utils.grid_utils import (Grid, WALL, initialize_grid, add_random_walls, as_grid, load_grid,
+                              open_grid_file, save_grid, save_grid_file)
+from utils.tiled_grid import TiledGrid, write_tiled_grid
+
+
+def random_grid(width, height, seed):
+    grid = initialize_grid(width, height)
+    add_random_walls(grid, width * height // 3, rng=seed)
+    return grid
+
+
+def write_map(path, lines):
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+@pytest.mark.parametrize("extension", [".txt", ".grid", ".tiles"])
+def test_save_and_load_round_trip(tmp_path, extension):
+    grid = random_grid(13, 7, seed=1)
+    path = str(tmp_path / f"map{extension}")
+    save_grid(grid, path)
+    loaded = load_grid(path)
+    assert (loaded.width, loaded.height) == (13, 7)
+    for row in range(7):
+        for col in range(13):
+            assert loaded.get_cell(row, col) == grid.get_cell(row, col)
+    if extension == ".tiles":
+        loaded.close()
+    else:
+        assert loaded.fingerprint() == grid.fingerprint()
+
+
+def test_text_format_accepts_both_wall_marks(tmp_path):
+    path = tmp_path / "map.txt"
+    path.write_text("#.1\n\n0..\n")
+    grid = load_grid(str(path))
+    assert grid.to_rows() == [[WALL, 0, WALL], [0, 0, 0]]
+
+
+def test_grid_file_changes_stay_private_unless_writable(tmp_path):
+    path = str(tmp_path / "map.grid")
+    save_grid_file(initialize_grid(4), path)
+
+    private = open_grid_file(path)
+    private[1][1] = WALL
+    assert open_grid_file(path).get_cell(1, 1) == 0
+
+    shared = open_grid_file(path, writable=True)
+    shared[2][3] = WALL
+    del shared
+    assert open_grid_file(path).get_cell(2, 3) == WALL
+
+
+def test_grid_file_rejects_other_and_truncated_files(tmp_path):
+    other = tmp_path / "other.grid"
+    other.write_bytes(b"not a grid file at all")
+    with pytest.raises(ValueError, match="not a grid file"):
+        open_grid_file(str(other))
+
+    path = tmp_path / "map.grid"
+    save_grid_file(initialize_grid(5), str(path))
+    path.write_bytes(path.read_bytes()[:-3])
+    with pytest.raises(ValueError, match="truncated"):
+        open_grid_file(str(path))
+
+
+def test_octile_map_terrain(tmp_path):
+    path = write_map(tmp_path / "arena.map", [
+        "type octile", "height 3", "width 4", "map",
+        ".@T.",
+        "G..W",
+        "S.O.",
+    ])
+    grid = load_grid(path)
+    assert isinstance(grid, Grid)
+    assert grid.to_rows() == [
+        [0, WALL, WALL, 0],
+        [0, 0, 0, WALL],
+        [0, 0, WALL, 0],
+    ]
+    path, _ = run_search("BFS", grid, (0, 0), (2, 3))
+    assert path == [(0, 0), (1, 1), (1, 2), (2, 3)]
+
+
+def test_octile_map_errors(tmp_path):
+    no_map = write_map(tmp_path / "no_map.map", ["type octile", "height 1", "width 2", ".."])
+    with pytest.raises(ValueError, match="no 'map' section"):
+        load_grid(no_map)
+    short = write_map(tmp_path / "short.map", ["type octile", "height 2", "width 2", "map", ".."])
+    with pytest.raises(ValueError, match="expected 2 rows of 2 cells"):
+        load_grid(short)
+
+
+def test_tiled_grid_matches_the_grid(tmp_path):
+    grid = random_grid(23, 17, seed=2)
+    path = str(tmp_path / "map.tiles")
+    write_tiled_grid(grid, path, tile_size=5)  # Edge tiles are padded
+    with TiledGrid(path) as tiled:
+        assert (tiled.tiles_x, tiled.tiles_y) == (5, 4)
+        for cell in range(grid.size):
+            row, col = divmod(cell, grid.width)
+            assert tiled.is_open(row, col) == grid.is_open(row, col)
+            if grid.is_open(row, col):
+                assert tiled.neighbors(cell) == grid.neighbors(cell)
+            else:
+                assert tiled.neighbors(cell) == []
+        assert not tiled.is_open(17, 0) and not tiled.in_bounds(0, 23)
+
+
+def test_tile_cache_evicts_least_recently_used(tmp_path):
+    path = str(tmp_path / "map.tiles")
+    write_tiled_grid(initialize_grid(8), path, tile_size=4)
+    with TiledGrid(path, cache_bytes=2 * 16) as tiled:
+        for row, col in [(0, 0), (0, 4), (0, 1), (4, 0), (0, 2), (0, 5)]:
+            tiled.get_cell(row, col)
+        assert tiled.io_counters() == {
+            "tile_reads": 4, "bytes_read": 64, "cache_hits": 2, "evictions": 2, "cached_tiles": 2,
+        }
+
+
+def test_tiled_searches_match_in_memory_searches(tmp_path):
+    grid = random_grid(30, 30, seed=3)
+    grid[0][0] = grid[29][29] = 0
+    path = str(tmp_path / "map.tiles")
+    write_tiled_grid(grid, path, tile_size=8)
+    with TiledGrid(path, cache_bytes=4 * 64) as tiled:
+        for name in PAGED_ALGORITHMS:
+            expected, expected_visited = run_search(name, grid, (0, 0), (29, 29))
+            found, visited = run_search(name, tiled, (0, 0), (29, 29))
+            assert found == expected
+            assert len(visited) == len(expected_visited)
+        assert run_search("BFS", tiled, (0, 0), (30, 0)) == (None, frozenset())
+        # A wall start has no moves out of it, as on the in-memory grid
+        wall = next(divmod(cell, 30) for cell in range(grid.size) if grid.cells[cell] == WALL)
+        for name in PAGED_ALGORITHMS:
+            assert run_search(name, grid, wall, (29, 29))[0] is None
+            assert run_search(name, tiled, wall, (29, 29))[0] is None
+        assert tiled.io_counters()["evictions"] > 0
+        with pytest.raises(ValueError, match="paged"):
+            as_grid(tiled)
+
+
+def test_tiled_grid_rejects_other_files(tmp_path):
+    path = str(tmp_path / "map.grid")
+    save_grid_file(initialize_grid(3), path)
+    with pytest.raises(ValueError, match="not a tiled grid file"):
+        TiledGrid(path)
@@ -0,0 +1,121 @@
+"""Tests for the persistent path result cache (utils/path_cache.py)"""
+import gc
+import sqlite3
+import pytest
+from batch import run_query
+from utils.grid_utils import WALL, initialize_grid, add_random_walls
+from utils.path_cache import MAX_RUN, PathCache, decode_path, encode_path
+
+
+@pytest.fixture
+def cache(tmp_path):
+    with PathCache(str(tmp_path / "paths.db")) as path_cache:
+        yield path_cache
+
+
+def test_encode_decode_round_trip():
+    path = [(0, 0)] + [(row, 0) for row in range(1, 40)] + [(40, 1), (41, 2), (40, 2), (40, 3)]
+    data = encode_path(path)
+    assert len(data) == 5  # 39 downs (runs of 32 and 7), 2 down-rights, 1 up, 1 right
+    assert decode_path(path[0], data) == path
+    assert decode_path((3, 3), encode_path([(3, 3)])) == [(3, 3)]
+    assert MAX_RUN == 32
+
+
+def test_encode_rejects_non_moves():
+    with pytest.raises(ValueError):
+        encode_path([(0, 0), (2, 0)])
+
+
+def test_get_put_and_hit_counters(cache):
+    grid = initialize_grid(5)
+    assert cache.get(grid, (0, 0), (4, 4), "BFS") is None
+    path = [(0, 0), (1, 1), (2, 2), (3, 3), (4, 4)]
+    cache.put(grid, (0, 0), (4, 4), "BFS", {}, path, 17)
+    assert cache.get(grid, (0, 0), (4, 4), "BFS") == (path, 17)
+    assert cache.get(grid, (0, 0), (4, 4), "UCS") is None
+    assert cache.get(grid, (0, 0), (4, 4), "BFS", {"backend": "wavefront"}) is None
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_unreachable_results_are_cached(cache):
+    grid = initialize_grid(3)
+    cache.put(grid, (0, 0), (2, 2), "BFS", {}, None, 4)
+    assert cache.get(grid, (0, 0), (2, 2), "BFS") == (None, 4)
+
+
+def test_key_is_the_grid_content(cache):
+    grid = initialize_grid(4)
+    cache.put(grid, (0, 0), (3, 3), "BFS", {}, [(0, 0), (1, 1), (2, 2), (3, 3)], 9)
+    assert cache.get(grid.copy(), (0, 0), (3, 3), "BFS") is not None
+    other = grid.copy()
+    other[0][3] = WALL
+    assert cache.get(other, (0, 0), (3, 3), "BFS") is None
+
+
+def test_watch_deletes_stale_results(cache):
+    grid = initialize_grid(4)
+    cache.watch(grid)
+    cache.put(grid, (0, 0), (3, 3), "BFS", {}, [(0, 0), (1, 1), (2, 2), (3, 3)], 9)
+    assert len(cache) == 1
+    grid[1][2] = WALL
+    assert len(cache) == 0
+    # Results put after the change are invalidated by the next one
+    cache.put(grid, (0, 0), (3, 3), "BFS", {}, [(0, 0), (1, 1), (2, 2), (3, 3)], 9)
+    grid[1][2] = 0
+    assert len(cache) == 0
+
+
+def test_watched_grids_are_not_kept_alive(cache):
+    grid = initialize_grid(4)
+    cache.watch(grid)
+    assert len(cache._watched) == 1
+    del grid
+    gc.collect()
+    assert len(cache._watched) == 0
+
+
+def test_off_grid_queries_are_not_cached(cache):
+    grid = initialize_grid(5)
+    cache.put(grid, (0, 0), (1, 0), "BFS", {}, [(0, 0), (1, 0)], 2)
+    # (0, 5) would have the same cell id as (1, 0)
+    cache.put(grid, (0, 0), (0, 5), "BFS", {}, None, 0)
+    assert cache.get(grid, (0, 0), (0, 5), "BFS") is None
+    assert len(cache) == 1
+
+
+def test_shared_file_between_instances(tmp_path):
+    filename = str(tmp_path / "shared.db")
+    grid = initialize_grid(6)
+    with PathCache(filename) as first, PathCache(filename) as second:
+        first.put(grid, (0, 0), (5, 5), "BFS", {}, [(0, 0), (1, 1), (2, 2), (3, 3), (4, 4), (5, 5)], 30)
+        assert second.get(grid, (0, 0), (5, 5), "BFS")[1] == 30
+
+
+def test_changed_format_starts_empty(tmp_path):
+    filename = str(tmp_path / "old.db")
+    grid = initialize_grid(3)
+    with PathCache(filename) as cache:
+        cache.put(grid, (0, 0), (2, 2), "BFS", {}, [(0, 0), (1, 1), (2, 2)], 5)
+    db = sqlite3.connect(filename)
+    with db:
+        db.execute("UPDATE meta SET value='0' WHERE key='format'")
+    db.close()
+    with PathCache(filename) as cache:
+        assert len(cache) == 0
+
+
+def test_batch_queries_are_answered_from_the_cache(cache):
+    grid = initialize_grid(20)
+    add_random_walls(grid, 60, rng=2)
+    grid[0][0] = grid[19][19] = 0
+    query = ((0, 0), (19, 19), "DLS", {})
+    first = run_query(grid, query, path_cache=cache)
+    second = run_query(grid, query, path_cache=cache)
+    assert second["path"] == first["path"]
+    assert first["nodes_explored"] > 0
+    assert second["nodes_explored"] == 0
+    # Explicit default parameters share the entry
+    third = run_query(grid, ((0, 0), (19, 19), "DLS", {"depth_limit": 25}), path_cache=cache)
+    assert third["nodes_explored"] == 0
+    assert cache.hits == 2
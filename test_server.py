@@ -0,0 +1,100 @@
+"""Tests for the JSON-lines query service (server.py)"""
+import asyncio
+import json
+import pytest
+from server import PathfindingService
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = PathfindingService(workers=1, grid_dir=str(tmp_path))
+    yield service
+    service.close()
+
+
+def open_rows(size):
+    return ["." * size] * size
+
+
+async def exchange(service, requests):
+    """Send requests over one TCP connection; returns the replies by id"""
+    server = await asyncio.start_server(service.handle_connection, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        for request in requests:
+            writer.write(json.dumps(request).encode() + b'\n')
+        await writer.drain()
+        replies = {}
+        for _ in requests:
+            reply = json.loads(await reader.readline())
+            replies[reply["id"]] = reply
+        writer.close()
+        await writer.wait_closed()
+    return replies
+
+
+def upload_and(service, size, requests):
+    """Upload an open size x size grid, then send requests with "grid" filled in"""
+    async def run():
+        uploaded = await service.dispatch({"op": "upload", "rows": open_rows(size)})
+        for request in requests:
+            request.setdefault("grid", uploaded["grid"])
+        return await exchange(service, requests)
+    return asyncio.run(run())
+
+
+def test_upload_and_query(service):
+    replies = upload_and(service, 5, [
+        {"id": 1, "op": "query", "start": [0, 0], "goal": [4, 4], "algorithm": "bfs"},
+        {"id": 2, "op": "stats"},
+    ])
+    result = replies[1]["result"]
+    assert result["path"][0] == [0, 0] and result["path"][-1] == [4, 4]
+    assert len(result["path"]) == 5
+    assert replies[2]["stats"]["grids"] == 1
+
+
+def test_identical_queries_in_flight_share_one_search(service):
+    query = {"op": "query", "start": [0, 0], "goal": [299, 299], "algorithm": "UCS"}
+    replies = upload_and(service, 300, [dict(query, id=i) for i in range(5)])
+    paths = {json.dumps(reply["result"]["path"]) for reply in replies.values()}
+    assert len(paths) == 1
+    assert service.counters["queries"] == 5
+    assert service.counters["searches"] == 1
+    assert service.counters["coalesced"] == 4
+    assert not service._inflight
+
+
+def test_different_params_are_not_coalesced(service):
+    query = {"op": "query", "start": [0, 0], "goal": [20, 20], "algorithm": "UCS"}
+    upload_and(service, 30, [dict(query, id=1), dict(query, id=2, params={"backend": "jump"})])
+    assert service.counters["searches"] == 2
+    assert service.counters["coalesced"] == 0
+
+
+def test_slow_queries_time_out(tmp_path):
+    service = PathfindingService(workers=1, grid_dir=str(tmp_path), timeout=0.001)
+    try:
+        query = {"op": "query", "start": [0, 0], "goal": [399, 399], "algorithm": "UCS"}
+        replies = upload_and(service, 400, [dict(query, id=1), dict(query, id=2)])
+    finally:
+        service.close()
+    for reply in replies.values():
+        assert reply["error"].startswith("timed out")
+    assert service.counters["timeouts"] == 2
+    assert service.counters["searches"] == 1
+
+
+def test_bad_requests_get_errors(service):
+    replies = upload_and(service, 3, [
+        {"id": 1, "op": "query", "grid": "nope", "start": [0, 0], "goal": [1, 1]},
+        {"id": 2, "op": "query", "start": [0], "goal": [1, 1]},
+        {"id": 3, "op": "fly"},
+        {"id": 4, "op": "query", "start": [0, 0], "goal": [1, 1], "algorithm": "A*"},
+    ])
+    assert "Unknown grid" in replies[1]["error"]
+    assert "start" in replies[2]["error"]
+    assert "Unknown op" in replies[3]["error"]
+    assert "Unknown algorithm" in replies[4]["error"]
+    assert service.counters["errors"] == 4
@@ -0,0 +1,154 @@
+"""Precomputed compressed-sparse-row (CSR) adjacency index for static grids"""
+import weakref
+from array import array
+from collections import OrderedDict
+from utils.grid_utils import MOVES, WALL, np
+
+# Number of adjacency indexes kept for grids that are not alive any more
+ADJACENCY_CACHE_SIZE = 8
+
+# Cells per block of rows in the NumPy build
+_BUILD_BLOCK_CELLS = 1 << 20
+
+_by_fingerprint = OrderedDict()
+_by_grid = weakref.WeakKeyDictionary()
+
+
+class Adjacency:
+    """
+    CSR adjacency of a Grid
+    The neighbors of cell c are targets[offsets[c]:offsets[c + 1]], in DIRECTIONS
+    order; moves holds the DIRECTIONS index of each edge, so the cost of edge k
+    is move_costs[moves[k]]
+    """
+    def __init__(self, fingerprint, offsets, targets, moves):
+        self.fingerprint = fingerprint
+        self.offsets = offsets
+        self.targets = targets
+        self.moves = moves
+        self.move_costs = tuple(cost for _, _, cost in MOVES)
+
+    def neighbors(self, cell):
+        """(neighbor id, move cost) pairs of cell"""
+        targets, moves, move_costs = self.targets, self.moves, self.move_costs
+        return [(targets[k], move_costs[moves[k]])
+                for k in range(self.offsets[cell], self.offsets[cell + 1])]
+
+    def edge_count(self):
+        return len(self.targets)
+
+    def nbytes(self):
+        """Memory used by the index arrays"""
+        return sum(a.itemsize * len(a) for a in (self.offsets, self.targets, self.moves))
+
+
+def build_adjacency(grid):
+    """Build the CSR adjacency of grid (walls have no edges)"""
+    if np is not None and grid.size > 4096:
+        return _build_numpy(grid)
+
+    width, height, cells = grid.width, grid.height, grid.cells
+    offsets = array('i', [0]) * (grid.size + 1)
+    targets = array('i')
+    moves = array('B')
+    edges = 0
+    for cell in range(grid.size):
+        if cells[cell] != WALL:
+            row, col = divmod(cell, width)
+            for move, (dr, dc, _) in enumerate(MOVES):
+                new_row, new_col = row + dr, col + dc
+                if 0 <= new_row < height and 0 <= new_col < width:
+                    neighbor = new_row * width + new_col
+                    if cells[neighbor] != WALL:
+                        targets.append(neighbor)
+                        moves.append(move)
+                        edges += 1
+        offsets[cell + 1] = edges
+    return Adjacency(grid.fingerprint(), offsets, targets, moves)
+
+
+def _build_numpy(grid):
+    """
+    Vectorized build of the same index
+    Works through blocks of rows and writes straight into the final arrays,
+    so peak memory stays close to the size of the index itself
+    """
+    height, width = grid.height, grid.width
+    open_cells = grid.as_array() != WALL
+    deltas = np.array([dr * width + dc for dr, dc, _ in MOVES], dtype=np.int64)
+    block = max(1, _BUILD_BLOCK_CELLS // max(1, width))
+
+    # First pass: edge counts per cell, accumulated into offsets
+    offsets = array('i', [0]) * (grid.size + 1)
+    offsets_view = np.frombuffer(offsets, dtype=np.int32)
+    for first_row in range(0, height, block):
+        last_row = min(height, first_row + block)
+        valid = _valid_moves(open_cells, first_row, last_row)
+        offsets_view[first_row * width + 1:last_row * width + 1] = valid.sum(axis=2).ravel()
+    np.cumsum(offsets_view, out=offsets_view)
+
+    # Second pass: edges come out in (cell, move) order, matching the pure Python build
+    edges = int(offsets_view[-1])
+    targets = array('i', [0]) * edges
+    moves = array('B', [0]) * edges
+    targets_view = np.frombuffer(targets, dtype=np.int32)
+    moves_view = np.frombuffer(moves, dtype=np.uint8)
+    for first_row in range(0, height, block):
+        last_row = min(height, first_row + block)
+        valid = _valid_moves(open_cells, first_row, last_row)
+        cell_idx, move_idx = np.nonzero(valid.reshape(-1, len(MOVES)))
+        begin = int(offsets_view[first_row * width])
+        end = begin + len(cell_idx)
+        targets_view[begin:end] = cell_idx + first_row * width + deltas[move_idx]
+        moves_view[begin:end] = move_idx
+    del offsets_view, targets_view, moves_view  # Release the buffer exports
+
+    return Adjacency(grid.fingerprint(), offsets, targets, moves)
+
+
+def _valid_moves(open_cells, first_row, last_row):
+    """
+    valid[r, c, m] is True when move m from open cell (first_row + r, c) lands on
+    an open cell
+    """
+    height, width = open_cells.shape
+    valid = np.zeros((last_row - first_row, width, len(MOVES)), dtype=bool)
+    for move, (dr, dc, _) in enumerate(MOVES):
+        # Source rows of the block whose destination row is inside the grid
+        low, high = max(first_row, -dr), min(last_row, height - dr)
+        if low >= high:
+            continue
+        src_cols = slice(max(0, -dc), min(width, width - dc))
+        dst_cols = slice(max(0, dc), min(width, width + dc))
+        valid[low - first_row:high - first_row, src_cols, move] = (
+            open_cells[low:high, src_cols] & open_cells[low + dr:high + dr, dst_cols])
+    return valid
+
+
+def get_adjacency(grid):
+    """
+    Adjacency index for grid, built once and reused
+    Cached per grid object (checked against grid.version) and by grid fingerprint,
+    so it is rebuilt lazily only when the grid contents change
+    """
+    cached = _by_grid.get(grid)
+    if cached is not None and cached[0] == grid.version:
+        return cached[1]
+
+    fingerprint = grid.fingerprint()
+    adjacency = _by_fingerprint.get(fingerprint)
+    if adjacency is None:
+        adjacency = build_adjacency(grid)
+        _by_fingerprint[fingerprint] = adjacency
+        while len(_by_fingerprint) > ADJACENCY_CACHE_SIZE:
+            _by_fingerprint.popitem(last=False)
+    else:
+        _by_fingerprint.move_to_end(fingerprint)
+
+    _by_grid[grid] = (grid.version, adjacency)
+    return adjacency
+
+
+def clear_adjacency_cache():
+    _by_fingerprint.clear()
+    _by_grid.clear()
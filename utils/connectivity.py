@@ -0,0 +1,255 @@
+"""Connected-component index for rejecting unreachable queries before searching"""
+import re
+import weakref
+from array import array
+from collections import deque
+from config import DIRECTIONS
+from utils.grid_utils import MOVES_REVERSIBLE, WALL
+
+# Moves with their reverses added: components are taken over this undirected
+# version of the move graph (weakly connected components)
+UNDIRECTED_MOVES = sorted(set(DIRECTIONS) | {(-dr, -dc) for dr, dc in DIRECTIONS})
+
+# Column offsets, as seen from the lower row, of the moves between two adjacent rows
+_ROW_OFFSETS = sorted({dc if dr == -1 else -dc for dr, dc in UNDIRECTED_MOVES if abs(dr) == 1})
+
+# Whether components can be built from runs of open cells: every move stays
+# within a row or goes to an adjacent one, horizontal moves join a row's run,
+# and the offsets between rows are contiguous
+_RUN_BUILD = (
+    all(abs(dr) <= 1 for dr, _ in UNDIRECTED_MOVES)
+    and {dc for dr, dc in UNDIRECTED_MOVES if dr == 0} == {-1, 1}
+    and bool(_ROW_OFFSETS)
+    and _ROW_OFFSETS == list(range(_ROW_OFFSETS[0], _ROW_OFFSETS[-1] + 1))
+)
+
+_OPEN_RUN = re.compile(b'[^\\x01]+')
+NO_LABEL = -1
+
+_indexes = weakref.WeakKeyDictionary()
+
+
+class ConnectivityIndex:
+    """
+    Component label of every open cell, kept up to date as walls change
+    Components are those of the move graph with every move made two-way, so
+    cells with different labels can never reach each other. With reversible
+    moves (the default six) that is exact: same label means reachable.
+    Otherwise a shared label only means a search is needed.
+
+    Opening a cell unions its label with its neighbors' (union-find over
+    labels). Closing one may split its component; if the cell's open
+    neighbors are still joined around it nothing can split, otherwise the
+    component is marked dirty and the next query inside it relabels the part
+    reachable from its start with a flood fill
+    """
+    def __init__(self, grid, track_changes=True):
+        self._grid = weakref.ref(grid)
+        self.width = grid.width
+        self.labels = array('i', [NO_LABEL]) * grid.size
+        self._parent = []  # Union-find over labels
+        self._dirty = set()  # Root labels whose component may have split
+        self.relabels = 0  # Flood fills run to split dirty components
+        self._tracking = track_changes
+        if track_changes:
+            grid.add_listener(self._on_change)
+        if _RUN_BUILD:
+            self._build_runs(grid)
+        else:
+            self._build_flood(grid)
+
+    @property
+    def grid(self):
+        return self._grid()
+
+    def close(self):
+        """Stop listening to grid changes"""
+        grid = self.grid
+        if self._tracking and grid is not None:
+            grid.remove_listener(self._on_change)
+        self._tracking = False
+
+    def _new_label(self):
+        self._parent.append(len(self._parent))
+        return len(self._parent) - 1
+
+    def _find(self, label):
+        parent = self._parent
+        while parent[label] != label:
+            parent[label] = parent[parent[label]]
+            label = parent[label]
+        return label
+
+    def _union(self, a, b):
+        a, b = self._find(a), self._find(b)
+        if a == b:
+            return a
+        if a > b:
+            a, b = b, a
+        self._parent[b] = a
+        if b in self._dirty:
+            self._dirty.discard(b)
+            self._dirty.add(a)
+        return a
+
+    def _build_runs(self, grid):
+        """Label maximal runs of open cells per row, then union runs that touch across rows"""
+        width, cells = grid.width, grid.cells
+        low, high = _ROW_OFFSETS[0], _ROW_OFFSETS[-1]
+        run_parent = []  # Union-find over runs, in row-major order
+        spans = array('q')  # First and end cell id of every run
+        previous = []  # (first col, last col, run) of the row above
+        for row in range(grid.height):
+            offset = row * width
+            current = []
+            for match in _OPEN_RUN.finditer(cells[offset:offset + width]):
+                run = len(run_parent)
+                run_parent.append(run)
+                spans.append(offset + match.start())
+                spans.append(offset + match.end())
+                current.append((match.start(), match.end() - 1, run))
+            # Join each run to the runs of the row above within [first + low, last + high]
+            j = 0
+            for first, last, run in current:
+                while j < len(previous) and previous[j][1] < first + low:
+                    j += 1
+                k = j
+                while k < len(previous) and previous[k][0] <= last + high:
+                    a, b = _root(run_parent, run), _root(run_parent, previous[k][2])
+                    if a != b:
+                        run_parent[max(a, b)] = min(a, b)
+                    k += 1
+            previous = current
+
+        # One label per component, written a run at a time
+        roots = {}
+        labels = self.labels
+        for run in range(len(run_parent)):
+            root = _root(run_parent, run)
+            label = roots.get(root)
+            if label is None:
+                label = roots[root] = self._new_label()
+            first, end = spans[2 * run], spans[2 * run + 1]
+            labels[first:end] = array('i', [label]) * (end - first)
+
+    def _build_flood(self, grid):
+        """Label components one flood fill at a time (any move set)"""
+        cells = grid.cells
+        for cell in range(grid.size):
+            if cells[cell] != WALL and self.labels[cell] == NO_LABEL:
+                self._flood(cell, self._new_label())
+
+    def _neighbors(self, cell):
+        """Open neighbors of cell over the two-way moves"""
+        grid = self.grid
+        width, height, cells = grid.width, grid.height, grid.cells
+        row, col = divmod(cell, width)
+        for dr, dc in UNDIRECTED_MOVES:
+            new_row, new_col = row + dr, col + dc
+            if 0 <= new_row < height and 0 <= new_col < width:
+                neighbor = new_row * width + new_col
+                if cells[neighbor] != WALL:
+                    yield neighbor
+
+    def _flood(self, source, label):
+        """Give label to every cell connected to source; returns the cells labeled"""
+        labels = self.labels
+        labels[source] = label
+        queue = deque([source])
+        count = 1
+        while queue:
+            cell = queue.popleft()
+            for neighbor in self._neighbors(cell):
+                if labels[neighbor] != label:
+                    labels[neighbor] = label
+                    queue.append(neighbor)
+                    count += 1
+        return count
+
+    def _on_change(self, cell, old, new):
+        if (old == WALL) == (new == WALL):
+            return
+        if new == WALL:
+            label = self._find(self.labels[cell])
+            self.labels[cell] = NO_LABEL
+            if not self._still_joined(cell):
+                self._dirty.add(label)
+        else:
+            label = self._new_label()
+            self.labels[cell] = label
+            for neighbor in self._neighbors(cell):
+                label = self._union(label, self.labels[neighbor])
+
+    def _still_joined(self, cell):
+        """True if the open neighbors of a newly closed cell are connected among themselves"""
+        neighbors = set(self._neighbors(cell))
+        if len(neighbors) <= 1:
+            return True
+        width = self.width
+        row, col = divmod(cell, width)
+        around = {}
+        for neighbor in neighbors:
+            n_row, n_col = divmod(neighbor, width)
+            around[(n_row - row, n_col - col)] = neighbor
+        # Connect the neighbors through moves between them only
+        first = next(iter(around))
+        seen = {first}
+        stack = [first]
+        while stack:
+            dr, dc = stack.pop()
+            for mr, mc in UNDIRECTED_MOVES:
+                step = (dr + mr, dc + mc)
+                if step in around and step not in seen:
+                    seen.add(step)
+                    stack.append(step)
+        return len(seen) == len(around)
+
+    def component(self, row, col):
+        """Current label of an open cell's component, or NO_LABEL for a wall"""
+        label = self.labels[row * self.width + col]
+        return NO_LABEL if label == NO_LABEL else self._find(label)
+
+    def may_reach(self, start, goal):
+        """
+        False if no path can lead from start to goal; True otherwise
+        With reversible moves a True answer is exact
+        """
+        width, labels = self.width, self.labels
+        start_id = start[0] * width + start[1]
+        goal_id = goal[0] * width + goal[1]
+        if labels[start_id] == NO_LABEL or labels[goal_id] == NO_LABEL:
+            return start_id == goal_id
+        a, b = self._find(labels[start_id]), self._find(labels[goal_id])
+        if a != b:
+            return False
+        if a in self._dirty:
+            # The component may have split: relabel the part still joined to start
+            self._flood(start_id, self._new_label())
+            self.relabels += 1
+            return self._find(labels[start_id]) == self._find(labels[goal_id])
+        return True
+
+    def reachable(self, start, goal):
+        """Whether goal can be reached from start; needs reversible moves"""
+        if not MOVES_REVERSIBLE:
+            raise ValueError("exact reachability needs reversible moves; use may_reach")
+        return self.may_reach(start, goal)
+
+    def component_count(self):
+        return len({self._find(label) for label in set(self.labels) if label != NO_LABEL})
+
+
+def _root(parent, run):
+    while parent[run] != run:
+        parent[run] = parent[parent[run]]
+        run = parent[run]
+    return run
+
+
+def get_connectivity(grid):
+    """ConnectivityIndex of grid, built on first use and kept up to date by its grid listener"""
+    index = _indexes.get(grid)
+    if index is None:
+        index = ConnectivityIndex(grid)
+        _indexes[grid] = index
+    return index
@@ -1,10 +1,34 @@
 """Utility functions for grid operations and node handling"""
+import hashlib
+import mmap
+import os
 import random
+import struct
 from config import GRID_SIZE, DIRECTIONS, STRAIGHT_COST, DIAGONAL_COST
 
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+
+WALL = 1  # Cell value that marks a wall
+
+# (row offset, col offset, cost) for each entry of DIRECTIONS, in the same order
+MOVES = [
+    (dr, dc, STRAIGHT_COST if dr == 0 or dc == 0 else DIAGONAL_COST)
+    for dr, dc in DIRECTIONS
+]
+
+# True when every move can be undone by a move of the same cost, i.e. the grid
+# graph is undirected and a path reversed is still a valid, equally cheap path
+MOVES_REVERSIBLE = all((-dr, -dc, cost) in MOVES for dr, dc, cost in MOVES)
+
 
 class Node:
     """Represents a node in the grid"""
+    __slots__ = ("row", "col", "parent", "g", "h", "f")
+
     def __init__(self, row, col, parent=None):
         self.row = row
         self.col = col
@@ -12,21 +36,194 @@ class Node:
         self.g = 0  # Cost from start
         self.h = 0  # Heuristic to goal
         self.f = 0  # Total cost (g + h)
-    
+
     def __eq__(self, other):
         return self.row == other.row and self.col == other.col
-    
+
     def __hash__(self):
         return hash((self.row, self.col))
-    
+
     def __lt__(self, other):
         return self.f < other.f
 
 
+class _GridRow:
+    """Row view so that grid[row][col] reads and writes keep working"""
+    __slots__ = ("_grid", "_row", "_offset")
+
+    def __init__(self, grid, row):
+        if not 0 <= row < grid.height:
+            raise IndexError("grid row out of range")
+        self._grid = grid
+        self._row = row
+        self._offset = row * grid.width
+
+    def __len__(self):
+        return self._grid.width
+
+    def __getitem__(self, col):
+        if not 0 <= col < self._grid.width:
+            raise IndexError("grid column out of range")
+        return self._grid.cells[self._offset + col]
+
+    def __setitem__(self, col, value):
+        if not 0 <= col < self._grid.width:
+            raise IndexError("grid column out of range")
+        self._grid.set_cell(self._row, col, value)
+
+    def __iter__(self):
+        cells = self._grid.cells
+        for i in range(self._offset, self._offset + self._grid.width):
+            yield cells[i]
+
+
+class Grid:
+    """
+    Rectangular grid stored as a flat, row-major bytearray
+    Cell (row, col) has the integer id row * width + col; 0 is open, 1 is a wall
+    Write cells through set_cell (or grid[row][col]) so that version-keyed caches
+    and change listeners see the change
+    """
+    def __init__(self, width, height=None, cells=None):
+        if height is None:
+            height = width
+        self.width = width
+        self.height = height
+        self.size = width * height
+        if cells is None:
+            cells = bytearray(self.size)
+        elif len(cells) != self.size:
+            raise ValueError(f"expected {self.size} cells, got {len(cells)}")
+        self.cells = cells
+        self.path = None  # .grid file the cells are mapped from, see open_grid_file
+        self.version = 0
+        self._fingerprint = None
+        self._listeners = []
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build a grid from a list of lists (or any sequence of rows)"""
+        rows = [list(row) for row in rows]
+        height = len(rows)
+        width = len(rows[0]) if height else 0
+        cells = bytearray(width * height)
+        for r, row in enumerate(rows):
+            if len(row) != width:
+                raise ValueError("all grid rows must have the same length")
+            cells[r * width:(r + 1) * width] = bytes(1 if v == WALL else 0 for v in row)
+        return cls(width, height, cells)
+
+    def cell_id(self, row, col):
+        """Row-major integer id of (row, col)"""
+        return row * self.width + col
+
+    def cell_pos(self, cell):
+        """(row, col) of an integer cell id"""
+        return divmod(cell, self.width)
+
+    def in_bounds(self, row, col):
+        return 0 <= row < self.height and 0 <= col < self.width
+
+    def is_open(self, row, col):
+        """Check if (row, col) is inside the grid and not a wall"""
+        if 0 <= row < self.height and 0 <= col < self.width:
+            return self.cells[row * self.width + col] != WALL
+        return False
+
+    def neighbors(self, cell):
+        """(neighbor id, move cost) pairs of an open cell, in DIRECTIONS order"""
+        width, height, cells = self.width, self.height, self.cells
+        row, col = divmod(cell, width)
+        result = []
+        for dr, dc, cost in MOVES:
+            new_row, new_col = row + dr, col + dc
+            if 0 <= new_row < height and 0 <= new_col < width:
+                neighbor = new_row * width + new_col
+                if cells[neighbor] != WALL:
+                    result.append((neighbor, cost))
+        return result
+
+    def get_cell(self, row, col):
+        return self.cells[row * self.width + col]
+
+    def set_cell(self, row, col, value):
+        cell = row * self.width + col
+        old = self.cells[cell]
+        if old != value:
+            self.cells[cell] = value
+            self.version += 1
+            for listener in self._listeners:
+                listener(cell, old, value)
+
+    def add_listener(self, listener):
+        """Call listener(cell_id, old_value, new_value) after every cell change"""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def wall_count(self):
+        """Number of wall cells (works for bytearray and memory-mapped cells)"""
+        cells = self.cells
+        if hasattr(cells, 'count'):
+            return cells.count(WALL)
+        if np is not None:
+            return int(np.count_nonzero(np.frombuffer(cells, dtype=np.uint8) == WALL))
+        return bytes(cells).count(WALL)
+
+    def fingerprint(self):
+        """Content hash of the grid (dimensions and cells), cached per version"""
+        if self._fingerprint is None or self._fingerprint[0] != self.version:
+            digest = hashlib.blake2b(digest_size=16)
+            digest.update(f"{self.width}x{self.height}:".encode())
+            digest.update(self.cells)
+            self._fingerprint = (self.version, digest.hexdigest())
+        return self._fingerprint[1]
+
+    def copy(self):
+        return Grid(self.width, self.height, bytearray(self.cells))
+
+    def to_rows(self):
+        """Convert back to a list of lists"""
+        w = self.width
+        return [list(self.cells[r * w:(r + 1) * w]) for r in range(self.height)]
+
+    def as_array(self):
+        """Zero-copy (height, width) uint8 NumPy view of the cells (requires NumPy)"""
+        if np is None:
+            raise ImportError("Grid.as_array() requires NumPy")
+        return np.frombuffer(self.cells, dtype=np.uint8).reshape(self.height, self.width)
+
+    def __len__(self):
+        return self.height
+
+    def __getitem__(self, row):
+        return _GridRow(self, row)
+
+    def __iter__(self):
+        for row in range(self.height):
+            yield _GridRow(self, row)
+
+    def __repr__(self):
+        return f"Grid({self.width}x{self.height})"
+
+
+def as_grid(grid):
+    """Return grid as a Grid, converting a list-of-lists grid if needed"""
+    if isinstance(grid, Grid):
+        return grid
+    if getattr(grid, 'paged', False):
+        raise ValueError(f"{grid!r} is paged from disk; only BFS and UCS can search it")
+    return Grid.from_rows(grid)
+
+
 def is_valid_position(row, col, grid):
     """Check if position is valid and not a wall"""
-    if 0 <= row < GRID_SIZE and 0 <= col < GRID_SIZE:
-        return grid[row][col] != 1  # 1 represents wall
+    if isinstance(grid, Grid) or getattr(grid, 'paged', False):
+        return grid.is_open(row, col)
+    if 0 <= row < len(grid) and 0 <= col < len(grid[row]):
+        return grid[row][col] != WALL
     return False
 
 
@@ -34,21 +231,45 @@ def get_neighbors(node, grid):
     """Get all valid neighbors of a node in the specified order"""
     neighbors = []
     row, col = node.row, node.col
-    
-    for i, (dr, dc) in enumerate(DIRECTIONS):
+
+    if isinstance(grid, Grid):
+        width, height, cells = grid.width, grid.height, grid.cells
+        for dr, dc, cost in MOVES:
+            new_row, new_col = row + dr, col + dc
+            if 0 <= new_row < height and 0 <= new_col < width \
+                    and cells[new_row * width + new_col] != WALL:
+                neighbor = Node(new_row, new_col, node)
+                neighbor.g = node.g + cost
+                neighbors.append(neighbor)
+        return neighbors
+
+    if getattr(grid, 'paged', False):
+        # Tiled grid: its tiles are paged in as the neighbors are looked up
+        for neighbor_id, cost in grid.neighbors(grid.cell_id(row, col)):
+            neighbor = Node(*grid.cell_pos(neighbor_id), node)
+            neighbor.g = node.g + cost
+            neighbors.append(neighbor)
+        return neighbors
+
+    for dr, dc, cost in MOVES:
         new_row, new_col = row + dr, col + dc
         if is_valid_position(new_row, new_col, grid):
             neighbor = Node(new_row, new_col, node)
-            # Calculate cost based on movement type
-            if i in [0, 1, 2, 4]:  # Straight movements
-                neighbor.g = node.g + STRAIGHT_COST
-            else:  # Diagonal movements
-                neighbor.g = node.g + DIAGONAL_COST
+            # Cost depends on movement type (straight or diagonal)
+            neighbor.g = node.g + cost
             neighbors.append(neighbor)
-    
+
     return neighbors
 
 
+def path_cost(path):
+    """Total movement cost of a (row, col) path"""
+    cost = 0
+    for (r1, c1), (r2, c2) in zip(path, path[1:]):
+        cost += STRAIGHT_COST if r1 == r2 or c1 == c2 else DIAGONAL_COST
+    return cost
+
+
 def manhattan_distance(node1, node2):
     """Calculate Manhattan distance heuristic"""
     return abs(node1.row - node2.row) + abs(node1.col - node2.col)
@@ -59,8 +280,13 @@ def euclidean_distance(node1, node2):
     return ((node1.row - node2.row)**2 + (node1.col - node2.col)**2)**0.5
 
 
-def reconstruct_path(node):
-    """Reconstruct path from goal to start"""
+def reconstruct_path(node, state=None):
+    """
+    Reconstruct path from goal to start
+    With a SearchState, node is a cell id and the state's parent array is walked
+    """
+    if state is not None:
+        return state.reconstruct_path(node)
     path = []
     current = node
     while current is not None:
@@ -69,17 +295,156 @@ def reconstruct_path(node):
     return path[::-1]
 
 
-def initialize_grid():
+def initialize_grid(width=GRID_SIZE, height=None):
     """Initialize an empty grid"""
-    return [[0 for _ in range(GRID_SIZE)] for _ in range(GRID_SIZE)]
+    return Grid(width, height)
 
 
-def add_random_walls(grid, num_walls=50):
-    """Add random walls to the grid"""
+def add_random_walls(grid, num_walls=50, rng=None):
+    """
+    Add random walls to the grid
+    rng (a random.Random, or an int seed) makes the layout reproducible
+    """
+    if rng is None:
+        rng = random
+    elif isinstance(rng, int):
+        rng = random.Random(rng)
+    if not isinstance(grid, Grid):
+        height, width = len(grid), len(grid[0])
+        open_cells = sum(row.count(0) for row in grid)
+        num_walls = min(num_walls, open_cells)
+        walls_added = 0
+        while walls_added < num_walls:
+            row = rng.randint(0, height - 1)
+            col = rng.randint(0, width - 1)
+            if grid[row][col] == 0:
+                grid[row][col] = WALL
+                walls_added += 1
+        return
+
+    cells = grid.cells
+    num_walls = min(num_walls, grid.size - grid.wall_count())
     walls_added = 0
     while walls_added < num_walls:
-        row = random.randint(0, GRID_SIZE - 1)
-        col = random.randint(0, GRID_SIZE - 1)
-        if grid[row][col] == 0:
-            grid[row][col] = 1
+        row, col = divmod(rng.randrange(grid.size), grid.width)
+        if cells[row * grid.width + col] == 0:
+            grid.set_cell(row, col, WALL)
             walls_added += 1
+
+
+# Binary grid files: a fixed header followed by one byte per cell, row-major
+GRID_FILE_EXTENSION = '.grid'
+_GRID_MAGIC = b'PFGR'
+_GRID_VERSION = 1
+_GRID_HEADER = struct.Struct('<4sHHII')  # magic, version, reserved, width, height
+
+# Tiled files, paged in on demand (utils.tiled_grid)
+TILED_FILE_EXTENSION = '.tiles'
+
+# Octile .map files (the moving-ai benchmark format): these cells are passable
+MAP_FILE_EXTENSION = '.map'
+_MAP_PASSABLE = b'.GS'
+_MAP_CELLS = bytes(0 if chr(ch).encode() in _MAP_PASSABLE else WALL for ch in range(256))
+
+
+def load_grid(path, writable=False):
+    """
+    Load a grid from a file, picking the format by extension
+    .grid files are memory-mapped (see open_grid_file), .tiles files are paged
+    in tile by tile (see utils.tiled_grid), .map files are octile benchmark
+    maps; anything else is the text format read by load_text_grid
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == TILED_FILE_EXTENSION:
+        from utils.tiled_grid import TiledGrid  # utils.tiled_grid imports this module
+        return TiledGrid(path)
+    if extension == GRID_FILE_EXTENSION:
+        return open_grid_file(path, writable)
+    if extension == MAP_FILE_EXTENSION:
+        return load_octile_map(path)
+    return load_text_grid(path)
+
+
+def save_grid(grid, path):
+    """Write a grid as a binary .grid or .tiles file or, for any other extension, as text"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == TILED_FILE_EXTENSION:
+        from utils.tiled_grid import write_tiled_grid
+        write_tiled_grid(grid, path)
+    elif extension == GRID_FILE_EXTENSION:
+        save_grid_file(grid, path)
+    else:
+        save_text_grid(grid, path)
+
+
+def load_text_grid(path):
+    """
+    Load a grid from a text file, one line per row
+    '#' or '1' marks a wall; '.' or '0' is open
+    """
+    rows = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                rows.append([WALL if ch in '#1' else 0 for ch in line])
+    return Grid.from_rows(rows)
+
+
+def save_text_grid(grid, path):
+    """Write a grid in the text format read by load_text_grid"""
+    grid = as_grid(grid)
+    with open(path, 'w') as f:
+        for row in grid.to_rows():
+            f.write(''.join('#' if v == WALL else '.' for v in row) + '\n')
+
+
+def save_grid_file(grid, path):
+    """Write a grid as a binary .grid file"""
+    grid = as_grid(grid)
+    with open(path, 'wb') as f:
+        f.write(_GRID_HEADER.pack(_GRID_MAGIC, _GRID_VERSION, 0, grid.width, grid.height))
+        f.write(grid.cells)
+
+
+def open_grid_file(path, writable=False):
+    """
+    Open a binary .grid file as a Grid without reading it into memory
+    The cells are a view of a memory map of the file, so opening takes the
+    same time for any map size and pages are read on first access. Cell
+    changes stay private to this grid unless writable is True, in which case
+    they are written through to the file
+    """
+    with open(path, 'r+b' if writable else 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_COPY)
+    if len(mapped) < _GRID_HEADER.size:
+        raise ValueError(f"{path} is not a grid file")
+    magic, version, _, width, height = _GRID_HEADER.unpack_from(mapped)
+    if magic != _GRID_MAGIC or version != _GRID_VERSION:
+        raise ValueError(f"{path} is not a grid file")
+    end = _GRID_HEADER.size + width * height
+    if len(mapped) < end:
+        raise ValueError(f"{path} is truncated: expected {width}x{height} cells")
+    grid = Grid(width, height, memoryview(mapped)[_GRID_HEADER.size:end])
+    grid.path = path
+    return grid
+
+
+def load_octile_map(path):
+    """
+    Import an octile .map file ("type octile", "height H", "width W", "map",
+    then H rows of W characters); '.', 'G' and 'S' are passable, every other
+    terrain is a wall
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    header, separator, body = data.partition(b'\nmap')
+    if not separator:
+        raise ValueError(f"{path} has no 'map' section")
+    fields = dict(line.split(None, 1) for line in header.split(b'\n') if line.strip())
+    width, height = int(fields[b'width']), int(fields[b'height'])
+
+    cells = bytearray(b''.join(body.split()[:height]))
+    if len(cells) != width * height:
+        raise ValueError(f"{path}: expected {height} rows of {width} cells")
+    return Grid(width, height, cells.translate(_MAP_CELLS))
@@ -0,0 +1,171 @@
+"""Persistent on-disk cache of search results, keyed by grid content"""
+import json
+import os
+import sqlite3
+import weakref
+from config import DIRECTIONS
+from utils.grid_utils import MOVES
+from utils.search_state import out_of_bounds
+
+# Each run of equal moves is one byte: direction index << RUN_BITS | (run length - 1)
+RUN_BITS = 5
+MAX_RUN = 1 << RUN_BITS
+_DIRECTION_CODES = {move: code for code, move in enumerate(DIRECTIONS)}
+
+# Bump when the stored layout changes; the move set is recorded as well, so
+# a cache written under different DIRECTIONS or move costs starts out empty
+_FORMAT = "1"
+_MOVES_KEY = repr(MOVES)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS paths (
+    grid TEXT, start INTEGER, goal INTEGER, algorithm TEXT, params TEXT,
+    path BLOB, nodes_explored INTEGER,
+    PRIMARY KEY (grid, start, goal, algorithm, params)
+) WITHOUT ROWID;
+"""
+
+
+def encode_path(path):
+    """
+    Run-length encoded direction codes of a (row, col) path, without its first cell
+    Raises ValueError if a step is not one of DIRECTIONS
+    """
+    data = bytearray()
+    run_code, run = None, 0
+    for (r1, c1), (r2, c2) in zip(path, path[1:]):
+        code = _DIRECTION_CODES.get((r2 - r1, c2 - c1))
+        if code is None:
+            raise ValueError(f"step {(r1, c1)} -> {(r2, c2)} is not a move")
+        if code == run_code and run < MAX_RUN:
+            run += 1
+            continue
+        if run:
+            data.append(run_code << RUN_BITS | (run - 1))
+        run_code, run = code, 1
+    if run:
+        data.append(run_code << RUN_BITS | (run - 1))
+    return bytes(data)
+
+
+def decode_path(start, data):
+    """(row, col) path starting at start from encode_path output"""
+    row, col = start
+    path = [(row, col)]
+    for byte in data:
+        dr, dc = DIRECTIONS[byte >> RUN_BITS]
+        for _ in range((byte & (MAX_RUN - 1)) + 1):
+            row += dr
+            col += dc
+            path.append((row, col))
+    return path
+
+
+class PathCache:
+    """
+    SQLite file of search results keyed by
+    (grid content hash, start, goal, algorithm, params)
+    Paths are stored as run-length encoded direction codes; unreachable goals
+    are cached too. Because the key is the grid's content hash, a grid whose
+    cells changed never sees results computed before the change, and watch()
+    deletes those stale results as soon as the grid's version moves on.
+    Several processes may share one file; each opens its own PathCache
+    """
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._watched = weakref.WeakKeyDictionary()  # Grid -> content hash when last used, or None
+        self._db = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        stored = dict(self._db.execute("SELECT key, value FROM meta"))
+        if stored.get("format") != _FORMAT or stored.get("moves") != _MOVES_KEY:
+            with self._db:
+                self._db.execute("BEGIN IMMEDIATE")
+                self._db.execute("DELETE FROM paths")
+                self._db.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                                     [("format", _FORMAT), ("moves", _MOVES_KEY)])
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM paths").fetchone()[0]
+
+    def _key(self, grid, start, goal, algorithm, params):
+        grid_hash = grid.fingerprint()
+        if grid in self._watched:
+            self._watched[grid] = grid_hash
+        return (grid_hash, grid.cell_id(*start), grid.cell_id(*goal), algorithm,
+                json.dumps(params or {}, sort_keys=True))
+
+    def get(self, grid, start, goal, algorithm, params=None):
+        """
+        Cached (path, nodes_explored) of a query, or None on a miss
+        path is None when the goal was found to be unreachable. params should
+        include the algorithm's defaults, so that explicit and implied values
+        share an entry. Queries with an endpoint off the grid are never cached
+        """
+        if out_of_bounds(grid, start, goal):
+            return None
+        row = self._db.execute(
+            "SELECT path, nodes_explored FROM paths WHERE grid=? AND start=? AND goal=?"
+            " AND algorithm=? AND params=?",
+            self._key(grid, start, goal, algorithm, params)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        data, nodes_explored = row
+        return (None if data is None else decode_path(tuple(start), data)), nodes_explored
+
+    def put(self, grid, start, goal, algorithm, params, path, nodes_explored):
+        """Store a query's result; paths with steps outside DIRECTIONS are not cached"""
+        if out_of_bounds(grid, start, goal):
+            return
+        try:
+            data = encode_path(path) if path else None
+        except ValueError:
+            return
+        self._db.execute("INSERT OR REPLACE INTO paths VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         self._key(grid, start, goal, algorithm, params) + (data, nodes_explored))
+
+    def watch(self, grid):
+        """Delete grid's cached results whenever one of its cells changes"""
+        if grid in self._watched:
+            return
+        self._watched[grid] = grid.fingerprint()
+        grid_ref = weakref.ref(grid)
+
+        def on_change(cell, old, new):
+            grid = grid_ref()
+            grid_hash = self._watched.get(grid)
+            if grid_hash is not None:
+                self.invalidate(grid_hash)
+                self._watched[grid] = None  # Rehashed on the next get/put
+
+        grid.add_listener(on_change)
+
+    def invalidate(self, grid_hash):
+        """Delete every result cached for the grid content with this hash"""
+        self._db.execute("DELETE FROM paths WHERE grid=?", (grid_hash,))
+
+    def clear(self):
+        self._db.execute("DELETE FROM paths")
+
+    def stats(self):
+        return {
+            "entries": len(self),
+            "bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,134 @@
+"""Preallocated search state indexed by integer cell id"""
+from array import array
+from utils.trace import FOUND
+
+NO_PARENT = -1
+INF = float('inf')
+
+
+def _popcount(bits):
+    """Number of set bits in a bytearray"""
+    value = int.from_bytes(bits, 'little')
+    try:
+        return value.bit_count()
+    except AttributeError:  # Python < 3.10
+        return bin(value).count('1')
+
+
+class VisitedCells:
+    """
+    Read-only view of a visited bitset
+    Behaves like a set of (row, col) tuples: supports len(), iteration and `in`
+    """
+    def __init__(self, grid, bits):
+        self.grid = grid
+        self.bits = bits
+        self._count = None
+
+    def __len__(self):
+        if self._count is None:
+            self._count = _popcount(self.bits)
+        return self._count
+
+    def __contains__(self, pos):
+        row, col = pos
+        if not self.grid.in_bounds(row, col):
+            return False
+        cell = row * self.grid.width + col
+        return bool(self.bits[cell >> 3] >> (cell & 7) & 1)
+
+    def __iter__(self):
+        width = self.grid.width
+        for cell in self.cell_ids():
+            yield divmod(cell, width)
+
+    def cell_ids(self):
+        """Iterate over the ids of the visited cells"""
+        for byte_index, byte in enumerate(self.bits):
+            if byte:
+                base = byte_index << 3
+                for bit in range(8):
+                    if byte >> bit & 1:
+                        yield base + bit
+
+    def union(self, other):
+        """Visited cells of both views"""
+        merged = int.from_bytes(self.bits, 'little') | int.from_bytes(other.bits, 'little')
+        return VisitedCells(self.grid, bytearray(merged.to_bytes(len(self.bits), 'little')))
+
+
+class SearchState:
+    """
+    Per-search bookkeeping for a Grid
+    Visited flags live in a bitset; parents and path costs live in flat arrays
+    indexed by cell id, so expanding a cell allocates nothing
+    """
+    def __init__(self, grid, with_cost=True):
+        self.grid = grid
+        self.visited = bytearray((grid.size + 7) >> 3)
+        self.parent = array('i', [NO_PARENT]) * grid.size
+        self.cost = array('d', [INF]) * grid.size if with_cost else None
+
+    def is_visited(self, cell):
+        return bool(self.visited[cell >> 3] >> (cell & 7) & 1)
+
+    def mark(self, cell):
+        self.visited[cell >> 3] |= 1 << (cell & 7)
+
+    def reconstruct_path(self, cell):
+        """Walk the parent array from cell back to the root"""
+        parent = self.parent
+        width = self.grid.width
+        path = []
+        while cell != NO_PARENT:
+            path.append(divmod(cell, width))
+            cell = parent[cell]
+        return path[::-1]
+
+    def visited_cells(self):
+        return VisitedCells(self.grid, self.visited)
+
+
+def out_of_bounds(grid, *positions):
+    """
+    True if any (row, col) of positions lies outside grid
+    Searches answer such queries with (None, empty visited): the cell id of an
+    out-of-range column would alias a cell of another row
+    """
+    return not all(grid.in_bounds(*pos) for pos in positions)
+
+
+def multi_query(grid, sources, goals, k=None):
+    """Cell ids of sources and goals (duplicates dropped) and the number of goals to settle"""
+    if out_of_bounds(grid, *sources, *goals):
+        raise ValueError("sources and goals must lie inside the grid")
+    start_ids = list(dict.fromkeys(grid.cell_id(*pos) for pos in sources))
+    if not start_ids:
+        raise ValueError("At least one source is required")
+    goal_ids = dict.fromkeys(grid.cell_id(*pos) for pos in goals)
+    if k is None:
+        k = len(goal_ids)
+    elif k < 1:
+        raise ValueError(f"k must be at least 1, got {k}")
+    return start_ids, goal_ids, min(k, len(goal_ids))
+
+
+def goal_steps(steps, state, goal_ids, k, emit=None):
+    """
+    Drive a goal-less search step generator until k of goal_ids are expanded
+    Yields each expanded cell, returns ({goal: path}, visited); the paths are
+    walked from state.parent once the search stops
+    """
+    found = []
+    if k:
+        for current in steps:
+            if current in goal_ids:
+                if emit is not None:
+                    emit(FOUND, current)
+                found.append(current)
+                if len(found) == k:
+                    break
+            yield current
+    width = state.grid.width
+    paths = {divmod(goal, width): state.reconstruct_path(goal) for goal in found}
+    return paths, state.visited_cells()
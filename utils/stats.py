@@ -0,0 +1,98 @@
+"""Per-run search instrumentation: hot-path counters and timers"""
+import json
+from time import perf_counter
+
+COUNTERS = ("expansions", "pushes", "duplicate_pushes", "stale_pops",
+            "frontier_high_water", "neighbor_calls", "callbacks")
+TIMERS = ("neighbor_time", "frontier_time", "callback_time")
+
+
+class SearchStats:
+    """
+    Counters and timers for one search run (or, after merge, many)
+    Algorithms take stats=None and only touch this object behind an
+    `if stats is not None` check, so disabled instrumentation costs one
+    comparison per hook
+
+    expansions: cells taken off the frontier and expanded
+    pushes: cells added to the frontier
+    duplicate_pushes: pushes of a cell that had already been pushed in the run
+    stale_pops: outdated priority queue entries skipped by UCS
+    frontier_high_water: largest frontier (queue, stack, heap or DLS path) size
+    neighbor_calls: neighbor generations (one per expanded cell)
+    callbacks: step events delivered to the visualizer / trace
+    neighbor_time: seconds generating and filtering neighbors, excluding the
+        frontier and callback time spent inside that loop
+    frontier_time: seconds in frontier pushes and pops
+    callback_time: seconds in visualizer / trace callbacks
+    """
+    __slots__ = COUNTERS + TIMERS + ("_mark",)
+
+    def __init__(self):
+        for name in COUNTERS:
+            setattr(self, name, 0)
+        for name in TIMERS:
+            setattr(self, name, 0.0)
+        self._mark = None
+
+    def record_pop(self, began):
+        """A frontier pop that started at perf_counter() time began"""
+        self.frontier_time += perf_counter() - began
+        self.expansions += 1
+
+    def record_push(self, began, size, duplicate=False):
+        """A frontier push that started at began, leaving size entries"""
+        self.frontier_time += perf_counter() - began
+        self.pushes += 1
+        if duplicate:
+            self.duplicate_pushes += 1
+        if size > self.frontier_high_water:
+            self.frontier_high_water = size
+
+    def begin_neighbors(self):
+        self.neighbor_calls += 1
+        self._mark = (perf_counter(), self.frontier_time, self.callback_time)
+
+    def end_neighbors(self):
+        began, frontier_time, callback_time = self._mark
+        self.neighbor_time += (perf_counter() - began
+                               - (self.frontier_time - frontier_time)
+                               - (self.callback_time - callback_time))
+
+    def wrap_emit(self, emit):
+        """Time and count every call of an event sink (None stays None)"""
+        if emit is None:
+            return None
+
+        def timed_emit(code, cell):
+            began = perf_counter()
+            emit(code, cell)
+            self.callback_time += perf_counter() - began
+            self.callbacks += 1
+        return timed_emit
+
+    def merge(self, other):
+        """Add another run's numbers to this one (the high-water mark is a max)"""
+        for name in COUNTERS + TIMERS:
+            if name == "frontier_high_water":
+                self.frontier_high_water = max(self.frontier_high_water, other.frontier_high_water)
+            else:
+                setattr(self, name, getattr(self, name) + getattr(other, name))
+        return self
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in COUNTERS + TIMERS}
+
+    def to_json(self):
+        return json.dumps(self.as_dict())
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        for name in COUNTERS + TIMERS:
+            if name in data:
+                setattr(stats, name, data[name])
+        return stats
+
+    def __repr__(self):
+        return f"SearchStats({', '.join(f'{k}={v}' for k, v in self.as_dict().items())})"
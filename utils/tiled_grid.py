@@ -0,0 +1,275 @@
+"""Tiled grids paged in from disk on demand, and search state chunked the same way"""
+import hashlib
+import struct
+from array import array
+from collections import OrderedDict
+from utils.grid_utils import MOVES, WALL, as_grid
+from utils.search_state import NO_PARENT, INF
+
+DEFAULT_TILE_SIZE = 256
+DEFAULT_CACHE_BYTES = 64 << 20  # Tile cache budget of a TiledGrid
+
+# A header, then the tiles in row-major tile order, each tile_size * tile_size
+# bytes (row-major inside the tile); tiles on the right and bottom edges are
+# padded with walls
+_MAGIC = b'PFTG'
+_VERSION = 1
+_HEADER = struct.Struct('<4sHHIII')  # magic, version, reserved, width, height, tile_size
+
+
+def write_tiled_grid(grid, path, tile_size=DEFAULT_TILE_SIZE):
+    """
+    Write grid as a tiled file, one band of tile rows at a time
+    Works from memory-mapped grids without reading them into memory at once
+    """
+    grid = as_grid(grid)
+    width, height, cells = grid.width, grid.height, grid.cells
+    tiles_x = -(-width // tile_size)
+    tiles_y = -(-height // tile_size)
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, 0, width, height, tile_size))
+        for tile_row in range(tiles_y):
+            first_row = tile_row * tile_size
+            last_row = min(height, first_row + tile_size)
+            for tile_col in range(tiles_x):
+                first_col = tile_col * tile_size
+                last_col = min(width, first_col + tile_size)
+                tile = bytearray([WALL]) * (tile_size * tile_size)
+                for row in range(first_row, last_row):
+                    local = (row - first_row) * tile_size
+                    tile[local:local + last_col - first_col] = \
+                        cells[row * width + first_col:row * width + last_col]
+                f.write(tile)
+
+
+class TiledGrid:
+    """
+    Read-only grid whose cells live in a tiled file on disk
+    Tiles are read on first use and kept in an LRU cache of at most cache_bytes;
+    the I/O counters record how much paging the searches caused. Cell ids and
+    neighbors follow Grid, so SearchState-free code (is_valid_position,
+    get_neighbors, the tiled bfs/ucs) works on either
+    """
+    paged = True  # as_grid refuses to load paged grids into memory
+
+    def __init__(self, path, cache_bytes=DEFAULT_CACHE_BYTES):
+        self.path = path
+        self._file = open(path, 'rb')
+        magic, version, _, width, height, tile_size = _HEADER.unpack(self._file.read(_HEADER.size))
+        if magic != _MAGIC or version != _VERSION:
+            self._file.close()
+            raise ValueError(f"{path} is not a tiled grid file")
+        self.width = width
+        self.height = height
+        self.size = width * height
+        self.tile_size = tile_size
+        self.tile_cells = tile_size * tile_size
+        self.tiles_x = -(-width // tile_size)
+        self.tiles_y = -(-height // tile_size)
+        self.version = 0
+        self.cache_tiles = max(1, cache_bytes // self.tile_cells)
+        self._tiles = OrderedDict()
+        self._fingerprint = None
+        self.reset_io_counters()
+
+    def close(self):
+        self._file.close()
+        self._tiles.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def reset_io_counters(self):
+        self.tile_reads = 0
+        self.bytes_read = 0
+        self.cache_hits = 0
+        self.evictions = 0
+
+    def io_counters(self):
+        """Paging done since the counters were last reset"""
+        return {
+            "tile_reads": self.tile_reads,
+            "bytes_read": self.bytes_read,
+            "cache_hits": self.cache_hits,
+            "evictions": self.evictions,
+            "cached_tiles": len(self._tiles),
+        }
+
+    def tile(self, index):
+        """Cells of tile index (bytes), paged in through the LRU cache"""
+        tiles = self._tiles
+        cells = tiles.get(index)
+        if cells is not None:
+            tiles.move_to_end(index)
+            self.cache_hits += 1
+            return cells
+
+        self._file.seek(_HEADER.size + index * self.tile_cells)
+        cells = self._file.read(self.tile_cells)
+        self.tile_reads += 1
+        self.bytes_read += len(cells)
+        tiles[index] = cells
+        if len(tiles) > self.cache_tiles:
+            tiles.popitem(last=False)
+            self.evictions += 1
+        return cells
+
+    def locate(self, cell):
+        """(tile index, offset inside the tile) of a cell id"""
+        row, col = divmod(cell, self.width)
+        size = self.tile_size
+        return ((row // size) * self.tiles_x + col // size,
+                (row % size) * size + col % size)
+
+    def cell_id(self, row, col):
+        return row * self.width + col
+
+    def cell_pos(self, cell):
+        return divmod(cell, self.width)
+
+    def in_bounds(self, row, col):
+        return 0 <= row < self.height and 0 <= col < self.width
+
+    def get_cell(self, row, col):
+        size = self.tile_size
+        return self.tile((row // size) * self.tiles_x + col // size)[(row % size) * size + col % size]
+
+    def is_open(self, row, col):
+        """Check if (row, col) is inside the grid and not a wall"""
+        if 0 <= row < self.height and 0 <= col < self.width:
+            return self.get_cell(row, col) != WALL
+        return False
+
+    def neighbors(self, cell):
+        """
+        (neighbor id, move cost) pairs of a cell, in DIRECTIONS order, as Grid.neighbors
+        Walls have none, as in the CSR adjacency of in-memory grids
+        """
+        width, height, size = self.width, self.height, self.tile_size
+        row, col = divmod(cell, width)
+        local_row, local_col = row % size, col % size
+        result = []
+        if 0 < local_row < size - 1 and 0 < local_col < size - 1:
+            # All neighbors are in the same tile (and the padding keeps them in bounds)
+            tile = self.tile((row // size) * self.tiles_x + col // size)
+            if tile[local_row * size + local_col] == WALL:
+                return result
+            for dr, dc, cost in MOVES:
+                new_row, new_col = row + dr, col + dc
+                if tile[(local_row + dr) * size + local_col + dc] != WALL \
+                        and new_row < height and new_col < width:
+                    result.append((new_row * width + new_col, cost))
+            return result
+
+        if self.get_cell(row, col) == WALL:
+            return result
+        for dr, dc, cost in MOVES:
+            new_row, new_col = row + dr, col + dc
+            if 0 <= new_row < height and 0 <= new_col < width \
+                    and self.get_cell(new_row, new_col) != WALL:
+                result.append((new_row * width + new_col, cost))
+        return result
+
+    def fingerprint(self):
+        """Content hash of the grid, streamed through the file once and cached"""
+        if self._fingerprint is None:
+            digest = hashlib.blake2b(digest_size=16)
+            digest.update(f"tiled:{self.width}x{self.height}/{self.tile_size}:".encode())
+            with open(self.path, 'rb') as f:
+                f.seek(_HEADER.size)
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    def __repr__(self):
+        return f"TiledGrid({self.width}x{self.height}, tiles of {self.tile_size})"
+
+
+class ChunkedSearchState:
+    """
+    Visited flags, parents and costs for a TiledGrid, kept per tile
+    A tile's chunk is allocated the first time the search touches one of its
+    cells, so memory grows with the explored area rather than the map size.
+    Parents are global cell ids
+    """
+    def __init__(self, grid, with_cost=True):
+        self.grid = grid
+        self.with_cost = with_cost
+        self.chunks = {}  # Tile index -> [visited bytearray, parent array, cost array or None]
+
+    def chunk(self, tile):
+        chunk = self.chunks.get(tile)
+        if chunk is None:
+            cells = self.grid.tile_cells
+            chunk = [bytearray(cells), array('q', [NO_PARENT]) * cells,
+                     array('d', [INF]) * cells if self.with_cost else None]
+            self.chunks[tile] = chunk
+        return chunk
+
+    def is_visited(self, cell):
+        tile, local = self.grid.locate(cell)
+        chunk = self.chunks.get(tile)
+        return chunk is not None and chunk[0][local] != 0
+
+    def mark(self, cell):
+        tile, local = self.grid.locate(cell)
+        self.chunk(tile)[0][local] = 1
+
+    def parent(self, cell):
+        tile, local = self.grid.locate(cell)
+        chunk = self.chunks.get(tile)
+        return NO_PARENT if chunk is None else chunk[1][local]
+
+    def cost(self, cell):
+        tile, local = self.grid.locate(cell)
+        chunk = self.chunks.get(tile)
+        return INF if chunk is None else chunk[2][local]
+
+    def nbytes(self):
+        """Memory held by the allocated chunks"""
+        per_chunk = self.grid.tile_cells * (1 + 8 + (8 if self.with_cost else 0))
+        return per_chunk * len(self.chunks)
+
+    def reconstruct_path(self, cell):
+        """(row, col) path from the search root to cell"""
+        width = self.grid.width
+        path = []
+        while cell != NO_PARENT:
+            path.append(divmod(cell, width))
+            cell = self.parent(cell)
+        return path[::-1]
+
+    def visited_cells(self):
+        return ChunkedVisitedCells(self)
+
+
+class ChunkedVisitedCells:
+    """Set-like (row, col) view of the visited flags of a ChunkedSearchState"""
+    def __init__(self, state):
+        self.state = state
+        self._count = None
+
+    def __len__(self):
+        if self._count is None:
+            self._count = sum(len(chunk[0]) - chunk[0].count(0) for chunk in self.state.chunks.values())
+        return self._count
+
+    def __contains__(self, pos):
+        row, col = pos
+        grid = self.state.grid
+        return grid.in_bounds(row, col) and self.state.is_visited(row * grid.width + col)
+
+    def __iter__(self):
+        grid = self.state.grid
+        size = grid.tile_size
+        for tile, chunk in self.state.chunks.items():
+            first_row = (tile // grid.tiles_x) * size
+            first_col = (tile % grid.tiles_x) * size
+            visited = chunk[0]
+            for local in range(len(visited)):
+                if visited[local]:
+                    yield first_row + local // size, first_col + local % size
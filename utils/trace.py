@@ -0,0 +1,140 @@
+"""Compact step-event traces: ring buffer, binary trace files and event fan-out"""
+import struct
+from array import array
+
+# Event codes
+EXPANDED = 0   # Cell taken off the frontier and expanded (the current cell)
+PUSHED = 1     # Cell added to the frontier
+POPPED = 2     # Cell left the frontier without being expanded (or was backtracked)
+FOUND = 3      # Goal cell reached
+RESTART = 4    # Search restarted from scratch (e.g. the next IDDFS depth); cell is 0
+
+EVENT_NAMES = ("expanded", "pushed", "popped", "found", "restart")
+
+# Each event is one int64: (cell id << CODE_BITS) | code
+CODE_BITS = 3
+CODE_MASK = (1 << CODE_BITS) - 1
+
+_MAGIC = b'PFTR'
+_VERSION = 1
+_HEADER = struct.Struct('<4sHHIIQ')  # magic, version, reserved, width, height, count
+
+
+class Trace:
+    """
+    Bounded ring buffer of step events
+    Once capacity events are stored, the oldest ones are overwritten; capacity=None
+    keeps every event
+    """
+    def __init__(self, width, height, capacity=1 << 20):
+        self.width = width
+        self.height = height
+        self.capacity = capacity
+        self.total = 0  # Events emitted, including overwritten ones
+        self._next = 0
+        self._buffer = array('q', [0]) * capacity if capacity else array('q')
+
+    def emit(self, code, cell):
+        if self.capacity is None:
+            self._buffer.append(cell << CODE_BITS | code)
+        else:
+            self._buffer[self._next] = cell << CODE_BITS | code
+            self._next += 1
+            if self._next == self.capacity:
+                self._next = 0
+        self.total += 1
+
+    def __len__(self):
+        if self.capacity is None:
+            return len(self._buffer)
+        return min(self.total, self.capacity)
+
+    @property
+    def dropped(self):
+        """Number of old events overwritten by the ring buffer"""
+        return self.total - len(self)
+
+    def packed(self):
+        """Stored events in emission order, as packed int64 values"""
+        if self.capacity is None or self.total <= self.capacity:
+            return self._buffer[:len(self)]
+        return self._buffer[self._next:] + self._buffer[:self._next]
+
+    def events(self, start=0, stop=None):
+        """Iterate (code, cell) pairs in emission order"""
+        for value in self.packed()[start:stop]:
+            yield value & CODE_MASK, value >> CODE_BITS
+
+    def save(self, path):
+        """Write the stored events to a binary trace file"""
+        events = self.packed()
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, 0, self.width, self.height, len(events)))
+            events.tofile(f)
+
+    @classmethod
+    def load(cls, path):
+        """Read a binary trace file written by save() or TraceWriter"""
+        with open(path, 'rb') as f:
+            magic, version, _, width, height, count = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError(f"{path} is not a trace file")
+            trace = cls(width, height, capacity=None)
+            trace._buffer.fromfile(f, count)
+        trace.total = count
+        return trace
+
+
+class TraceWriter:
+    """Streams events straight to a binary trace file, in chunks"""
+    def __init__(self, path, width, height, chunk_size=1 << 16):
+        self.path = path
+        self.total = 0
+        self._chunk_size = chunk_size
+        self._chunk = array('q')
+        self._file = open(path, 'wb')
+        self._file.write(_HEADER.pack(_MAGIC, _VERSION, 0, width, height, 0))
+        self._width, self._height = width, height
+
+    def emit(self, code, cell):
+        self._chunk.append(cell << CODE_BITS | code)
+        if len(self._chunk) >= self._chunk_size:
+            self._flush()
+
+    def _flush(self):
+        self._chunk.tofile(self._file)
+        self.total += len(self._chunk)
+        self._chunk = array('q')
+
+    def close(self):
+        """Flush pending events and write the final event count"""
+        if self._file.closed:
+            return
+        self._flush()
+        self._file.seek(0)
+        self._file.write(_HEADER.pack(_MAGIC, _VERSION, 0, self._width, self._height, self.total))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def make_emitter(*sinks):
+    """
+    Combine event sinks (objects with emit(code, cell), or None) into one emit
+    function; returns None when there is nothing to emit to, so search loops can
+    skip event bookkeeping entirely
+    """
+    emits = [sink.emit for sink in sinks if sink is not None]
+    if not emits:
+        return None
+    if len(emits) == 1:
+        return emits[0]
+
+    def emit(code, cell):
+        for sink_emit in emits:
+            sink_emit(code, cell)
+    return emit